@@ -1,8 +1,170 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List
+import math
+import os
+import time
 
-from anomaly_detector.infer import predict_anomaly
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from datetime import datetime
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from anomaly_detector.batching import MicroBatcher
+from anomaly_detector.calibration import ThresholdCalibrator, write_threshold_table
+from anomaly_detector.feature_store import MerchantFeatureStore, utc_naive
+from anomaly_detector.hybrid import score_transactions
+from anomaly_detector.infer import (
+    FEATURE_COLUMNS,
+    drift_monitor,
+    explain_row,
+    predict_anomaly_batch,
+    registry,
+    score_cache,
+    warmup,
+)
+from anomaly_detector.jobs import JobManager, validate_job
+from anomaly_detector.metrics import REGISTRY, Counter, Gauge, Histogram
+from anomaly_detector.tenants import predict_segmented, segment_models
+from anomaly_detector.windows import WindowedFeatureStore
+
+# Cold-start timings, reported by /ready
+startup = {
+    "ready": False,
+    "import_seconds": time.perf_counter() - _import_started,
+    "load_seconds": None,
+    "warmup_seconds": None,
+    "engine": None,
+}
+
+
+# ----------------------------
+# Threshold calibration from live scores
+# ----------------------------
+def new_calibrator():
+    return ThresholdCalibrator(
+        quantile=float(os.environ.get("CALIBRATION_QUANTILE", 0.95)),
+        min_count=int(os.environ.get("CALIBRATION_MIN_COUNT", 100))
+    )
+
+
+# Scores are only comparable within one model: the default model's
+# sketch, plus one per segment bundle keyed by its segment
+calibrator = new_calibrator()
+segment_calibrators = {}
+
+
+def calibrator_for(model_segment):
+    if model_segment is None:
+        return calibrator
+    if model_segment not in segment_calibrators:
+        segment_calibrators.setdefault(model_segment, new_calibrator())
+    return segment_calibrators[model_segment]
+
+
+def score_and_calibrate(features, segments=None, explain=True):
+    # Rows are routed to their segment's model when a bundle is installed
+    result = predict_segmented(features, segments, explain=explain)
+
+    model_segments = result["model_segment"]
+    for model_segment in set(model_segments.tolist()):
+        rows = np.flatnonzero(model_segments == model_segment)
+        calibrator_for(model_segment).update(
+            result["anomaly_score"][rows],
+            None if segments is None else [segments[i] for i in rows]
+        )
+    return result
+
+
+def result_rows(result, explain):
+    """
+    result: predict_segmented output
+    explain: per-row flags for adding feature errors and their ranking
+    """
+    rows = [
+        {
+            "anomaly_score": float(score),
+            "threshold": float(threshold),
+            "is_anomalous": bool(flag),
+            "model_version": version
+        }
+        for score, threshold, flag, version in zip(
+            result["anomaly_score"], result["thresholds"], result["is_anomalous"],
+            result["model_version"]
+        )
+    ]
+    if "feature_errors" in result:
+        for row, wanted, errors, ranking in zip(
+            rows, explain, result["feature_errors"], result["feature_ranking"]
+        ):
+            if wanted:
+                row.update(explain_row(errors, ranking))
+    return rows
+
+
+# ----------------------------
+# Micro-batching of /predict
+# ----------------------------
+def score_rows(rows):
+    """rows: (feature_vector, segment, explain) tuples"""
+    feature_vectors, segments, explain = zip(*rows)
+    result = score_and_calibrate(list(feature_vectors), list(segments), explain=any(explain))
+    return result_rows(result, explain)
+
+
+batcher = MicroBatcher(
+    score_rows,
+    max_batch_size=int(os.environ.get("PREDICT_MAX_BATCH_SIZE", 64)),
+    max_wait_ms=float(os.environ.get("PREDICT_MAX_WAIT_MS", 2.0))
+)
+
+
+feature_store = MerchantFeatureStore()
+window_store = WindowedFeatureStore()
+jobs = JobManager()
+
+
+# ----------------------------
+# Service metrics
+# ----------------------------
+REQUESTS_TOTAL = Counter(
+    "anomaly_http_requests_total", "HTTP requests", ["endpoint", "method", "status"]
+)
+REQUEST_SECONDS = Histogram(
+    "anomaly_http_request_seconds", "HTTP request latency", ["endpoint", "method"]
+)
+QUEUE_DEPTH = Gauge("anomaly_microbatch_queue_depth", "Rows waiting in the /predict micro-batcher")
+QUEUE_DEPTH.set_function(lambda: batcher.stats()["queue_depth"])
+DRIFT_PSI = Gauge("anomaly_drift_psi", "Population stability index of the serving window", ["column"])
+DRIFT_KS = Gauge("anomaly_drift_ks", "Kolmogorov-Smirnov statistic of the serving window", ["column"])
+STARTUP_SECONDS = Gauge("anomaly_startup_seconds", "Cold-start time per phase", ["phase"])
+STARTUP_SECONDS.set(startup["import_seconds"], phase="import")
+
+
+# ----------------------------
+# Lifespan: load artifacts once, then warm up
+# ----------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    artifacts = registry.load()
+    startup["load_seconds"] = time.perf_counter() - start
+    startup["engine"] = registry.resolved_engine()
+
+    # Trace / initialise both the single-row and the full micro-batch shape
+    startup["warmup_seconds"] = warmup(artifacts, batch_sizes=(1, batcher.max_batch_size))
+
+    for phase in ("load", "warmup"):
+        STARTUP_SECONDS.set(startup[f"{phase}_seconds"], phase=phase)
+
+    await batcher.start()
+    startup["ready"] = True
+    yield
+    startup["ready"] = False
+    await batcher.stop()
+    jobs.shutdown()
 
 
 # ----------------------------
@@ -11,10 +173,29 @@ from anomaly_detector.infer import predict_anomaly
 app = FastAPI(
     title="Merchant Anomaly Detection API",
     description="Unsupervised anomaly detection using an autoencoder",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template (e.g. /merchants/{merchant_id}/predict) keeps label cardinality bounded
+        route = request.scope.get("route")
+        endpoint = route.path if route is not None else "unmatched"
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start, endpoint=endpoint, method=request.method
+        )
+        REQUESTS_TOTAL.inc(endpoint=endpoint, method=request.method, status=str(status))
+
+
 # ----------------------------
 # Input schema
 # ----------------------------
@@ -25,6 +206,52 @@ class MerchantFeatures(BaseModel):
     late_night_frequency: float
     unique_customer_count: float
     time_diff_minutes: float
+    # Calibration segment, e.g. the merchant's business_type
+    segment: Optional[str] = None
+
+
+class MerchantFeatureColumns(BaseModel):
+    peak_hour: List[float]
+    average_transactions_per_hour: List[float]
+    high_value_transaction_ratio: List[float]
+    late_night_frequency: List[float]
+    unique_customer_count: List[float]
+    time_diff_minutes: List[float]
+
+
+class Transaction(BaseModel):
+    transaction_id: Optional[str] = None
+    merchant_id: str
+    customer_id: str
+    timestamp: datetime
+    amount: float
+
+
+class ScoreRequest(BaseModel):
+    transactions: List[Transaction]
+    # "rules_first" or "model_first"; defaults to hybrid.DEFAULT_FUSION
+    order: Optional[str] = None
+
+
+class BatchPredictRequest(BaseModel):
+    # Either a list of rows or the same features as parallel columns
+    merchants: Optional[List[MerchantFeatures]] = None
+    columns: Optional[MerchantFeatureColumns] = None
+    # Per-row segments when using 'columns'
+    segments: Optional[List[Optional[str]]] = None
+
+
+class JobRequest(BaseModel):
+    # "transactions" (raw rows, aggregated per merchant) or "features"
+    kind: str
+    # CSV / Parquet file name under JOBS_INPUT_DIR
+    path: str
+    format: Optional[str] = None
+
+
+class PublishCalibrationRequest(BaseModel):
+    # Minimum number of scores seen before publishing
+    min_scored: int = Field(1000, ge=1)
 
 @app.get("/")
 def root():
@@ -33,11 +260,18 @@ def root():
         "docs": "/docs"
     }
 
+
+@app.get("/ready")
+def ready():
+    if not startup["ready"]:
+        raise HTTPException(status_code=503, detail=startup)
+    return {**startup, "model_version": registry.get().version}
+
 # ----------------------------
 # Prediction endpoint
 # ----------------------------
 @app.post("/predict")
-def predict(features: MerchantFeatures):
+async def predict(features: MerchantFeatures, explain: bool = True):
     try:
         feature_vector = [
             features.peak_hour,
@@ -48,8 +282,337 @@ def predict(features: MerchantFeatures):
             features.time_diff_minutes
         ]
 
-        result = predict_anomaly(feature_vector)
+        result = await batcher.submit((feature_vector, features.segment, explain))
         return result
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+# ----------------------------
+# Batch prediction endpoint
+# ----------------------------
+@app.post("/predict/batch")
+def predict_batch(request: BatchPredictRequest, explain: bool = True):
+    if (request.merchants is None) == (request.columns is None):
+        raise HTTPException(
+            status_code=422,
+            detail="Provide exactly one of 'merchants' or 'columns'"
+        )
+
+    if request.columns is not None:
+        features = request.columns.model_dump()
+        if len({len(values) for values in features.values()}) > 1:
+            raise HTTPException(
+                status_code=422,
+                detail="All feature columns must have the same length"
+            )
+        segments = request.segments
+        if segments is not None and len(segments) != len(features["peak_hour"]):
+            raise HTTPException(
+                status_code=422,
+                detail="'segments' must have one entry per row"
+            )
+    else:
+        segments = [m.segment for m in request.merchants]
+        features = [
+            [
+                m.peak_hour,
+                m.average_transactions_per_hour,
+                m.high_value_transaction_ratio,
+                m.late_night_frequency,
+                m.unique_customer_count,
+                m.time_diff_minutes
+            ]
+            for m in request.merchants
+        ]
+
+    try:
+        result = score_and_calibrate(features, segments, explain=explain)
+
+        return {
+            "threshold": result["threshold"],
+            "model_version": result["default_model_version"],
+            "results": result_rows(result, [explain] * len(result["anomaly_score"]))
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ----------------------------
+# Hybrid rules + autoencoder scoring
+# ----------------------------
+@app.post("/score")
+def score(request: ScoreRequest):
+    if not request.transactions:
+        raise HTTPException(status_code=422, detail="No transactions provided")
+
+    config = {"order": request.order} if request.order else None
+    try:
+        artifacts = registry.get()
+        results = score_transactions(
+            [t.model_dump() for t in request.transactions],
+            config=config,
+            artifacts=artifacts
+        )
+        return {"model_version": artifacts.version, "results": results}
+
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ----------------------------
+# Threshold calibration
+# ----------------------------
+def calibration_status(artifacts, model_calibrator):
+    return {
+        "serving": {
+            "model_version": artifacts.version,
+            "default": artifacts.threshold,
+            "segments": artifacts.segment_thresholds or {}
+        },
+        "calibrated": model_calibrator.threshold_table()
+    }
+
+
+@app.get("/calibration")
+def calibration():
+    return {
+        **calibration_status(registry.get(), calibrator),
+        "segment_models": {
+            segment: calibration_status(segment_models.get(segment), model_calibrator)
+            for segment, model_calibrator in sorted(segment_calibrators.items())
+            if segment_models.has_bundle(segment)
+        },
+    }
+
+
+@app.post("/calibration/publish")
+def publish_calibration(request: PublishCalibrationRequest):
+    """
+    Publish each model's calibrated thresholds next to its weights: the
+    default model's thresholds.json and one per segment bundle. Models
+    with fewer than `min_scored` scores are left as they are.
+    """
+    response = {"segment_models": {}, "skipped": {}}
+
+    # Written atomically; the registries pick them up on their next check
+    table = calibrator.threshold_table()
+    if table["counts"]["all"] >= request.min_scored:
+        table = write_threshold_table(table)
+        response.update(model_version=registry.load().version, **table)
+    else:
+        response["skipped"]["default"] = table["counts"]["all"]
+
+    for segment, model_calibrator in sorted(segment_calibrators.items()):
+        table = model_calibrator.threshold_table()
+        if not segment_models.has_bundle(segment) or table["counts"]["all"] < request.min_scored:
+            response["skipped"][segment] = table["counts"]["all"]
+            continue
+
+        table = write_threshold_table(
+            table, os.path.join(segment_models.bundle_dir(segment), "thresholds.json")
+        )
+        segment_models.reload(segment)
+        response["segment_models"][segment] = {
+            "model_version": segment_models.get(segment).version, **table
+        }
+
+    if "model_version" not in response and not response["segment_models"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"No model has {request.min_scored} scores yet: {response['skipped']}"
+        )
+    return response
+
+
+# ----------------------------
+# Per-segment models
+# ----------------------------
+@app.get("/segments")
+def segments():
+    return segment_models.stats()
+
+
+# ----------------------------
+# Drift monitoring
+# ----------------------------
+@app.get("/drift")
+def drift():
+    artifacts = registry.get()
+    return {
+        "model_version": artifacts.version,
+        **drift_monitor.report(artifacts.reference),
+        # Bundles are compared with their own drift_reference.npz
+        "segment_models": segment_models.drift_reports(),
+    }
+
+
+@app.post("/drift/reset")
+def reset_drift():
+    drift_monitor.reset()
+    segment_models.reset_drift()
+    return {"window_size": 0}
+
+
+# ----------------------------
+# Bulk scoring jobs
+# ----------------------------
+def _submit_job(job_id, kind, path, file_format):
+    try:
+        return jobs.submit(job_id, kind, path, file_format)
+    except ValueError as e:
+        jobs.discard(job_id)
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/jobs", status_code=202)
+def submit_job(request: JobRequest):
+    # Only files under JOBS_INPUT_DIR; checked before a job directory exists
+    file_format = request.format or ("parquet" if request.path.endswith(".parquet") else "csv")
+    try:
+        validate_job(request.kind, file_format)
+        path = jobs.input_path(request.path)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _submit_job(jobs.new_job(), request.kind, path, file_format)
+
+
+@app.post("/jobs/upload", status_code=202)
+async def upload_job(request: Request, kind: str, format: str = "csv"):
+    try:
+        validate_job(kind, format)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    # The request body is the file itself, streamed to disk
+    job_id = jobs.new_job()
+    path = os.path.join(jobs.job_dir(job_id), f"input.{format}")
+    try:
+        with open(path, "wb") as f:
+            async for chunk in request.stream():
+                f.write(chunk)
+    except BaseException:
+        jobs.discard(job_id)
+        raise
+    return _submit_job(job_id, kind, path, format)
+
+
+@app.get("/jobs")
+def list_jobs():
+    return {"jobs": jobs.list()}
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    status = jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return status
+
+
+@app.get("/jobs/{job_id}/results")
+def job_results(job_id: str, offset: int = 0, limit: int = 1000):
+    if offset < 0 or not 0 < limit <= 10000:
+        raise HTTPException(status_code=422, detail="offset must be >= 0 and 0 < limit <= 10000")
+
+    rows = jobs.results(job_id, offset, limit)
+    if rows is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+
+    status = jobs.status(job_id)
+    available = status["rows_scored"]
+    return {
+        "job_id": job_id,
+        "state": status["state"],
+        "offset": offset,
+        "limit": limit,
+        "rows_available": available,
+        "rows_total": status["rows_total"],
+        "next_offset": offset + len(rows) if offset + len(rows) < available else None,
+        "results": rows,
+    }
+
+
+# ----------------------------
+# Batching metrics
+# ----------------------------
+@app.get("/stats/batching")
+def batching_stats():
+    return batcher.stats()
+
+
+@app.get("/stats/cache")
+def cache_stats():
+    return score_cache.stats()
+
+
+# ----------------------------
+# Feature store endpoints
+# ----------------------------
+@app.post("/transactions")
+def ingest_transactions(transactions: List[Transaction]):
+    # One UTC-naive clock for both stores, so mixed aware / naive
+    # timestamps compare and the stores stay in step
+    records = [{**t.model_dump(), "timestamp": utc_naive(t.timestamp)} for t in transactions]
+    ingested = feature_store.ingest_many(records)
+    window_store.ingest_many(records)
+    return {"ingested": ingested, "merchants": len(feature_store)}
+
+
+@app.get("/merchants/{merchant_id}/features")
+def merchant_features(merchant_id: str):
+    features = feature_store.features(merchant_id)
+    if features is None:
+        raise HTTPException(status_code=404, detail=f"Unknown merchant {merchant_id}")
+    return {
+        "merchant_id": merchant_id,
+        "transaction_count": feature_store.transaction_count(merchant_id),
+        # time_diff_minutes is NaN until the second transaction
+        "features": {k: None if isinstance(v, float) and math.isnan(v) else v for k, v in features.items()}
+    }
+
+
+@app.get("/merchants/{merchant_id}/windows")
+def merchant_windows(merchant_id: str):
+    windows = window_store.features(merchant_id)
+    if windows is None:
+        raise HTTPException(status_code=404, detail=f"Unknown merchant {merchant_id}")
+    return {"merchant_id": merchant_id, "windows": windows}
+
+
+@app.post("/merchants/{merchant_id}/predict")
+async def predict_merchant(merchant_id: str, explain: bool = True):
+    features = feature_store.features(merchant_id)
+    if features is None:
+        raise HTTPException(status_code=404, detail=f"Unknown merchant {merchant_id}")
+    if feature_store.transaction_count(merchant_id) < 2:
+        raise HTTPException(
+            status_code=422,
+            detail="At least two transactions are needed to compute time_diff_minutes"
+        )
+
+    try:
+        result = await batcher.submit(([features[c] for c in FEATURE_COLUMNS], None, explain))
+        return {"merchant_id": merchant_id, **result, "features": features}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ----------------------------
+# Prometheus metrics
+# ----------------------------
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Refresh the drift gauges from the current window
+    for column, stats in drift_monitor.report(registry.get().reference)["columns"].items():
+        DRIFT_PSI.set(stats["psi"], column=column)
+        DRIFT_KS.set(stats["ks"], column=column)
+
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,152 @@
+import asyncio
+from collections import Counter
+
+from anomaly_detector.metrics import Histogram
+
+BATCH_SIZE = Histogram(
+    "anomaly_microbatch_size",
+    "Rows per micro-batch scored for /predict",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+
+
+# ----------------------------
+# Micro-batching scheduler
+# ----------------------------
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row requests into batched scoring calls.
+
+    Requests are queued; a background task takes the first waiting row,
+    keeps collecting until `max_batch_size` rows are queued or
+    `max_wait_ms` has passed, scores them with one `score_batch` call in
+    the default executor and resolves each caller's future with its row.
+
+    score_batch: callable taking a list of rows and returning a list of
+                 per-row results in the same order
+    """
+
+    def __init__(self, score_batch, max_batch_size=64, max_wait_ms=2.0):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = None
+        self._worker = None
+        # Rows taken off the queue by the worker and not yet resolved
+        self._in_flight = []
+
+        # Metrics
+        self.requests_total = 0
+        self.batches_total = 0
+        self.largest_batch = 0
+        self.batch_sizes = Counter()
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+        # Fail both the batch the worker was collecting or scoring and the
+        # rows still queued, so no caller waits forever
+        pending, self._in_flight = self._in_flight, []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+
+    # ----------------------------
+    # Request path
+    # ----------------------------
+    async def submit(self, row):
+        if self._worker is None:
+            raise RuntimeError("Batcher is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((row, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = self._in_flight = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect()
+            rows = [row for row, _ in batch]
+
+            self.requests_total += len(batch)
+            self.batches_total += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.batch_sizes[_size_bucket(len(batch))] += 1
+            BATCH_SIZE.observe(len(batch))
+
+            try:
+                results = await loop.run_in_executor(None, self.score_batch, rows)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self._in_flight = []
+                continue
+
+            for (_, future), result in zip(batch, results):
+                # The caller may have gone away (client disconnect)
+                if not future.done():
+                    future.set_result(result)
+            self._in_flight = []
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "requests_total": self.requests_total,
+            "batches_total": self.batches_total,
+            "mean_batch_size": (
+                self.requests_total / self.batches_total
+                if self.batches_total else 0.0
+            ),
+            "largest_batch": self.largest_batch,
+            "batch_size_histogram": {
+                f"<={bucket}": self.batch_sizes[bucket]
+                for bucket in sorted(self.batch_sizes)
+            },
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0
+        }
+
+
+def _size_bucket(size):
+    # Power-of-two upper bound: 1, 2, 4, 8, ...
+    return 1 << (size - 1).bit_length()
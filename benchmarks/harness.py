@@ -0,0 +1,47 @@
+import statistics
+import time
+
+
+def time_call(fn, *args, rounds=5, warmup=1, **kwargs):
+    """
+    Call fn(*args, **kwargs) `warmup` + `rounds` times.
+    returns: (last result, timing stats in seconds)
+    """
+    for _ in range(warmup):
+        result = fn(*args, **kwargs)
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+
+    return result, {
+        "rounds": rounds,
+        "min": min(timings),
+        "max": max(timings),
+        "mean": statistics.fmean(timings),
+        "median": statistics.median(timings),
+        "stddev": statistics.stdev(timings) if rounds > 1 else 0.0,
+    }
+
+
+class Benchmark:
+    """
+    Stand-in for pytest-benchmark's `benchmark` fixture when the plugin is
+    not installed: `benchmark(fn, *args, **kwargs)` times the call with
+    time_call and returns its result; the timings are kept in `stats`.
+    """
+
+    def __init__(self, rounds=3, warmup=1):
+        self.rounds = rounds
+        self.warmup = warmup
+        self.stats = None
+
+    def __call__(self, fn, *args, **kwargs):
+        result, self.stats = time_call(fn, *args, rounds=self.rounds, warmup=self.warmup, **kwargs)
+        return result
+
+    def pedantic(self, fn, args=(), kwargs=None, rounds=1, warmup_rounds=0, iterations=1):
+        result, self.stats = time_call(fn, *args, rounds=rounds, warmup=warmup_rounds, **(kwargs or {}))
+        return result
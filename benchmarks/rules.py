@@ -0,0 +1,114 @@
+"""
+Benchmark rules.apply_rule_based_scoring against the original row-wise
+implementation and check both produce the same scores.
+
+    python -m anomaly_detector.benchmarks.rules --transactions 100000 1000000 10000000
+"""
+import argparse
+import json
+
+import pandas as pd
+
+from anomaly_detector.benchmarks.harness import time_call
+from anomaly_detector.data_generator import generate_dataset_columnar
+from anomaly_detector.rules import apply_rule_based_scoring
+
+
+# ----------------------------
+# Reference implementation
+# ----------------------------
+def legacy_apply_rule_based_scoring(transactions):
+    # As originally written, plus observed=True / int64 casts so it also
+    # accepts the categorical ids produced by generate_dataset_columnar
+    df = pd.DataFrame(transactions)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df["hour"] = df["timestamp"].dt.hour
+
+    txn_counts = (
+        df.groupby(["merchant_id", "hour"], observed=True)
+        .size()
+        .reset_index(name="transaction_count")
+    )
+    high_velocity_merchants = set(
+        txn_counts[txn_counts["transaction_count"] > 3]["merchant_id"]
+    )
+
+    business_start, business_end = 9, 18
+    df["odd_hour_score"] = df["hour"].apply(
+        lambda x: 1 if x < business_start or x > business_end else 0
+    )
+
+    cust_counts = (
+        df.groupby(["merchant_id", "customer_id"], observed=True)
+        .size()
+        .reset_index(name="count")
+    )
+    high_concentration_merchants = set(
+        cust_counts[cust_counts["count"] >= 2]["merchant_id"]
+    )
+
+    df["high_velocity_score"] = df["merchant_id"].apply(
+        lambda x: 1 if x in high_velocity_merchants else 0
+    ).astype("int64")
+    df["customer_concentration_score"] = df["merchant_id"].apply(
+        lambda x: 1 if x in high_concentration_merchants else 0
+    ).astype("int64")
+
+    df["rule_anomaly_score"] = (
+        df["high_velocity_score"]
+        + df["odd_hour_score"]
+        + df["customer_concentration_score"]
+    )
+
+    return df[
+        [
+            "merchant_id",
+            "transaction_id",
+            "rule_anomaly_score",
+            "high_velocity_score",
+            "odd_hour_score",
+            "customer_concentration_score",
+        ]
+    ]
+
+
+# ----------------------------
+# Benchmark
+# ----------------------------
+def run(transaction_counts, rounds=3, legacy_limit=1_000_000, seed=0):
+    results = []
+    for n_transactions in transaction_counts:
+        transactions = generate_dataset_columnar(max(n_transactions // 30, 1), seed=seed)
+
+        actual, current = time_call(
+            apply_rule_based_scoring, transactions, rounds=rounds
+        )
+        result = {
+            "transactions": len(transactions),
+            "current": current,
+            "transactions_per_second": len(transactions) / current["median"],
+        }
+
+        # The row-wise version is too slow to run at the largest sizes
+        if len(transactions) <= legacy_limit:
+            expected, legacy = time_call(
+                legacy_apply_rule_based_scoring, transactions, rounds=rounds
+            )
+            pd.testing.assert_frame_equal(actual, expected)
+            result["legacy"] = legacy
+            result["speedup"] = legacy["median"] / current["median"]
+
+        results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--transactions", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000]
+    )
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--legacy-limit", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.transactions, args.rounds, args.legacy_limit), indent=2))
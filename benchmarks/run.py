@@ -0,0 +1,226 @@
+"""
+Benchmark every pipeline stage across dataset sizes and write JSON results.
+
+    python -m anomaly_detector.benchmarks.run --merchants 1000 10000 --output bench.json
+    python -m anomaly_detector.benchmarks.run --merchants 1000 --compare bench.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from anomaly_detector.benchmarks.harness import time_call
+from anomaly_detector.data_generator import generate_dataset, generate_dataset_columnar
+from anomaly_detector.infer import FEATURE_COLUMNS, ArtifactRegistry, predict_anomaly, predict_anomaly_batch
+from anomaly_detector.preprocess import build_feature_dataframe
+from anomaly_detector.rules import apply_rule_based_scoring
+
+STAGES = ["generation", "features", "rules", "training", "inference"]
+
+
+# ----------------------------
+# Stages
+# ----------------------------
+def bench_generation(num_merchants, rounds, seed):
+    _, legacy = time_call(generate_dataset, num_merchants, rounds=rounds, warmup=0)
+    _, columnar = time_call(
+        generate_dataset_columnar, num_merchants, seed=seed, rounds=rounds
+    )
+    return {"generate_dataset": legacy, "generate_dataset_columnar": columnar}
+
+
+def bench_features(transactions, rounds):
+    _, stats = time_call(build_feature_dataframe, transactions, rounds=rounds)
+    stats["rows_per_second"] = len(transactions) / stats["median"]
+    return {"build_feature_dataframe": stats}
+
+
+def bench_rules(transactions, rounds):
+    _, stats = time_call(apply_rule_based_scoring, transactions, rounds=rounds)
+    stats["rows_per_second"] = len(transactions) / stats["median"]
+    return {"apply_rule_based_scoring": stats}
+
+
+def bench_training(X, epochs, batch_size):
+    from anomaly_detector.model import build_autoencoder
+
+    autoencoder = build_autoencoder(input_dim=X.shape[1])
+    # First epoch includes graph tracing; time the rest separately
+    start = time.perf_counter()
+    autoencoder.fit(X, X, epochs=1, batch_size=batch_size, verbose=0)
+    first_epoch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    autoencoder.fit(X, X, epochs=epochs, batch_size=batch_size, verbose=0)
+    elapsed = time.perf_counter() - start
+
+    return {"build_autoencoder.fit": {
+        "samples": len(X),
+        "batch_size": batch_size,
+        "first_epoch_seconds": first_epoch,
+        "epochs": epochs,
+        "epochs_per_second": epochs / elapsed,
+        "samples_per_second": epochs * len(X) / elapsed,
+    }}
+
+
+def _single_row_latencies(rows, artifacts, use_cache):
+    latencies = []
+    for row in rows:
+        start = time.perf_counter()
+        predict_anomaly(row, artifacts=artifacts, use_cache=use_cache)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies)
+
+    return {
+        "calls": len(latencies),
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+        "p99": float(np.percentile(latencies, 99)),
+        "calls_per_second": len(latencies) / latencies.sum(),
+    }
+
+
+def bench_inference(X, artifacts, single_calls, batch_rounds):
+    # Model timings bypass the score cache, which would serve every
+    # round after the first
+    single = _single_row_latencies(X[:single_calls], artifacts, use_cache=False)
+
+    _, batch = time_call(
+        predict_anomaly_batch, X, artifacts=artifacts, use_cache=False, rounds=batch_rounds
+    )
+    batch["rows"] = len(X)
+    batch["rows_per_second"] = len(X) / batch["median"]
+
+    # Repeats of already-scored rows, served from the cache
+    rows = X[:single_calls]
+    predict_anomaly_batch(rows, artifacts=artifacts)
+    cached = _single_row_latencies(rows, artifacts, use_cache=True)
+
+    return {
+        "predict_anomaly": single,
+        "predict_anomaly.cached": cached,
+        "predict_anomaly_batch": batch,
+    }
+
+
+# ----------------------------
+# Runner
+# ----------------------------
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(args):
+    stages = args.stages or STAGES
+    artifacts = ArtifactRegistry(engine=args.engine).load()
+    results = {"environment": environment(), "engine": args.engine, "sizes": []}
+
+    for num_merchants in args.merchants:
+        size = {"merchants": num_merchants, "stages": {}}
+        transactions = generate_dataset_columnar(num_merchants, seed=args.seed)
+        size["transactions"] = len(transactions)
+
+        if "generation" in stages:
+            size["stages"]["generation"] = bench_generation(num_merchants, args.rounds, args.seed)
+        if "features" in stages:
+            size["stages"]["features"] = bench_features(transactions, args.rounds)
+        if "rules" in stages:
+            size["stages"]["rules"] = bench_rules(transactions, args.rounds)
+
+        if "training" in stages or "inference" in stages:
+            X = build_feature_dataframe(transactions)[FEATURE_COLUMNS].to_numpy(dtype=float)
+            if "training" in stages:
+                X_scaled = artifacts.scaler.transform(X)
+                size["stages"]["training"] = bench_training(X_scaled, args.epochs, args.batch_size)
+            if "inference" in stages:
+                size["stages"]["inference"] = bench_inference(
+                    X, artifacts, args.single_calls, args.rounds
+                )
+
+        results["sizes"].append(size)
+    return results
+
+
+# ----------------------------
+# Comparison
+# ----------------------------
+def _timings(results):
+    # Flatten to {(merchants, stage, benchmark, metric): seconds}
+    flat = {}
+    for size in results["sizes"]:
+        for stage, benchmarks in size["stages"].items():
+            for name, stats in benchmarks.items():
+                for metric in ("median", "p50", "p99"):
+                    if metric in stats:
+                        flat[(size["merchants"], stage, name, metric)] = stats[metric]
+    return flat
+
+
+def compare(baseline, current, tolerance):
+    """Print current / baseline time ratios; returns True if any regressed."""
+    before, after = _timings(baseline), _timings(current)
+    regressed = False
+
+    for key in sorted(before.keys() & after.keys()):
+        ratio = after[key] / before[key]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressed = True
+        merchants, stage, name, metric = key
+        print(f"{merchants:>8} {stage:<11} {name:<28} {metric:<6} {ratio:6.2f}x{flag}")
+
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--merchants", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=["auto", "numpy", "keras", "onnx", "tflite"], default="auto")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--single-calls", type=int, default=200)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--compare", help="Baseline JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed slowdown before a benchmark counts as regressed")
+    args = parser.parse_args()
+
+    results = run(args)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(json.load(f), results, args.tolerance):
+                sys.exit(1)
@@ -0,0 +1,244 @@
+"""
+Recalibrate anomaly thresholds from scored traffic.
+
+    python -m anomaly_detector.calibration scores.csv --segment-column business_type
+"""
+import argparse
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ----------------------------
+# Quantile sketch
+# ----------------------------
+class KLLSketch:
+    """
+    Mergeable KLL quantile sketch (Karnin, Lang & Liberty, 2016).
+
+    Items are kept in a hierarchy of compactors; level h items weigh 2**h.
+    Until the first compaction (about 3 * k items) quantiles are exact,
+    afterwards the rank error is roughly 1.65 / k with O(k) memory.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def _max_size(self):
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self):
+        while sum(len(level) for level in self.levels) >= self._max_size():
+            for h, level in enumerate(self.levels):
+                if len(level) < self._capacity(h):
+                    continue
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+
+                # Keep every other item of the sorted level (random offset)
+                # at twice the weight; an odd item out stays behind
+                level = np.sort(level)
+                keep = len(level) - len(level) % 2
+                promoted = level[self._rng.integers(2):keep:2]
+                self.levels[h] = level[keep:]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                break
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        if self.n == 0:
+            return math.nan
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level), 2 ** h) for h, level in enumerate(self.levels)
+        ])
+        order = np.argsort(values, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(values[order][min(index, len(values) - 1)])
+
+    def to_dict(self):
+        return {"k": self.k, "n": self.n, "levels": [level.tolist() for level in self.levels]}
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(k=state["k"])
+        sketch.n = state["n"]
+        sketch.levels = [np.asarray(level, dtype=np.float64) for level in state["levels"]]
+        return sketch
+
+
+# ----------------------------
+# Threshold calibration
+# ----------------------------
+class ThresholdCalibrator:
+    """
+    Streaming per-segment thresholds: one sketch over all scores plus one
+    per segment (e.g. business_type). Segments with fewer than
+    `min_count` scores fall back to the global threshold.
+    """
+
+    def __init__(self, quantile=0.95, k=200, min_count=100):
+        self.quantile = quantile
+        self.k = k
+        self.min_count = min_count
+        self.overall = KLLSketch(k)
+        self.segments = {}
+        self._lock = threading.Lock()
+
+    def update(self, scores, segments=None):
+        scores = np.asarray(scores, dtype=np.float64)
+        with self._lock:
+            self.overall.update(scores)
+            if segments is None:
+                return
+
+            segments = np.asarray(segments, dtype=object)
+            for segment in set(segments.tolist()):
+                if segment is None:
+                    continue
+                if segment not in self.segments:
+                    self.segments[segment] = KLLSketch(self.k)
+                self.segments[segment].update(scores[segments == segment])
+
+    def merge(self, other):
+        with self._lock:
+            self.overall.merge(other.overall)
+            for segment, sketch in other.segments.items():
+                self.segments.setdefault(segment, KLLSketch(self.k)).merge(sketch)
+        return self
+
+    def threshold_table(self):
+        """
+        returns: {"quantile", "default", "segments", "counts"} as consumed
+                 by infer.ArtifactRegistry
+        """
+        with self._lock:
+            default = self.overall.quantile(self.quantile)
+            return {
+                "quantile": self.quantile,
+                "default": default,
+                "segments": {
+                    segment: sketch.quantile(self.quantile)
+                    for segment, sketch in self.segments.items()
+                    if sketch.n >= self.min_count
+                },
+                "counts": {"all": self.overall.n, **{
+                    segment: sketch.n for segment, sketch in self.segments.items()
+                }},
+            }
+
+    # ----------------------------
+    # Persistence
+    # ----------------------------
+    def save(self, path):
+        with self._lock:
+            state = {
+                "quantile": self.quantile,
+                "k": self.k,
+                "min_count": self.min_count,
+                "overall": self.overall.to_dict(),
+                "segments": {s: sketch.to_dict() for s, sketch in self.segments.items()},
+            }
+        _write_json(path, state)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        calibrator = cls(state["quantile"], state["k"], state["min_count"])
+        calibrator.overall = KLLSketch.from_dict(state["overall"])
+        calibrator.segments = {
+            segment: KLLSketch.from_dict(sketch) for segment, sketch in state["segments"].items()
+        }
+        return calibrator
+
+
+def write_threshold_table(table, path="thresholds.json"):
+    """
+    Atomically write a threshold table; the serving registry hot-reloads it.
+    Segment thresholds that are not finite are left out (a NaN threshold
+    would never flag anything), and a non-finite default is rejected.
+    returns: the table as written
+    """
+    if not math.isfinite(table["default"]):
+        raise ValueError(f"Default threshold is not finite: {table['default']}")
+    table = {**table, "segments": {
+        segment: threshold for segment, threshold in table["segments"].items()
+        if math.isfinite(threshold)
+    }}
+    _write_json(os.path.join(BASE_DIR, path), table)
+    return table
+
+
+def _write_json(path, payload):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("scores", help="CSV or Parquet file of scored rows")
+    parser.add_argument("--score-column", default="anomaly_score")
+    parser.add_argument("--segment-column")
+    parser.add_argument("--quantile", type=float, default=0.95)
+    parser.add_argument("--min-count", type=int, default=100)
+    parser.add_argument("--state", default=os.path.join(BASE_DIR, "calibration_state.json"),
+                        help="Sketch state to update incrementally (created if missing)")
+    parser.add_argument("--output", default="thresholds.json")
+    args = parser.parse_args()
+
+    if os.path.exists(args.state):
+        calibrator = ThresholdCalibrator.load(args.state)
+    else:
+        calibrator = ThresholdCalibrator(args.quantile, min_count=args.min_count)
+
+    read = pd.read_parquet if args.scores.endswith(".parquet") else pd.read_csv
+    columns = [args.score_column] + ([args.segment_column] if args.segment_column else [])
+    scored = read(args.scores, columns=columns) if read is pd.read_parquet else read(args.scores, usecols=columns)
+
+    calibrator.update(
+        scored[args.score_column],
+        scored[args.segment_column].astype(object) if args.segment_column else None
+    )
+    calibrator.save(args.state)
+
+    table = calibrator.threshold_table()
+    write_threshold_table(table, args.output)
+    print(json.dumps(table, indent=2))
@@ -1,8 +1,14 @@
 #Merchant data generation
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from faker import Faker
 from datetime import datetime, timedelta
 
+import numpy as np
+import pandas as pd
+
 faker = Faker()
 
 def generate_merchant_profiles(count):       # generate_merchant_base
@@ -173,4 +179,161 @@ def generate_dataset(num_merchants=1000):
 
 # # Display example
 # for txn in transactions[24000:24010]:
-#    print(txn)
\ No newline at end of file
+#    print(txn)
+
+
+
+# ----------------------------
+# Columnar (vectorized) generation
+# ----------------------------
+# Same per-pattern semantics as generate_normal_transactions /
+# generate_anomalous_transactions, drawn with NumPy for a whole shard of
+# merchants at once and returned as a DataFrame instead of dicts.
+TRANSACTIONS_PER_MERCHANT = 30
+PATTERNS = ["late_night", "high_velocity", "customer_concentration"]
+LATE_NIGHT_HOURS = [23, 0, 1, 2, 3, 4]
+
+# (low, high) amount range per kind: normal, then PATTERNS in order
+AMOUNT_RANGES = np.array([
+    [100, 1000],
+    [5000, 20000],
+    [2000, 10000],
+    [3000, 15000],
+])
+
+
+@lru_cache(maxsize=None)
+def _id_categories(prefix, low, high):
+    # Id strings are built once per process and referenced by integer codes
+    return pd.Index([f"{prefix}{i}" for i in range(low, high)])
+
+
+def _generate_shard(start, stop, num_normal, seed_sequence, now):
+    rng = np.random.default_rng(seed_sequence)
+    n_merchants = stop - start
+    n = n_merchants * TRANSACTIONS_PER_MERCHANT
+
+    # 0 = normal, 1.. = index into PATTERNS + 1
+    kind = np.where(
+        np.arange(start, stop) < num_normal,
+        0,
+        rng.integers(1, len(PATTERNS) + 1, size=n_merchants)
+    )
+    txn_kind = np.repeat(kind, TRANSACTIONS_PER_MERCHANT)
+
+    # Customers: random per transaction, one constant customer for concentration
+    customer_codes = rng.integers(0, 9000, size=n)
+    constant_customer = np.repeat(rng.integers(0, 9000, size=n_merchants), TRANSACTIONS_PER_MERCHANT)
+    is_concentration = txn_kind == PATTERNS.index("customer_concentration") + 1
+    customer_codes = np.where(is_concentration, constant_customer, customer_codes)
+
+    # Timestamps: normal spread over the last 30 days at the current time of
+    # day, late_night today at a late hour, the rest all at `now`
+    now64 = np.datetime64(now, "s")
+    midnight = now64.astype("datetime64[D]").astype("datetime64[s]")
+    days_back = rng.integers(0, 31, size=n).astype("timedelta64[D]")
+    late_hour = rng.choice(LATE_NIGHT_HOURS, size=n).astype("timedelta64[h]")
+    late_minute = rng.integers(0, 60, size=n).astype("timedelta64[m]")
+
+    timestamps = np.full(n, now64)
+    is_normal = txn_kind == 0
+    is_late = txn_kind == PATTERNS.index("late_night") + 1
+    timestamps[is_normal] = now64 - days_back[is_normal]
+    timestamps[is_late] = midnight + late_hour[is_late] + late_minute[is_late]
+
+    low, high = AMOUNT_RANGES[txn_kind, 0], AMOUNT_RANGES[txn_kind, 1]
+    amounts = np.round(low + (high - low) * rng.random(n), 2)
+
+    merchant_ids = pd.Index([f"M{1000 + i}" for i in range(start, stop)])
+
+    return pd.DataFrame({
+        "transaction_id": pd.Categorical.from_codes(
+            rng.integers(0, 900000, size=n), _id_categories("T", 100000, 1000000)
+        ),
+        "merchant_id": pd.Categorical.from_codes(
+            np.repeat(np.arange(n_merchants), TRANSACTIONS_PER_MERCHANT), merchant_ids
+        ),
+        "customer_id": pd.Categorical.from_codes(
+            customer_codes, _id_categories("C", 1000, 10000)
+        ),
+        "timestamp": timestamps,
+        "amount": amounts,
+        "status": pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), ["completed"]),
+        "is_anomalous": txn_kind != 0,
+        "pattern": pd.Categorical.from_codes(txn_kind - 1, PATTERNS),
+    })
+
+
+def _shards(num_merchants, seed, shard_size, now):
+    num_normal = int(num_merchants * 0.8)  # 80% normal, as in generate_transactions_for_merchants
+    starts = range(0, num_merchants, shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    now = now or datetime.now().replace(microsecond=0)
+
+    return [
+        (start, min(start + shard_size, num_merchants), num_normal, seed_sequence, now)
+        for start, seed_sequence in zip(starts, seeds)
+    ]
+
+
+def _run_shards(fn, shards, n_jobs):
+    if n_jobs == 1 or len(shards) == 1:
+        return [fn(*shard) for shard in shards]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return list(pool.map(fn, *zip(*shards)))
+
+
+def generate_dataset_columnar(
+    num_merchants=1000,
+    seed=None,
+    n_jobs=1,
+    shard_size=50_000,
+    now=None
+):
+    """
+    Vectorized equivalent of generate_dataset returning a DataFrame.
+
+    Merchants are generated in shards of `shard_size`, each with its own
+    child of SeedSequence(seed), so output for a given seed does not depend
+    on `n_jobs`. Merchant ids are unique (M1000, M1001, ...).
+    """
+    frames = _run_shards(
+        _generate_shard, _shards(num_merchants, seed, shard_size, now), n_jobs
+    )
+    if len(frames) == 1:
+        return frames[0]
+
+    merchant_ids = pd.api.types.union_categoricals(
+        [frame["merchant_id"] for frame in frames]
+    )
+    df = pd.concat(frames, ignore_index=True)
+    df["merchant_id"] = merchant_ids
+    return df
+
+
+def _write_shard(output_dir, start, stop, num_normal, seed_sequence, now):
+    path = os.path.join(output_dir, f"part-{start:09d}.parquet")
+    _generate_shard(start, stop, num_normal, seed_sequence, now).to_parquet(path, index=False)
+    return path
+
+
+def write_dataset_parquet(
+    output_dir,
+    num_merchants=1000,
+    seed=None,
+    n_jobs=os.cpu_count(),
+    shard_size=50_000,
+    now=None
+):
+    """
+    Generate shards in a process pool and write each straight to
+    `output_dir/part-*.parquet` (requires pyarrow).
+    returns: list of written file paths
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    shards = [
+        (output_dir, *shard)
+        for shard in _shards(num_merchants, seed, shard_size, now)
+    ]
+    return _run_shards(_write_shard, shards, n_jobs)
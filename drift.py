@@ -0,0 +1,244 @@
+"""
+Score and feature drift against the training distribution.
+
+    python -m anomaly_detector.drift --merchants 1000 --seed 0
+"""
+import argparse
+import os
+import threading
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Rule-of-thumb PSI levels: < 0.1 stable, 0.1 - 0.2 moderate shift, > 0.2 drift
+PSI_WARNING = 0.1
+PSI_DRIFT = 0.2
+
+
+# ----------------------------
+# Training reference
+# ----------------------------
+class ReferenceProfile:
+    """
+    Training-time distribution of each monitored column, summarised as
+    PSI bin edges with their proportions and a fixed grid of quantiles
+    (for KS), so it stays a few KB regardless of the training set size.
+    """
+
+    def __init__(self, columns, edges, proportions, quantiles, means):
+        self.columns = list(columns)
+        self.edges = edges
+        self.proportions = proportions
+        self.quantiles = quantiles
+        self.means = means
+
+    @classmethod
+    def from_samples(cls, samples, columns, bins=10, n_quantiles=201):
+        """
+        samples: array of shape (n_samples, n_columns)
+        """
+        samples = np.asarray(samples, dtype=float)
+        probs = np.linspace(0, 1, n_quantiles)
+        quantiles = np.quantile(samples, probs, axis=0).T
+
+        edges, proportions = [], []
+        for column in samples.T:
+            # Interior edges at reference quantiles; discrete columns
+            # (e.g. peak_hour) collapse duplicates into fewer bins
+            interior = np.unique(np.quantile(column, np.linspace(0, 1, bins + 1)[1:-1]))
+            counts = np.bincount(
+                np.searchsorted(interior, column, side="right"),
+                minlength=len(interior) + 1
+            )
+            edges.append(interior)
+            proportions.append(counts / len(column))
+
+        return cls(columns, edges, proportions, quantiles, samples.mean(axis=0))
+
+    def save(self, path):
+        arrays = {
+            "columns": np.array(self.columns),
+            "quantiles": self.quantiles,
+            "means": self.means,
+        }
+        for i, (edges, proportions) in enumerate(zip(self.edges, self.proportions)):
+            arrays[f"edges_{i}"] = edges
+            arrays[f"proportions_{i}"] = proportions
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            columns = [str(c) for c in data["columns"]]
+            return cls(
+                columns,
+                [data[f"edges_{i}"] for i in range(len(columns))],
+                [data[f"proportions_{i}"] for i in range(len(columns))],
+                data["quantiles"],
+                data["means"],
+            )
+
+
+def population_stability_index(values, edges, reference_proportions, eps=1e-4):
+    counts = np.bincount(
+        np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1
+    )
+    actual = np.maximum(counts / len(values), eps)
+    expected = np.maximum(reference_proportions, eps)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_statistic(values, reference_quantiles):
+    """
+    Two-sample KS distance between `values` and a reference given by its
+    quantiles at evenly spaced probabilities.
+    """
+    values = np.sort(values)
+    probs = np.linspace(0, 1, len(reference_quantiles))
+    points = np.concatenate([values, reference_quantiles])
+
+    window_cdf = np.searchsorted(values, points, side="right") / len(values)
+    reference_cdf = np.interp(points, reference_quantiles, probs, left=0.0, right=1.0)
+    return float(np.max(np.abs(window_cdf - reference_cdf)))
+
+
+# ----------------------------
+# Serving window
+# ----------------------------
+class RingBuffer:
+    """
+    Fixed-capacity row buffer holding the most recent `capacity` rows.
+
+    Writers only serialise on reserving their slots; the copy itself
+    happens outside the lock, so concurrent scoring threads never wait
+    on each other's writes. A snapshot taken mid-write may mix in a few
+    rows of the previous lap, which is harmless for distribution stats.
+    """
+
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self._rows = np.zeros((capacity, width))
+        self._written = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    @property
+    def total(self):
+        return self._written
+
+    def extend(self, rows):
+        rows = rows[-self.capacity:]
+        with self._lock:
+            start = self._written
+            self._written += len(rows)
+
+        slots = (start + np.arange(len(rows))) % self.capacity
+        self._rows[slots] = rows
+
+    def snapshot(self):
+        return self._rows[:len(self)].copy()
+
+    def clear(self):
+        with self._lock:
+            self._written = 0
+
+
+class DriftMonitor:
+    """
+    Windowed distributions of served feature vectors and anomaly scores.
+
+    `observe` appends a batch to a ring buffer of the last `window` rows
+    (constant memory, one vectorised copy per call); `report` compares
+    the window with a ReferenceProfile using PSI and KS per column.
+    Rows with a NaN or infinite value (e.g. the time gap of a merchant
+    with one transaction) are counted but kept out of the window.
+    """
+
+    def __init__(self, columns, window=10000, min_samples=100):
+        self.columns = list(columns) + ["anomaly_score"]
+        self.min_samples = min_samples
+        self._buffer = RingBuffer(window, len(self.columns))
+        self.non_finite_total = 0
+
+    def observe(self, feature_matrix, scores):
+        if not len(scores):
+            return
+        rows = np.column_stack([feature_matrix, scores])
+        finite = np.isfinite(rows).all(axis=1)
+        if not finite.all():
+            self.non_finite_total += int(len(rows) - finite.sum())
+            rows = rows[finite]
+        if len(rows):
+            self._buffer.extend(rows)
+
+    def reset(self):
+        self._buffer.clear()
+        self.non_finite_total = 0
+
+    def report(self, reference):
+        window = self._buffer.snapshot()
+        summary = {
+            "window_size": len(window),
+            "window_capacity": self._buffer.capacity,
+            "observed_total": self._buffer.total,
+            "non_finite_total": self.non_finite_total,
+        }
+        if reference is None:
+            return {**summary, "status": "no_reference", "columns": {}}
+        if len(window) < self.min_samples:
+            return {**summary, "status": "insufficient_data", "columns": {}}
+
+        columns = {}
+        for i, name in enumerate(self.columns):
+            j = reference.columns.index(name)
+            psi = population_stability_index(
+                window[:, i], reference.edges[j], reference.proportions[j]
+            )
+            ks = ks_statistic(window[:, i], reference.quantiles[j])
+            columns[name] = {
+                "psi": psi,
+                "ks": ks,
+                "mean": float(window[:, i].mean()),
+                "reference_mean": float(reference.means[j]),
+                "status": _status(psi),
+            }
+
+        worst = max(c["psi"] for c in columns.values())
+        return {**summary, "status": _status(worst), "columns": columns}
+
+
+def _status(psi):
+    if psi > PSI_DRIFT:
+        return "drift"
+    if psi > PSI_WARNING:
+        return "warning"
+    return "ok"
+
+
+if __name__ == "__main__":
+    # Rebuild the reference for the served artifacts from the training
+    # split of a generated dataset (train.py writes it automatically)
+    from anomaly_detector.data_generator import generate_dataset_columnar
+    from anomaly_detector.infer import FEATURE_COLUMNS, ArtifactRegistry, reconstruction_errors
+    from anomaly_detector.preprocess import build_feature_dataframe
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--merchants", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--split-ratio", type=float, default=0.8)
+    parser.add_argument("--output", default=os.path.join(BASE_DIR, "drift_reference.npz"))
+    args = parser.parse_args()
+
+    features = build_feature_dataframe(generate_dataset_columnar(args.merchants, seed=args.seed))
+    X = features[FEATURE_COLUMNS].to_numpy(dtype=float)[:int(len(features) * args.split_ratio)]
+
+    artifacts = ArtifactRegistry(check_interval=None).load()
+    errors = reconstruction_errors(X, artifacts.model, artifacts.scaler)
+
+    ReferenceProfile.from_samples(
+        np.column_stack([X, errors]), FEATURE_COLUMNS + ["anomaly_score"]
+    ).save(args.output)
+    print(f"Wrote {args.output}")
@@ -0,0 +1,151 @@
+import math
+import threading
+from datetime import datetime, timezone
+
+from anomaly_detector.preprocess import HIGH_VALUE_THRESHOLD, LATE_NIGHT_HOURS
+
+
+def utc_naive(timestamp):
+    """
+    timestamp: datetime or ISO string
+    returns: naive datetime in UTC; naive input is taken as UTC already,
+             so aware and naive timestamps can be compared
+    """
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if not isinstance(timestamp, datetime):
+        raise TypeError(f"expected a datetime or ISO string, got {type(timestamp).__name__}")
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+# ----------------------------
+# Per-merchant running state
+# ----------------------------
+class MerchantState:
+    __slots__ = (
+        "count", "hour_counts", "hour_first_seen", "active_hours",
+        "peak_hour", "late_night_count", "high_value_count",
+        "customers", "first_timestamp", "last_timestamp",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.hour_counts = [0] * 24
+        self.hour_first_seen = [None] * 24
+        self.active_hours = 0
+        self.peak_hour = None
+        self.late_night_count = 0
+        self.high_value_count = 0
+        self.customers = set()
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+    def add(self, sequence, timestamp, customer_id, amount, high_value_threshold):
+        # timestamp: UTC-naive (see utc_naive); amount: float. The caller
+        # validates both, so nothing below can fail halfway through.
+        hour = timestamp.hour
+
+        self.count += 1
+        if self.hour_counts[hour] == 0:
+            self.active_hours += 1
+            self.hour_first_seen[hour] = sequence
+        self.hour_counts[hour] += 1
+
+        # Peak hour: highest count, ties to the hour seen first
+        if self.peak_hour is None:
+            self.peak_hour = hour
+        elif hour != self.peak_hour:
+            count, peak_count = self.hour_counts[hour], self.hour_counts[self.peak_hour]
+            if count > peak_count or (
+                count == peak_count
+                and self.hour_first_seen[hour] < self.hour_first_seen[self.peak_hour]
+            ):
+                self.peak_hour = hour
+
+        if hour in LATE_NIGHT_HOURS:
+            self.late_night_count += 1
+        if amount > high_value_threshold:
+            self.high_value_count += 1
+        self.customers.add(customer_id)
+
+        if self.first_timestamp is None or timestamp < self.first_timestamp:
+            self.first_timestamp = timestamp
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+
+    def features(self):
+        # Mean of consecutive gaps telescopes to (last - first) / (n - 1),
+        # so out-of-order events are handled too
+        if self.count > 1:
+            span = (self.last_timestamp - self.first_timestamp).total_seconds() / 60
+            time_diff_minutes = span / (self.count - 1)
+        else:
+            time_diff_minutes = math.nan
+
+        return {
+            "peak_hour": self.peak_hour,
+            "average_transactions_per_hour": self.count / self.active_hours,
+            "high_value_transaction_ratio": self.high_value_count / self.count,
+            "late_night_frequency": self.late_night_count / self.count,
+            "unique_customer_count": len(self.customers),
+            "time_diff_minutes": time_diff_minutes,
+        }
+
+
+# ----------------------------
+# Feature store
+# ----------------------------
+class MerchantFeatureStore:
+    """
+    In-process store of the build_feature_dataframe features, keyed by
+    merchant_id and updated in O(1) per ingested transaction.
+    """
+
+    def __init__(self, high_value_threshold=HIGH_VALUE_THRESHOLD):
+        self.high_value_threshold = high_value_threshold
+        self._merchants = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._merchants)
+
+    def __contains__(self, merchant_id):
+        return merchant_id in self._merchants
+
+    def ingest(self, transaction):
+        """transaction: dict with merchant_id, customer_id, timestamp and amount"""
+        # Validate everything before touching any state
+        merchant_id = transaction["merchant_id"]
+        customer_id = transaction["customer_id"]
+        timestamp = utc_naive(transaction["timestamp"])
+        amount = float(transaction["amount"])
+
+        with self._lock:
+            state = self._merchants.get(merchant_id)
+            if state is None:
+                state = self._merchants[merchant_id] = MerchantState()
+
+            state.add(self._sequence, timestamp, customer_id, amount, self.high_value_threshold)
+            self._sequence += 1
+
+    def ingest_many(self, transactions):
+        count = 0
+        for transaction in transactions:
+            self.ingest(transaction)
+            count += 1
+        return count
+
+    def transaction_count(self, merchant_id):
+        state = self._merchants.get(merchant_id)
+        return state.count if state is not None else 0
+
+    def features(self, merchant_id):
+        """
+        returns: dict of the six model features, or None for an unknown merchant
+        """
+        with self._lock:
+            state = self._merchants.get(merchant_id)
+            return state.features() if state is not None else None
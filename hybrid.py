@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+from anomaly_detector.infer import FEATURE_COLUMNS, predict_anomaly_batch, registry
+from anomaly_detector.preprocess import build_feature_dataframe, transactions_to_df
+from anomaly_detector.rules import apply_rule_based_scoring
+
+# Fusion settings; override any of them via score_transactions(config=...)
+DEFAULT_FUSION = {
+    # "rules_first": run the autoencoder only where rules are inconclusive
+    # "model_first": run the rules only where the autoencoder is inconclusive
+    "order": "rules_first",
+    # Merchant rule score in [0, 1] at or above which rules alone flag it,
+    # and at or below which rules alone clear it (None = never clear)
+    "rules_flag_at": 2 / 3,
+    "rules_clear_at": None,
+    # Autoencoder score / threshold ratio at or above which the model alone
+    # flags a merchant, and at or below which it alone clears it
+    "model_flag_ratio": 10.0,
+    "model_clear_ratio": 0.5,
+    # Fused score = weighted sum of both components; anomalous at >= 0.5
+    "rules_weight": 0.5,
+    "model_weight": 0.5,
+}
+
+
+# ----------------------------
+# Components
+# ----------------------------
+def merchant_rule_scores(df, rules=None):
+    """
+    Collapse per-transaction rule hits to one row per merchant; the rule
+    score is the mean of the velocity flag, the concentration flag and the
+    share of odd-hour transactions.
+    """
+    scored = apply_rule_based_scoring(df, rules)
+    merchants = scored.groupby("merchant_id", sort=False, observed=True).agg(
+        high_velocity=("high_velocity_score", "max"),
+        customer_concentration=("customer_concentration_score", "max"),
+        odd_hour_ratio=("odd_hour_score", "mean"),
+    )
+    merchants["score"] = merchants[
+        ["high_velocity", "customer_concentration", "odd_hour_ratio"]
+    ].mean(axis=1)
+    return merchants
+
+
+def merchant_model_scores(df, artifacts):
+    features = build_feature_dataframe(df).set_index("merchant_id")
+    result = predict_anomaly_batch(features[FEATURE_COLUMNS], artifacts=artifacts, explain=False)
+
+    return pd.DataFrame(
+        {
+            "anomaly_score": result["anomaly_score"],
+            "ratio": result["anomaly_score"] / result["threshold"],
+        },
+        index=features.index,
+    )
+
+
+def _model_component(ratio):
+    # Score / threshold ratio mapped to [0, 1], 0.5 exactly at the threshold
+    return min(ratio, 2.0) / 2.0
+
+
+# ----------------------------
+# Hybrid scoring
+# ----------------------------
+def score_transactions(transactions, config=None, rules=None, artifacts=None):
+    """
+    Score each merchant in `transactions` with cheap rules and the
+    autoencoder, skipping the second stage where the first is conclusive.
+    returns: list of per-merchant results with a component breakdown
+    """
+    config = {**DEFAULT_FUSION, **(config or {})}
+    if config["order"] not in ("rules_first", "model_first"):
+        raise ValueError("order must be 'rules_first' or 'model_first'")
+
+    artifacts = artifacts or registry.get()
+    df = transactions_to_df(transactions)
+    merchant_ids = pd.unique(df["merchant_id"])
+
+    rule_scores = pd.DataFrame()
+    model_scores = pd.DataFrame()
+
+    def pending(decided):
+        return df[~df["merchant_id"].isin(decided)]
+
+    if config["order"] == "rules_first":
+        rule_scores = merchant_rule_scores(df, rules)
+        conclusive = rule_scores["score"] >= config["rules_flag_at"]
+        if config["rules_clear_at"] is not None:
+            conclusive |= rule_scores["score"] <= config["rules_clear_at"]
+
+        remaining = pending(rule_scores.index[conclusive])
+        if not remaining.empty:
+            model_scores = merchant_model_scores(remaining, artifacts)
+    else:
+        model_scores = merchant_model_scores(df, artifacts)
+        ratio = model_scores["ratio"]
+        conclusive = (ratio >= config["model_flag_ratio"]) | (
+            ratio <= config["model_clear_ratio"]
+        )
+
+        remaining = pending(model_scores.index[conclusive])
+        if not remaining.empty:
+            rule_scores = merchant_rule_scores(remaining, rules)
+
+    results = []
+    for merchant_id in merchant_ids:
+        rule = rule_scores.loc[merchant_id] if merchant_id in rule_scores.index else None
+        model = model_scores.loc[merchant_id] if merchant_id in model_scores.index else None
+
+        # A single transaction has no time_diff_minutes, so no model score
+        if model is not None and np.isnan(model["anomaly_score"]):
+            model = None
+
+        if rule is not None and model is not None:
+            decided_by = "fused"
+            fused_score = (
+                config["rules_weight"] * rule["score"]
+                + config["model_weight"] * _model_component(model["ratio"])
+            ) / (config["rules_weight"] + config["model_weight"])
+        elif model is not None:
+            decided_by = "model"
+            fused_score = _model_component(model["ratio"])
+        else:
+            decided_by = "rules"
+            fused_score = rule["score"]
+
+        if decided_by == "rules" and config["order"] == "rules_first":
+            is_anomalous = fused_score >= config["rules_flag_at"]
+        else:
+            is_anomalous = fused_score >= 0.5
+
+        results.append({
+            "merchant_id": merchant_id,
+            "fused_score": float(fused_score),
+            "is_anomalous": bool(is_anomalous),
+            "decided_by": decided_by,
+            "components": {
+                "rules": None if rule is None else {
+                    "score": float(rule["score"]),
+                    "high_velocity": bool(rule["high_velocity"]),
+                    "customer_concentration": bool(rule["customer_concentration"]),
+                    "odd_hour_ratio": float(rule["odd_hour_ratio"]),
+                },
+                "model": None if model is None else {
+                    "anomaly_score": float(model["anomaly_score"]),
+                    "threshold": artifacts.threshold,
+                    "threshold_ratio": float(model["ratio"]),
+                },
+            },
+        })
+
+    return results
@@ -1,17 +1,85 @@
 import numpy as np
-from keras.models import load_model
-import joblib
+import hashlib
+import json
+import logging
 import os
+import threading
+import time
+from typing import NamedTuple
+
+from anomaly_detector.drift import DriftMonitor, ReferenceProfile
+from anomaly_detector.metrics import Counter, Gauge, Histogram
+from anomaly_detector.numpy_engine import load_numpy_artifacts
+from anomaly_detector.runtimes import RUNTIME_PATHS, load_runtime_artifacts
+from anomaly_detector.score_cache import ScoreCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger(__name__)
+
+# Column order the scaler and model were fitted on
+FEATURE_COLUMNS = [
+    "peak_hour",
+    "average_transactions_per_hour",
+    "high_value_transaction_ratio",
+    "late_night_frequency",
+    "unique_customer_count",
+    "time_diff_minutes"
+]
+
+
+# ----------------------------
+# Metrics
+# ----------------------------
+STAGE_SECONDS = Histogram(
+    "anomaly_inference_stage_seconds",
+    "Time spent per inference stage",
+    ["stage"]
+)
+SCORED_TOTAL = Counter("anomaly_scored_total", "Feature vectors scored")
+FLAGGED_TOTAL = Counter("anomaly_flagged_total", "Feature vectors flagged as anomalous")
+ANOMALY_RATE = Gauge("anomaly_rate", "Share of scored feature vectors flagged as anomalous")
+ARTIFACT_LOAD_SECONDS = Gauge("anomaly_artifact_load_seconds", "Duration of the last artifact load")
+ARTIFACT_LOADS_TOTAL = Counter("anomaly_artifact_loads_total", "Artifact (re)loads")
+MODEL_INFO = Gauge("anomaly_model_info", "Currently served model version", ["version", "engine"])
+
+
+def _record_decisions(flags):
+    SCORED_TOTAL.inc(len(flags))
+    FLAGGED_TOTAL.inc(int(np.count_nonzero(flags)))
+    scored = SCORED_TOTAL.value()
+    if scored:
+        ANOMALY_RATE.set(FLAGGED_TOTAL.value() / scored)
+
 
 # ----------------------------
 # Load trained artifacts
 # ----------------------------
+def load_threshold_table(path):
+    """
+    Read a threshold table written by `calibration.write_threshold_table`.
+    returns: (default threshold or None, {segment: threshold})
+    """
+    with open(path) as f:
+        table = json.load(f)
+    default = table.get("default")
+    return (
+        None if default is None else float(default),
+        {segment: float(t) for segment, t in table.get("segments", {}).items()}
+    )
+
+
 def load_artifacts(
     model_path="autoencoder.keras",
     threshold_path="threshold.npy",
     scaler_path="scaler.joblib"
 ):
-    base_dir = os.path.dirname(os.path.abspath(__file__))
+    # Keras (and TensorFlow behind it) is only imported when the Keras
+    # artifacts are actually requested.
+    import joblib
+    from keras.models import load_model
+
+    base_dir = BASE_DIR
 
     model = load_model(os.path.join(base_dir, model_path))
     threshold = np.load(os.path.join(base_dir, threshold_path))
@@ -21,45 +89,474 @@ def load_artifacts(
 
 
 # ----------------------------
-# Normalize input features
+# Artifact registry
 # ----------------------------
+class Artifacts(NamedTuple):
+    model: object
+    threshold: float
+    scaler: object
+    version: str
+    # Calibrated per-segment thresholds (e.g. by business_type); segments
+    # not listed here use `threshold`. None (no table) reads as empty; a
+    # shared {} default would leak in-place edits across instances
+    segment_thresholds: dict = None
+    # Training distribution for drift monitoring, if exported
+    reference: ReferenceProfile = None
+    # Window of the vectors this registry's models scored; compared with
+    # `reference` only, so per-segment bundles never mix into the default
+    drift_monitor: DriftMonitor = None
+
+    def threshold_for(self, segment=None):
+        return (self.segment_thresholds or {}).get(segment, self.threshold)
+
+    def thresholds_for(self, segments):
+        """Per-row thresholds for an array-like of segment labels."""
+        thresholds = np.full(len(segments), self.threshold)
+        if self.segment_thresholds:
+            segments = np.asarray(segments, dtype=object)
+            for segment, threshold in self.segment_thresholds.items():
+                thresholds[segments == segment] = threshold
+        return thresholds
+
+
+class ArtifactRegistry:
+    """
+    Process-wide holder for the trained artifacts.
+
+    With engine="auto" (the default, overridable via ANOMALY_ENGINE) the
+    NumPy export `autoencoder.npz` is served when present, so TensorFlow
+    is never imported; otherwise, or with engine="keras", the Keras
+    model and joblib scaler are loaded. engine="onnx" / "tflite" serve
+    the network from `autoencoder.onnx` / `autoencoder.tflite` (see
+    runtimes.py) with the scaler and threshold of the NumPy export.
+    A calibrated threshold table
+    (`thresholds.json`, see calibration.py) overrides the trained
+    threshold and adds per-segment thresholds when present, and the
+    training reference profile (`drift_reference.npz`) is loaded for
+    drift monitoring.
+
+    Artifacts are loaded once and shared by every request. Every
+    `check_interval` seconds the artifact files are stat'ed; when their
+    mtime/size changes and the content hash differs, a new bundle is
+    loaded and swapped in as a single reference, so a request always
+    sees one consistent (model, threshold, scaler, version) set.
+    Cached scores of a replaced version are dropped on reload.
+
+    Each registry owns the DriftMonitor its artifacts record scored
+    vectors to, sized by `drift_window` (default DRIFT_WINDOW).
+    """
+
+    def __init__(
+        self,
+        model_path="autoencoder.keras",
+        threshold_path="threshold.npy",
+        scaler_path="scaler.joblib",
+        engine_path="autoencoder.npz",
+        thresholds_path="thresholds.json",
+        reference_path="drift_reference.npz",
+        engine=None,
+        check_interval=5.0,
+        record_metrics=True,
+        drift_window=None
+    ):
+        self.keras_paths = tuple(
+            os.path.join(BASE_DIR, p)
+            for p in (model_path, threshold_path, scaler_path)
+        )
+        self.engine_path = os.path.join(BASE_DIR, engine_path)
+        self.thresholds_path = os.path.join(BASE_DIR, thresholds_path)
+        self.reference_path = os.path.join(BASE_DIR, reference_path)
+        self.engine = engine or os.environ.get("ANOMALY_ENGINE", "auto")
+        self.check_interval = check_interval
+        # Only the process-wide registry reports load metrics / model info
+        self.record_metrics = record_metrics
+        self.drift_monitor = DriftMonitor(
+            FEATURE_COLUMNS,
+            window=drift_window or int(os.environ.get("DRIFT_WINDOW", 10000))
+        )
+        self._artifacts = None
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def resolved_engine(self):
+        if self.engine == "auto":
+            return "numpy" if os.path.exists(self.engine_path) else "keras"
+        return self.engine
+
+    @property
+    def paths(self):
+        engine = self.resolved_engine()
+        if engine == "keras":
+            paths = self.keras_paths
+        elif engine == "numpy":
+            paths = self._engine_files()
+        else:
+            paths = (os.path.join(BASE_DIR, RUNTIME_PATHS[engine]), *self._engine_files())
+
+        # Publishing, changing or removing the threshold table (or the
+        # drift reference) changes the signature and the version like
+        # any other artifact
+        for optional_path in (self.thresholds_path, self.reference_path):
+            if os.path.exists(optional_path):
+                paths += (optional_path,)
+        return paths
+
+    def _engine_files(self):
+        # The NumPy export is an .npz file or a bundle directory of .npy files
+        if os.path.isdir(self.engine_path):
+            return tuple(sorted(
+                os.path.join(self.engine_path, name)
+                for name in os.listdir(self.engine_path) if name.endswith(".npy")
+            ))
+        return (self.engine_path,)
+
+    def _stat_signature(self):
+        return tuple(
+            (st.st_mtime_ns, st.st_size) for st in map(os.stat, self.paths)
+        )
+
+    def _content_hash(self):
+        digest = hashlib.sha256()
+        for path in self.paths:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        return digest.hexdigest()[:12]
+
+    def _load_locked(self):
+        start = time.perf_counter()
+        signature = self._stat_signature()
+        version = self._content_hash()
+        engine = self.resolved_engine()
+        if engine == "numpy":
+            model, threshold, scaler = load_numpy_artifacts(self.engine_path)
+        elif engine in RUNTIME_PATHS:
+            model, threshold, scaler = load_runtime_artifacts(engine, engine_path=self.engine_path)
+        else:
+            model, threshold, scaler = load_artifacts(*self.keras_paths)
+
+        segment_thresholds = {}
+        if os.path.exists(self.thresholds_path):
+            default, segment_thresholds = load_threshold_table(self.thresholds_path)
+            if default is not None:
+                threshold = default
+
+        reference = None
+        if os.path.exists(self.reference_path):
+            reference = ReferenceProfile.load(self.reference_path)
+
+        if self.record_metrics:
+            ARTIFACT_LOAD_SECONDS.set(time.perf_counter() - start)
+            ARTIFACT_LOADS_TOTAL.inc()
+            MODEL_INFO.clear()
+            MODEL_INFO.set(1, version=version, engine=engine)
+
+        previous = self._artifacts
+        self._artifacts = Artifacts(
+            model, float(threshold), scaler, version, segment_thresholds, reference,
+            self.drift_monitor
+        )
+        if previous is not None and previous.version != version:
+            score_cache.invalidate(previous.version)
+        self._signature = signature
+        self._last_check = time.monotonic()
+        return self._artifacts
+
+    def load(self):
+        """Load (or force-reload) the artifacts from disk."""
+        with self._lock:
+            return self._load_locked()
+
+    def reload_if_changed(self):
+        """
+        Reload the artifacts if the files changed on disk.
+        returns: True if a new version was swapped in
+        """
+        # Only one thread checks at a time; the others keep serving the
+        # current bundle instead of queueing behind a model load.
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._last_check = time.monotonic()
+            signature = self._stat_signature()
+            if signature == self._signature:
+                return False
+
+            if self._content_hash() == self._artifacts.version:
+                # Touched but not modified
+                self._signature = signature
+                return False
+
+            self._load_locked()
+            return True
+        except Exception:
+            # Files are mid-write or unreadable (truncated zip / pickle,
+            # bad JSON, ...); keep serving the current version and retry
+            # on the next check.
+            logger.warning("Artifact reload failed; serving %s", self._artifacts.version, exc_info=True)
+            return False
+        finally:
+            self._lock.release()
+
+    def get(self):
+        artifacts = self._artifacts
+        if artifacts is None:
+            return self.load()
+
+        if (
+            self.check_interval is not None
+            and time.monotonic() - self._last_check >= self.check_interval
+        ):
+            self.reload_if_changed()
+            artifacts = self._artifacts
+
+        return artifacts
+
+
+registry = ArtifactRegistry()
+
+# Window of feature vectors and scores served by the default model
+drift_monitor = registry.drift_monitor
+
+# Reconstruction errors of recently scored vectors, per model version
+score_cache = ScoreCache(
+    max_entries=int(os.environ.get("SCORE_CACHE_SIZE", 10000)),
+    ttl=float(os.environ.get("SCORE_CACHE_TTL", 300)),
+    decimals=(
+        int(os.environ["SCORE_CACHE_DECIMALS"]) if os.environ.get("SCORE_CACHE_DECIMALS") else None
+    ),
+)
+
+
+# ----------------------------
+# Scoring helpers
+# ----------------------------
+def as_feature_matrix(features):
+    """
+    features: array-like of shape (n_samples, n_features), or a columnar
+              mapping / DataFrame keyed by FEATURE_COLUMNS
+    returns: float array of shape (n_samples, n_features)
+    """
+    if hasattr(features, "keys"):
+        features = np.column_stack(
+            [np.asarray(features[c], dtype=float) for c in FEATURE_COLUMNS]
+        )
+
+    feature_matrix = np.asarray(features, dtype=float)
+    if feature_matrix.size == 0:
+        feature_matrix = feature_matrix.reshape(0, len(FEATURE_COLUMNS))
+    if feature_matrix.ndim != 2 or feature_matrix.shape[1] != len(FEATURE_COLUMNS):
+        raise ValueError(
+            f"expected shape (n_samples, {len(FEATURE_COLUMNS)}), "
+            f"got {feature_matrix.shape}"
+        )
+    return feature_matrix
+
+
+def feature_errors(feature_matrix, model, scaler, chunk_size=4096, cache=None, version=None):
+    """
+    Per-feature squared reconstruction errors of scaled features; the
+    anomaly score is their row mean.
+
+    Rows are scored in chunks of `chunk_size`: one scaler transform and
+    one forward pass per chunk, so memory stays flat for very large
+    inputs. With a ScoreCache, rows already cached for `version` skip the
+    forward pass; the others are scored together and cached.
+
+    returns: float array of shape (n_samples, n_features)
+    """
+    errors = np.empty(feature_matrix.shape)
+
+    for start in range(0, len(feature_matrix), chunk_size):
+        chunk = feature_matrix[start:start + chunk_size]
+
+        with STAGE_SECONDS.time(stage="scaling"):
+            scaled_features = scaler.transform(chunk)
+
+        if cache is None:
+            errors[start:start + len(chunk)] = _squared_errors(scaled_features, model)
+            continue
+
+        with STAGE_SECONDS.time(stage="cache"):
+            keys = cache.keys(scaled_features)
+            chunk_errors = cache.lookup(version, keys, chunk.shape[1])
+            misses = np.flatnonzero(np.isnan(chunk_errors[:, 0]))
+        if len(misses):
+            chunk_errors[misses] = _squared_errors(scaled_features[misses], model)
+            cache.store(version, [keys[i] for i in misses], chunk_errors[misses])
+        errors[start:start + len(chunk)] = chunk_errors
+
+    return errors
+
+
+def reconstruction_errors(feature_matrix, model, scaler, chunk_size=4096, cache=None, version=None):
+    """returns: per-row mean squared reconstruction error (see feature_errors)"""
+    return np.mean(
+        feature_errors(feature_matrix, model, scaler, chunk_size, cache, version), axis=1
+    )
+
+
+def _squared_errors(scaled_features, model):
+    with STAGE_SECONDS.time(stage="forward_pass"):
+        reconstructed = model.predict(
+            scaled_features, batch_size=len(scaled_features), verbose=0
+        )
+    with STAGE_SECONDS.time(stage="error"):
+        return np.square(scaled_features - reconstructed)
+
+
+def rank_features(errors):
+    """
+    errors: (n_samples, n_features) per-feature errors
+    returns: per row, feature indices from largest to smallest error
+    """
+    return np.argsort(-errors, axis=1, kind="stable")
+
+
+def explain_row(errors, ranking):
+    """returns: JSON-ready per-feature errors and ranked feature names for one row"""
+    return {
+        "feature_errors": {c: float(e) for c, e in zip(FEATURE_COLUMNS, errors)},
+        "top_features": [FEATURE_COLUMNS[i] for i in ranking],
+    }
+
+
+def warmup(artifacts, batch_sizes=(1,)):
+    """
+    Run throwaway forward passes so the first real request does not pay
+    for lazy initialisation (Keras graph tracing, BLAS thread pools).
+    Bypasses metrics and drift monitoring.
+    returns: seconds spent
+    """
+    start = time.perf_counter()
+    if artifacts.reference is not None:
+        row = artifacts.reference.means[:len(FEATURE_COLUMNS)]
+    else:
+        row = np.zeros(len(FEATURE_COLUMNS))
+
+    for batch_size in batch_sizes:
+        scaled = artifacts.scaler.transform(np.tile(row, (batch_size, 1)))
+        artifacts.model.predict(scaled, batch_size=batch_size, verbose=0)
+    return time.perf_counter() - start
 
 
 # ----------------------------
 # Inference function
 # ----------------------------
-def predict_anomaly(feature_vector):
+def predict_anomaly(feature_vector, artifacts=None, segment=None, use_cache=True, explain=True):
     """
     feature_vector: list or numpy array of shape (n_features,)
-    returns: anomaly score and decision
+    artifacts: optional Artifacts bundle, defaults to the shared registry
+    segment: optional segment label (e.g. business_type) selecting a
+             calibrated threshold
+    use_cache: reuse the score of an identical (or, with quantization,
+               nearby) vector scored by the same model version
+    explain: add per-feature squared errors and the features ranked by
+             error (from the same forward pass); False skips building them
+    returns: anomaly score, decision and the model version that scored it
     """
 
-    model, threshold, scaler = load_artifacts()
+    artifacts = artifacts or registry.get()
+    model, scaler, version = artifacts.model, artifacts.scaler, artifacts.version
+    threshold = artifacts.threshold_for(segment)
 
 
     # Convert input to numpy array
-    feature_vector = np.array(feature_vector).reshape(1, -1)
+    with STAGE_SECONDS.time(stage="validation"):
+        feature_vector = np.array(feature_vector).reshape(1, -1)
 
     # Normalize
-    scaled_features = scaler.transform(feature_vector)
+    with STAGE_SECONDS.time(stage="scaling"):
+        scaled_features = scaler.transform(feature_vector)
+
+    errors = np.full(scaled_features.shape, np.nan)
+    cache = score_cache if use_cache and score_cache.enabled else None
+    if cache is not None:
+        with STAGE_SECONDS.time(stage="cache"):
+            keys = cache.keys(scaled_features)
+            errors = cache.lookup(version, keys, scaled_features.shape[1])
 
+    if np.isnan(errors[0, 0]):
+        # Reconstruct
+        with STAGE_SECONDS.time(stage="forward_pass"):
+            reconstructed = model.predict(scaled_features, verbose=0)
 
-    # Reconstruct
-    reconstructed = model.predict(scaled_features, verbose=0)
+        # Compute per-feature reconstruction errors
+        with STAGE_SECONDS.time(stage="error"):
+            errors = np.square(scaled_features - reconstructed)
 
-    # Compute reconstruction error
-    reconstruction_error = np.mean(
-        np.square(scaled_features - reconstructed), axis=1
-    )[0]
+        if cache is not None:
+            cache.store(version, keys, errors)
+
+    reconstruction_error = np.mean(errors[0])
 
     # Anomaly decision
     is_anomalous = reconstruction_error > threshold
+    _record_decisions([is_anomalous])
+    if artifacts.drift_monitor is not None:
+        artifacts.drift_monitor.observe(feature_vector, [reconstruction_error])
 
-    return {
+    result = {
         "anomaly_score": float(reconstruction_error),
         "threshold": float(threshold),
-        "is_anomalous": bool(is_anomalous)
+        "is_anomalous": bool(is_anomalous),
+        "model_version": version
+    }
+    if explain:
+        result.update(explain_row(errors[0], rank_features(errors)[0]))
+    return result
+
+
+def predict_anomaly_batch(features, artifacts=None, chunk_size=4096, segments=None, use_cache=True,
+                          explain=True):
+    """
+    features: array-like of shape (n_samples, n_features), or a columnar
+              mapping / DataFrame keyed by FEATURE_COLUMNS
+    artifacts: optional Artifacts bundle, defaults to the shared registry
+    segments: optional per-row segment labels selecting calibrated
+              thresholds
+    use_cache: serve repeated vectors from the score cache (see
+               predict_anomaly)
+    explain: add "feature_errors" (n_samples, n_features) and
+             "feature_ranking" (feature indices by descending error)
+    returns: per-row anomaly scores, thresholds and decisions as numpy
+             arrays, plus the default threshold
+    """
+
+    artifacts = artifacts or registry.get()
+    model, scaler, version = artifacts.model, artifacts.scaler, artifacts.version
+
+    with STAGE_SECONDS.time(stage="validation"):
+        feature_matrix = as_feature_matrix(features)
+        if segments is None:
+            thresholds = np.full(len(feature_matrix), artifacts.threshold)
+        elif len(segments) != len(feature_matrix):
+            raise ValueError(
+                f"got {len(segments)} segments for {len(feature_matrix)} rows"
+            )
+        else:
+            thresholds = artifacts.thresholds_for(segments)
+
+    cache = score_cache if use_cache and score_cache.enabled else None
+    per_feature = feature_errors(feature_matrix, model, scaler, chunk_size, cache, version)
+    errors = np.mean(per_feature, axis=1)
+    is_anomalous = errors > thresholds
+    _record_decisions(is_anomalous)
+    if artifacts.drift_monitor is not None:
+        artifacts.drift_monitor.observe(feature_matrix, errors)
+
+    result = {
+        "anomaly_score": errors,
+        "threshold": float(artifacts.threshold),
+        "thresholds": thresholds,
+        "is_anomalous": is_anomalous,
+        "model_version": version
     }
+    if explain:
+        result["feature_errors"] = per_feature
+        result["feature_ranking"] = rank_features(per_feature)
+    return result
 
 
 
@@ -0,0 +1,314 @@
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detector.infer import FEATURE_COLUMNS, ArtifactRegistry, predict_anomaly_batch
+from anomaly_detector.streaming import iter_csv_chunks, iter_parquet_chunks, stream_feature_dataframe
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+JOB_KINDS = ("transactions", "features")
+JOB_FORMATS = ("csv", "parquet")
+
+# Columns carried from the input into the results when present
+ID_COLUMNS = ("merchant_id", "segment")
+
+
+def validate_job(kind, file_format):
+    """Raise ValueError for an unknown kind or format."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"kind must be one of {JOB_KINDS}")
+    if file_format not in JOB_FORMATS:
+        raise ValueError(f"format must be one of {JOB_FORMATS}")
+
+
+# ----------------------------
+# Job status on disk
+# ----------------------------
+# Each job lives in <jobs_dir>/<id>/ with status.json and results/part-*.parquet.
+# The worker process owns status.json while the job runs; the API only reads it.
+
+def _status_path(job_dir):
+    return os.path.join(job_dir, "status.json")
+
+
+def read_status(job_dir):
+    with open(_status_path(job_dir)) as f:
+        return json.load(f)
+
+
+def _write_status(job_dir, status):
+    tmp_path = _status_path(job_dir) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp_path, _status_path(job_dir))
+
+
+def _update_status(job_dir, **changes):
+    status = read_status(job_dir)
+    status.update(changes)
+    if status.get("rows_total"):
+        status["progress"] = status["rows_scored"] / status["rows_total"]
+    _write_status(job_dir, status)
+    return status
+
+
+# ----------------------------
+# Worker
+# ----------------------------
+def _read_chunks(path, file_format, chunksize, kind="transactions"):
+    if file_format == "parquet":
+        return iter_parquet_chunks(path, chunksize)
+    if kind == "transactions":
+        return iter_csv_chunks(path, chunksize)
+    # Feature rows have no timestamp column to parse
+    return pd.read_csv(path, chunksize=chunksize)
+
+
+def _count_rows(path, file_format):
+    """returns: the row count from Parquet metadata; None for CSV (unknown until read)"""
+    if file_format != "parquet":
+        return None
+    import pyarrow.parquet as pq
+
+    return pq.ParquetFile(path).metadata.num_rows
+
+
+def run_job(job_dir, kind, path, file_format, chunksize):
+    """
+    Process-pool entry point: build features (for transaction files) or
+    read feature rows chunk by chunk, score each chunk and write one
+    results part per chunk, updating status.json as it goes.
+    """
+    _update_status(job_dir, state="running", stage="loading", started_at=time.time())
+    try:
+        artifacts = ArtifactRegistry(check_interval=None, record_metrics=False).load()
+
+        if kind == "transactions":
+            def counted(chunks):
+                rows_read = 0
+                for chunk in chunks:
+                    rows_read += len(chunk)
+                    _update_status(job_dir, stage="features", transactions_read=rows_read)
+                    yield chunk
+
+            # Mergeable per-merchant aggregation, so the file never has
+            # to fit in memory
+            features = stream_feature_dataframe(counted(_read_chunks(path, file_format, chunksize)))
+            total = len(features)
+            blocks = (features.iloc[i:i + chunksize] for i in range(0, total, chunksize))
+        else:
+            # Feature rows are scored as they are read
+            total = _count_rows(path, file_format)
+            blocks = _read_chunks(path, file_format, chunksize, kind)
+
+        _update_status(
+            job_dir, stage="scoring", rows_total=total, model_version=artifacts.version
+        )
+
+        results_dir = os.path.join(job_dir, "results")
+        os.makedirs(results_dir, exist_ok=True)
+        parts, anomalies, rows_scored = [], 0, 0
+        for block in blocks:
+            if rows_scored == 0:
+                missing = [c for c in FEATURE_COLUMNS if c not in block]
+                if missing:
+                    raise ValueError(f"missing feature columns: {', '.join(missing)}")
+
+            segments = block["segment"].tolist() if "segment" in block else None
+            # Bulk rows are mostly distinct merchants: skip the score cache
+            result = predict_anomaly_batch(
+                block[FEATURE_COLUMNS], artifacts=artifacts, segments=segments, use_cache=False
+            )
+
+            out = block[[c for c in ID_COLUMNS if c in block]].reset_index(drop=True)
+            out.insert(0, "row", range(rows_scored, rows_scored + len(block)))
+            out["anomaly_score"] = result["anomaly_score"]
+            out["threshold"] = result["thresholds"]
+            out["is_anomalous"] = result["is_anomalous"]
+            # Feature with the largest reconstruction error, to triage alerts
+            out["top_feature"] = np.array(FEATURE_COLUMNS)[result["feature_ranking"][:, 0]]
+
+            name = f"part-{len(parts):05d}.parquet"
+            out.to_parquet(os.path.join(results_dir, name), index=False)
+            parts.append([name, len(out)])
+            anomalies += int(result["is_anomalous"].sum())
+            rows_scored += len(block)
+            _update_status(job_dir, rows_scored=rows_scored, anomalies=anomalies, parts=parts)
+
+        _update_status(
+            job_dir, state="succeeded", stage="done", rows_total=rows_scored, finished_at=time.time()
+        )
+    except Exception as e:
+        _update_status(
+            job_dir, state="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time()
+        )
+        raise
+
+
+# ----------------------------
+# Job manager
+# ----------------------------
+class JobManager:
+    """
+    Runs bulk-scoring jobs in a process pool, so large files are scored
+    without holding up the API's event loop or threads.
+
+    Job state and results are kept on disk under `jobs_dir`; a restarted
+    service still serves the results of finished jobs.
+
+    Server-side input files are only read from `input_dir` (env
+    JOBS_INPUT_DIR); without one, files must be uploaded.
+    """
+
+    def __init__(self, jobs_dir=None, max_workers=None, chunksize=50_000, input_dir=None):
+        self.jobs_dir = jobs_dir or os.environ.get("JOBS_DIR", os.path.join(BASE_DIR, ".cache", "jobs"))
+        self.input_dir = input_dir or os.environ.get("JOBS_INPUT_DIR")
+        self.max_workers = max_workers or int(os.environ.get("JOB_WORKERS", 2))
+        self.chunksize = chunksize
+        self._pool = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: workers must not inherit the server's event loop,
+                # threads or locks
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def new_job(self):
+        job_id = uuid.uuid4().hex[:12]
+        os.makedirs(self.job_dir(job_id))
+        return job_id
+
+    def discard(self, job_id):
+        """Remove a job directory that was never submitted."""
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def input_path(self, path):
+        """
+        path: file name relative to `input_dir` (or an absolute path inside it)
+        returns: the resolved path
+
+        Paths that leave `input_dir`, including through symlinks, get the
+        same error as missing files, so callers cannot probe the server's
+        file system.
+        """
+        if not self.input_dir:
+            raise ValueError("server-side input files are disabled; upload the file instead")
+
+        root = os.path.realpath(self.input_dir)
+        resolved = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, resolved]) != root or not os.path.isfile(resolved):
+            raise ValueError(f"no input file {path!r} in the jobs input directory")
+        return resolved
+
+    def submit(self, job_id, kind, path, file_format="csv"):
+        """
+        kind: "transactions" (raw rows, aggregated per merchant first) or
+              "features" (rows of FEATURE_COLUMNS)
+        path: a resolved input file (see input_path) or an upload
+        returns: initial job status
+        """
+        validate_job(kind, file_format)
+        if not os.path.isfile(path):
+            raise ValueError("input file is missing")
+
+        job_dir = self.job_dir(job_id)
+        status = {
+            "id": job_id,
+            "kind": kind,
+            "format": file_format,
+            "source": path,
+            "state": "queued",
+            "stage": "queued",
+            "created_at": time.time(),
+            "transactions_read": 0,
+            "rows_total": None,
+            "rows_scored": 0,
+            "progress": 0.0,
+            "anomalies": 0,
+            "parts": [],
+            "model_version": None,
+            "error": None,
+        }
+        _write_status(job_dir, status)
+
+        future = self._executor().submit(run_job, job_dir, kind, path, file_format, self.chunksize)
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        self._futures[job_id] = future
+        return status
+
+    def _on_done(self, job_id, future):
+        self._futures.pop(job_id, None)
+        # A worker that died (e.g. killed for memory) never wrote its own failure
+        if not future.cancelled() and future.exception() is not None:
+            status = self.status(job_id)
+            if status is not None and status["state"] not in ("failed", "succeeded"):
+                _update_status(
+                    self.job_dir(job_id), state="failed",
+                    error=repr(future.exception()), finished_at=time.time()
+                )
+
+    def status(self, job_id):
+        """returns: the job's status dict, or None for an unknown job"""
+        if os.sep in job_id or job_id.startswith("."):
+            return None
+        try:
+            return read_status(self.job_dir(job_id))
+        except FileNotFoundError:
+            return None
+
+    def list(self):
+        if not os.path.isdir(self.jobs_dir):
+            return []
+        statuses = (self.status(job_id) for job_id in os.listdir(self.jobs_dir))
+        return sorted(
+            (s for s in statuses if s is not None), key=lambda s: s["created_at"], reverse=True
+        )
+
+    def results(self, job_id, offset=0, limit=1000):
+        """
+        returns: up to `limit` result rows starting at `offset`, reading
+                 only the parts that overlap the page
+        """
+        status = self.status(job_id)
+        if status is None:
+            return None
+
+        rows, part_start = [], 0
+        for name, count in status["parts"]:
+            part_end = part_start + count
+            if part_end > offset and part_start < offset + limit:
+                part = pd.read_parquet(os.path.join(self.job_dir(job_id), "results", name))
+                lo = max(offset - part_start, 0)
+                hi = min(offset + limit - part_start, count)
+                page = part.iloc[lo:hi]
+                # Missing ids (e.g. rows without a segment) as null, not NaN
+                rows.extend(page.astype(object).where(page.notna(), None).to_dict("records"))
+            part_start = part_end
+            if part_start >= offset + limit:
+                break
+        return rows
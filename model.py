@@ -1,13 +1,20 @@
 from keras.models import Sequential
 from keras.layers import Dense, Input
 
-def build_autoencoder(input_dim):
+def build_autoencoder(input_dim, hidden_units=(64, 32, 64)):
+    """
+    hidden_units: widths of the relu layers between input and output,
+                  e.g. (64, 32, 64) = 64-unit encoder, 32-unit bottleneck
+    """
     model = Sequential([
         Input(shape=(input_dim,)),
-        Dense(64, activation='relu'),
-        Dense(32, activation='relu'),
-        Dense(64, activation='relu'),
+        *[Dense(units, activation='relu') for units in hidden_units],
         Dense(input_dim, activation='sigmoid')
     ])
     model.compile(optimizer='adam', loss='mse')
     return model
+
+
+def symmetric_units(encoder_units, bottleneck):
+    """(128, 64), 16 -> (128, 64, 16, 64, 128)"""
+    return (*encoder_units, bottleneck, *reversed(encoder_units))
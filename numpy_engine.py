@@ -0,0 +1,214 @@
+import argparse
+import os
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "sigmoid": lambda x: 1.0 / (1.0 + np.exp(-x)),
+    "tanh": np.tanh,
+}
+
+
+# ----------------------------
+# NumPy runtime
+# ----------------------------
+class MinMaxTransform:
+    """NumPy equivalent of a fitted MinMaxScaler's transform."""
+
+    def __init__(self, scale, offset, clip=False):
+        self.scale = scale
+        self.offset = offset
+        self.clip = clip
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=np.float64) * self.scale + self.offset
+        if self.clip:
+            np.clip(X, 0.0, 1.0, out=X)
+        return X
+
+
+class NumpyAutoencoder:
+    """
+    Dense feed-forward network evaluated with NumPy matmuls.
+
+    `predict` mirrors the keras.Model.predict signature so it can stand
+    in for the Keras model anywhere in infer.
+    """
+
+    def __init__(self, layers):
+        # layers: list of (kernel, bias, activation name)
+        self.layers = [
+            (kernel, bias, ACTIVATIONS[activation])
+            for kernel, bias, activation in layers
+        ]
+
+    def predict(self, X, batch_size=None, verbose=0):
+        out = np.asarray(X, dtype=np.float32)
+        for kernel, bias, activation in self.layers:
+            out = activation(out @ kernel + bias)
+        return out
+
+
+def load_numpy_artifacts(engine_path="autoencoder.npz"):
+    """
+    returns: (model, threshold, scaler) backed by NumPy only
+    """
+    layers, threshold, scaler = read_numpy_export(engine_path)
+    return NumpyAutoencoder(layers), threshold, scaler
+
+
+class NpyDirectory:
+    """
+    Read-only view of an export saved as one uncompressed .npy file per
+    array (see `export_numpy_bundle`). Arrays are memory-mapped, so every
+    process serving the same bundle shares one copy of the weights
+    through the page cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __getitem__(self, key):
+        return np.load(os.path.join(self.path, f"{key}.npy"), mmap_mode="r")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def read_numpy_export(engine_path="autoencoder.npz"):
+    """
+    engine_path: an .npz file or a bundle directory of .npy files
+    returns: ([(kernel, bias, activation name)], threshold, scaler)
+    """
+    engine_path = os.path.join(BASE_DIR, engine_path)
+    opened = NpyDirectory(engine_path) if os.path.isdir(engine_path) else np.load(engine_path)
+    with opened as data:
+        activations = [str(a) for a in data["activations"]]
+        layers = [
+            (data[f"kernel_{i}"], data[f"bias_{i}"], activation)
+            for i, activation in enumerate(activations)
+        ]
+        scaler = MinMaxTransform(
+            data["scaler_scale"], data["scaler_min"], bool(data["scaler_clip"])
+        )
+        threshold = float(data["threshold"])
+
+    return layers, threshold, scaler
+
+
+# ----------------------------
+# Exporter
+# ----------------------------
+def dense_layers(model):
+    """
+    returns: [(kernel, bias, activation name)] for each Dense layer of a
+             Keras model, ready for NumpyAutoencoder
+    """
+    layers = []
+    for layer in model.layers:
+        weights = layer.get_weights()
+        if not weights:
+            continue
+        if len(weights) != 2:
+            raise ValueError(f"Unsupported layer for export: {layer.name}")
+
+        activation = layer.get_config().get("activation", "linear")
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"Unsupported activation for export: {activation}")
+
+        layers.append((
+            weights[0].astype(np.float32), weights[1].astype(np.float32), activation
+        ))
+    return layers
+
+
+def export_numpy_artifacts(model, threshold, scaler, out_path="autoencoder.npz"):
+    """
+    Write the Dense weights of a trained Keras autoencoder, the fitted
+    MinMaxScaler parameters and the threshold to a single .npz file.
+    """
+    arrays = {}
+    activations = []
+
+    for i, (kernel, bias, activation) in enumerate(dense_layers(model)):
+        arrays[f"kernel_{i}"] = kernel
+        arrays[f"bias_{i}"] = bias
+        activations.append(activation)
+
+    np.savez(
+        os.path.join(BASE_DIR, out_path),
+        activations=np.array(activations),
+        scaler_scale=np.asarray(scaler.scale_, dtype=np.float64),
+        scaler_min=np.asarray(scaler.min_, dtype=np.float64),
+        scaler_clip=np.array(bool(getattr(scaler, "clip", False))),
+        threshold=np.array(float(threshold)),
+        **arrays
+    )
+
+
+def export_numpy_bundle(engine_path, out_dir):
+    """
+    Re-save an .npz export as a bundle directory of uncompressed .npy
+    files, one per array, which `read_numpy_export` memory-maps.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    with np.load(os.path.join(BASE_DIR, engine_path)) as data:
+        for key in data.files:
+            np.save(os.path.join(out_dir, f"{key}.npy"), data[key])
+
+
+def parity_check(keras_artifacts, numpy_artifacts, n_samples=10000, seed=0):
+    """
+    Score random rows spanning the scaler's fitted range with both
+    engines and return the largest absolute reconstruction error gap.
+    """
+    keras_model, _, keras_scaler = keras_artifacts
+    numpy_model, _, numpy_scaler = numpy_artifacts
+
+    rng = np.random.default_rng(seed)
+    low, high = keras_scaler.data_min_, keras_scaler.data_max_
+    span = np.where(high > low, high - low, 1.0)
+    X = rng.uniform(low - 0.25 * span, high + 0.25 * span, size=(n_samples, len(low)))
+
+    def errors(model, scaler):
+        scaled = scaler.transform(X)
+        recon = model.predict(scaled, batch_size=n_samples, verbose=0)
+        return np.mean(np.square(scaled - recon), axis=1)
+
+    return float(np.max(np.abs(
+        errors(keras_model, keras_scaler) - errors(numpy_model, numpy_scaler)
+    )))
+
+
+if __name__ == "__main__":
+    import joblib
+    from keras.models import load_model
+
+    parser = argparse.ArgumentParser(
+        description="Export autoencoder.keras + scaler.joblib to a NumPy-only .npz"
+    )
+    parser.add_argument("--model", default="autoencoder.keras")
+    parser.add_argument("--threshold", default="threshold.npy")
+    parser.add_argument("--scaler", default="scaler.joblib")
+    parser.add_argument("--out", default="autoencoder.npz")
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    args = parser.parse_args()
+
+    keras_artifacts = (
+        load_model(os.path.join(BASE_DIR, args.model)),
+        float(np.load(os.path.join(BASE_DIR, args.threshold))),
+        joblib.load(os.path.join(BASE_DIR, args.scaler)),
+    )
+    export_numpy_artifacts(*keras_artifacts, out_path=args.out)
+
+    gap = parity_check(keras_artifacts, load_numpy_artifacts(args.out))
+    print(f"Exported {args.out}; max |error gap| vs Keras = {gap:.3e}")
+    if gap > args.tolerance:
+        raise SystemExit(f"Parity check failed: {gap:.3e} > {args.tolerance:.1e}")
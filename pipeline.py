@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import shutil
+
+
+def _digest(payload):
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+
+
+def _hash_directory(path):
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class StageCache:
+    """
+    On-disk cache of pipeline stage outputs.
+
+    A stage's key hashes its name, its parameters and the content hashes
+    of the stage outputs it consumes, so changing a parameter re-runs that
+    stage and everything downstream while upstream stages are reused.
+
+    Outputs are built in `<key>.partial/` and renamed into place once the
+    stage finishes, so an interrupted stage is never mistaken for a cached
+    one, and a stage that checkpoints into its partial directory (e.g.
+    training) can resume from it on the next run.
+    """
+
+    def __init__(self, cache_dir, force=(), log=print):
+        self.cache_dir = cache_dir
+        self.force = set(force)
+        self.log = log
+
+    def run(self, name, params, inputs, build):
+        """
+        name: stage name
+        params: JSON-serializable stage parameters
+        inputs: list of upstream Stage results this stage reads
+        build: callable(output_dir, *input_dirs) writing the stage outputs
+        returns: Stage(name, path, content_hash, cached)
+        """
+        key = _digest({
+            "stage": name,
+            "params": params,
+            "inputs": [stage.content_hash for stage in inputs],
+        })
+        output_dir = os.path.join(self.cache_dir, name, key)
+        meta_path = os.path.join(output_dir, "stage.json")
+
+        if os.path.exists(meta_path) and name not in self.force:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.log(f"[{name}] cached ({key})")
+            return Stage(name, output_dir, meta["content_hash"], True)
+
+        if os.path.exists(output_dir):
+            shutil.rmtree(output_dir)
+        partial_dir = output_dir + ".partial"
+        os.makedirs(partial_dir, exist_ok=True)
+
+        self.log(f"[{name}] running ({key})")
+        build(partial_dir, *[stage.path for stage in inputs])
+
+        content_hash = _hash_directory(partial_dir)
+        with open(os.path.join(partial_dir, "stage.json"), "w") as f:
+            json.dump({"stage": name, "params": params, "content_hash": content_hash}, f, indent=2)
+        os.replace(partial_dir, output_dir)
+
+        return Stage(name, output_dir, content_hash, False)
+
+
+class Stage:
+    def __init__(self, name, path, content_hash, cached):
+        self.name = name
+        self.path = path
+        self.content_hash = content_hash
+        self.cached = cached
+
+    def file(self, filename):
+        return os.path.join(self.path, filename)
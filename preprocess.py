@@ -1,12 +1,23 @@
+import numpy as np
 import pandas as pd
-from collections import defaultdict, Counter
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
+
+from anomaly_detector.txstore import ColumnarTransactionStore
+
+
+LATE_NIGHT_HOURS = [23, 0, 1, 2, 3, 4]
+HIGH_VALUE_THRESHOLD = 10000
 
 
 def transactions_to_df(transactions):
-    df = pd.DataFrame(transactions)
+    """
+    transactions: list of transaction dicts, a DataFrame or a
+                  ColumnarTransactionStore (materialized whole; use
+                  store.iter_chunks() to stay within bounded memory)
+    """
+    if isinstance(transactions, ColumnarTransactionStore):
+        df = transactions.to_frame()
+    else:
+        df = pd.DataFrame(transactions)
     df["timestamp"] = pd.to_datetime(df["timestamp"])
     df["hour"] = df["timestamp"].dt.hour
     return df
@@ -23,59 +34,61 @@ def average_transactions_per_hour(df):
         .reset_index(name="average_transactions_per_hour")
     )
 
-def transaction_time_diff(df):
-    df = df.sort_values(["merchant_id", "timestamp"])
-    df["time_diff_minutes"] = (
-        df.groupby("merchant_id")["timestamp"]
-        .diff()
-        .dt.total_seconds() / 60
-    )
-    return df[["merchant_id", "time_diff_minutes"]]
+def mean_gap_minutes(span_minutes, n_transactions):
+    """
+    Mean of consecutive gaps, which telescopes to (last - first) / (n - 1);
+    NaN for merchants with a single transaction.
+    """
+    n_transactions = np.asarray(n_transactions)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(n_transactions > 1, np.asarray(span_minutes) / (n_transactions - 1), np.nan)
 
 def avg_time_between_transactions(df):
-    df = df.sort_values(["merchant_id", "timestamp"])
-    df["time_diff_minutes"] = (
-        df.groupby("merchant_id")["timestamp"]
-        .diff()
-        .dt.total_seconds() / 60
-    )
+    stats = df.groupby("merchant_id", sort=True)["timestamp"].agg(["min", "max", "size"])
+    return pd.DataFrame({
+        "merchant_id": stats.index,
+        "time_diff_minutes": mean_gap_minutes(
+            (stats["max"] - stats["min"]).dt.total_seconds().to_numpy() / 60,
+            stats["size"].to_numpy()
+        ),
+    })
+
+
+def _transactions_frame(transactions):
+    # The per-feature helpers take raw transactions, as they always did,
+    # or an already converted frame
+    if isinstance(transactions, pd.DataFrame) and "hour" in transactions:
+        return transactions
+    return transactions_to_df(transactions)
 
+def peak_transaction_hour(transactions):
+    # Most frequent hour; ties go to the hour seen first, as Counter.most_common did
+    df = _transactions_frame(transactions)
+    hourly = (
+        df.reset_index(drop=True)
+        .reset_index()
+        .groupby(["merchant_id", "hour"], sort=False)
+        .agg(count=("index", "size"), first_seen=("index", "min"))
+        .reset_index()
+        .sort_values(
+            ["merchant_id", "count", "first_seen"],
+            ascending=[True, False, True]
+        )
+    )
     return (
-        df.groupby("merchant_id")["time_diff_minutes"]
-        .mean()
-        .reset_index(name="time_diff_minutes")
+        hourly.drop_duplicates("merchant_id")[["merchant_id", "hour"]]
+        .rename(columns={"hour": "peak_hour"})
+        .reset_index(drop=True)
     )
 
-
-def peak_transaction_hour(transactions):
-    merchant_hours = defaultdict(list)
-    for txn in transactions:
-        merchant_hours[txn["merchant_id"]].append(txn["timestamp"].hour)
-
-    rows = []
-    for m, hours in merchant_hours.items():
-        peak = Counter(hours).most_common(1)[0][0]
-        rows.append({"merchant_id": m, "peak_hour": peak})
-
-    return pd.DataFrame(rows)
-
 def late_night_frequency(transactions):
-    LATE_HOURS = set(range(23, 24)) | set(range(0, 5))
-    stats = defaultdict(lambda: {"total": 0, "late": 0})
-
-    for txn in transactions:
-        m = txn["merchant_id"]
-        stats[m]["total"] += 1
-        if txn["timestamp"].hour in LATE_HOURS:
-            stats[m]["late"] += 1
-
-    return pd.DataFrame([
-        {
-            "merchant_id": m,
-            "late_night_frequency": v["late"] / v["total"]
-        }
-        for m, v in stats.items()
-    ])
+    df = _transactions_frame(transactions)
+    return (
+        df["hour"].isin(LATE_NIGHT_HOURS)
+        .groupby(df["merchant_id"])
+        .mean()
+        .reset_index(name="late_night_frequency")
+    )
 
 def amount_statistics(df):
     return df.groupby("merchant_id")["amount"].agg(
@@ -90,7 +103,7 @@ def unique_customer_count(df):
         .reset_index(name="unique_customer_count")
     )
 
-def high_value_transaction_ratio(df, threshold=10000):
+def high_value_transaction_ratio(df, threshold=HIGH_VALUE_THRESHOLD):
     df = df.copy()
     df["is_high_value"] = df["amount"] > threshold
 
@@ -102,24 +115,105 @@ def high_value_transaction_ratio(df, threshold=10000):
 
 
 #Orchestration function
-def build_feature_dataframe(transactions):
+def build_feature_dataframe(transactions, high_value_threshold=HIGH_VALUE_THRESHOLD):
+    """
+    Compute every per-merchant feature with one factorize, one
+    (merchant, hour) histogram and one groupby aggregation.
+
+    Rows are in first-appearance order of merchant_id. A
+    ColumnarTransactionStore is aggregated chunk by chunk through
+    streaming.StreamingFeatureAggregator instead of being loaded whole.
+    """
+    if isinstance(transactions, ColumnarTransactionStore):
+        # streaming imports this module
+        from anomaly_detector.streaming import stream_feature_dataframe
+
+        return stream_feature_dataframe(
+            transactions.iter_chunks(), high_value_threshold=high_value_threshold
+        )
+
     df = transactions_to_df(transactions)
 
-    features = (
-        df[["merchant_id"]]
-        .drop_duplicates()
-        .merge(average_transactions_per_hour(df), on="merchant_id")
-        .merge(peak_transaction_hour(transactions), on="merchant_id")
-        .merge(late_night_frequency(transactions), on="merchant_id")
-        .merge(amount_statistics(df), on="merchant_id")
-        .merge(unique_customer_count(df), on="merchant_id")
-        .merge(high_value_transaction_ratio(df), on="merchant_id")   # ✅ ADD
-        .merge(avg_time_between_transactions(df), on="merchant_id")  # ✅ ADD
+    codes, merchant_ids = pd.factorize(df["merchant_id"])
+    n_merchants = len(merchant_ids)
+
+    # (merchant, hour) histogram and the position each pair first appears
+    key = codes * 24 + df["hour"].to_numpy()
+    hour_counts = np.bincount(key, minlength=n_merchants * 24).reshape(n_merchants, 24)
+
+    pairs, first_index = np.unique(key, return_index=True)
+    hour_first_seen = np.full(n_merchants * 24, len(df), dtype=np.int64)
+    hour_first_seen[pairs] = first_index
+
+    stats = df.groupby(codes, sort=True).agg(
+        average_transaction_amount=("amount", "mean"),
+        variance_transaction_amount=("amount", "var"),
+        unique_customer_count=("customer_id", "nunique"),
+        first_timestamp=("timestamp", "min"),
+        last_timestamp=("timestamp", "max"),
+    )
+    high_value_count = np.bincount(
+        codes,
+        weights=(df["amount"] > high_value_threshold).to_numpy(),
+        minlength=n_merchants
+    )
+
+    return assemble_feature_dataframe(
+        merchant_ids=merchant_ids,
+        hour_counts=hour_counts,
+        hour_first_seen=hour_first_seen.reshape(n_merchants, 24),
+        high_value_count=high_value_count,
+        average_transaction_amount=stats["average_transaction_amount"].to_numpy(),
+        variance_transaction_amount=stats["variance_transaction_amount"].to_numpy(),
+        unique_customer_count=stats["unique_customer_count"].to_numpy(),
+        span_minutes=(
+            (stats["last_timestamp"] - stats["first_timestamp"])
+            .dt.total_seconds()
+            .to_numpy() / 60
+        ),
     )
 
-    return features
+
+def assemble_feature_dataframe(
+    merchant_ids,
+    hour_counts,
+    hour_first_seen,
+    high_value_count,
+    average_transaction_amount,
+    variance_transaction_amount,
+    unique_customer_count,
+    span_minutes
+):
+    """
+    Turn per-merchant aggregates into the feature frame.
+
+    hour_counts / hour_first_seen: (n_merchants, 24) transaction counts and
+    first-seen positions per hour; span_minutes: last minus first timestamp.
+    """
+    n_transactions = hour_counts.sum(axis=1)
+
+    # Peak hour: highest count, ties broken by earliest first occurrence
+    is_peak = hour_counts == hour_counts.max(axis=1, keepdims=True)
+    peak_hour = np.where(is_peak, hour_first_seen, np.iinfo(np.int64).max).argmin(axis=1)
+
+    time_diff_minutes = mean_gap_minutes(span_minutes, n_transactions)
+
+    return pd.DataFrame({
+        "merchant_id": merchant_ids,
+        "average_transactions_per_hour": n_transactions / (hour_counts > 0).sum(axis=1),
+        "peak_hour": peak_hour.astype(np.int64),
+        "late_night_frequency": hour_counts[:, LATE_NIGHT_HOURS].sum(axis=1) / n_transactions,
+        "average_transaction_amount": average_transaction_amount,
+        "variance_transaction_amount": variance_transaction_amount,
+        "unique_customer_count": np.asarray(unique_customer_count, dtype=np.int64),
+        "high_value_transaction_ratio": high_value_count / n_transactions,
+        "time_diff_minutes": time_diff_minutes,
+    })
 
 
 def build_scaler(feature_columns):
+    # scikit-learn costs about a second to import; serving never needs it
+    from sklearn.preprocessing import MinMaxScaler
+
     return MinMaxScaler(), feature_columns
 
@@ -1,45 +1,145 @@
+import numpy as np
 import pandas as pd
 
-def apply_rule_based_scoring(transactions):
-    df = pd.DataFrame(transactions)
-    df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df["hour"] = df["timestamp"].dt.hour
+from anomaly_detector.preprocess import transactions_to_df
+from anomaly_detector.txstore import ColumnarTransactionStore
+from anomaly_detector.windows import WINDOWS, peak_window_counts
 
-    # 1. High velocity detection
-    txn_counts = (
-        df.groupby(["merchant_id", "hour"])
-        .size()
-        .reset_index(name="transaction_count")
-    )
+# Rule thresholds; override any of them via apply_rule_based_scoring(rules=...)
+DEFAULT_RULES = {
+    # More than this many transactions in one (merchant, hour-of-day) bucket
+    "high_velocity_threshold": 3,
+    # Optional windows.WINDOWS name (e.g. "1h"): count velocity in a true
+    # trailing window instead of hour-of-day buckets across the history
+    "velocity_window": None,
+    # Transactions before start or after end hour are odd-hour
+    "business_start": 9,
+    "business_end": 18,
+    # At least this many transactions from a single customer
+    "concentration_threshold": 2,
+}
 
-    high_velocity_merchants = set(
-        txn_counts[txn_counts["transaction_count"] > 3]["merchant_id"]
-    )
+_NS_PER_HOUR = 3600 * 1_000_000_000
 
-    # 2. Odd-hour detection
-    business_start, business_end = 9, 18
-    df["odd_hour_score"] = df["hour"].apply(
-        lambda x: 1 if x < business_start or x > business_end else 0
-    )
 
-    # 3. Customer concentration
-    cust_counts = (
-        df.groupby(["merchant_id", "customer_id"])
-        .size()
-        .reset_index(name="count")
-    )
+def apply_rule_based_scoring(transactions, rules=None):
+    """
+    Score every transaction against the deterministic rules.
+
+    All rules are evaluated with vectorized counts over integer merchant
+    and customer codes, so no Python callback runs per transaction.
+    A ColumnarTransactionStore is scored chunk by chunk (see
+    iter_rule_scores); only the returned frame spans the whole store.
+    """
+    rules = {**DEFAULT_RULES, **(rules or {})}
+
+    if isinstance(transactions, ColumnarTransactionStore) and len(transactions):
+        return pd.concat(list(iter_rule_scores(transactions, rules)), ignore_index=True)
 
-    high_concentration_merchants = set(
-        cust_counts[cust_counts["count"] >= 2]["merchant_id"]
+    df = transactions_to_df(transactions)
+    hour = df["hour"].to_numpy()
+
+    merchant_codes, merchant_ids = pd.factorize(df["merchant_id"])
+    n_merchants = len(merchant_ids)
+
+    # 1. High velocity detection: busiest (merchant, hour) bucket per
+    #    merchant, or busiest trailing window when velocity_window is set
+    if rules["velocity_window"] is not None:
+        peak_counts = peak_window_counts(
+            merchant_codes,
+            df["timestamp"].to_numpy("datetime64[ns]").view(np.int64),
+            WINDOWS[rules["velocity_window"]],
+            n_merchants,
+        )
+    else:
+        peak_counts = np.bincount(
+            merchant_codes * 24 + hour, minlength=n_merchants * 24
+        ).reshape(n_merchants, 24).max(axis=1)
+    high_velocity = peak_counts > rules["high_velocity_threshold"]
+
+    # 2. Customer concentration: busiest (merchant, customer) pair per merchant
+    customer_codes, customer_ids = pd.factorize(df["customer_id"])
+    pair_codes, pairs = pd.factorize(
+        merchant_codes.astype(np.int64) * len(customer_ids) + customer_codes
     )
+    pair_counts = np.bincount(pair_codes, minlength=len(pairs))
+    concentrated = np.zeros(n_merchants, dtype=bool)
+    concentrated[
+        pairs[pair_counts >= rules["concentration_threshold"]] // len(customer_ids)
+    ] = True
+
+    return _score_rows(df, merchant_codes, hour, high_velocity, concentrated, rules)
+
+
+def iter_rule_scores(store, rules=None, chunksize=1_000_000):
+    """
+    apply_rule_based_scoring over a ColumnarTransactionStore, yielding one
+    scored frame per chunk of `chunksize` transactions.
+
+    A first pass over the memmapped code and timestamp columns collects
+    the per-merchant hour histogram and (merchant, customer) pair counts;
+    the second pass scores each chunk against them. Memory is bounded by
+    merchants and distinct pairs, except with velocity_window set: the
+    trailing-window peaks sort the whole merchant and timestamp columns.
+    """
+    rules = {**DEFAULT_RULES, **(rules or {})}
+
+    merchant_codes = store.columns["merchant_id"]
+    customer_codes = store.columns["customer_id"]
+    timestamps = store.columns["timestamp"]
+    n_merchants = len(store.dictionaries["merchant_id"])
+    n_customers = len(store.dictionaries["customer_id"])
+
+    hour_counts = np.zeros(n_merchants * 24, dtype=np.int64)
+    pair_counts = pd.Series(dtype=np.int64)
+    for start in range(0, len(store), chunksize):
+        codes = merchant_codes[start:start + chunksize].astype(np.int64)
+        hour = timestamps[start:start + chunksize] // _NS_PER_HOUR % 24
+        hour_counts += np.bincount(codes * 24 + hour, minlength=n_merchants * 24)
+
+        pairs, counts = np.unique(
+            codes * n_customers + customer_codes[start:start + chunksize],
+            return_counts=True
+        )
+        pair_counts = pair_counts.add(pd.Series(counts, index=pairs), fill_value=0)
+
+    if rules["velocity_window"] is not None:
+        peak_counts = peak_window_counts(
+            np.asarray(merchant_codes),
+            np.asarray(timestamps),
+            WINDOWS[rules["velocity_window"]],
+            n_merchants,
+        )
+    else:
+        peak_counts = hour_counts.reshape(n_merchants, 24).max(axis=1)
+    high_velocity = peak_counts > rules["high_velocity_threshold"]
+
+    concentrated = np.zeros(n_merchants, dtype=bool)
+    concentrated[
+        pair_counts.index[pair_counts >= rules["concentration_threshold"]]
+        .to_numpy(dtype=np.int64) // n_customers
+    ] = True
+
+    for start in range(0, len(store), chunksize):
+        df = store.to_frame(start, start + chunksize)
+        yield _score_rows(
+            df,
+            merchant_codes[start:start + chunksize],
+            timestamps[start:start + chunksize] // _NS_PER_HOUR % 24,
+            high_velocity,
+            concentrated,
+            rules,
+        )
+
+
+def _score_rows(df, merchant_codes, hour, high_velocity, concentrated, rules):
+    # 3. Odd-hour detection
+    odd_hour = (hour < rules["business_start"]) | (hour > rules["business_end"])
 
     # 4. Aggregate rule scores
-    df["high_velocity_score"] = df["merchant_id"].apply(
-        lambda x: 1 if x in high_velocity_merchants else 0
-    )
-    df["customer_concentration_score"] = df["merchant_id"].apply(
-        lambda x: 1 if x in high_concentration_merchants else 0
-    )
+    df["high_velocity_score"] = high_velocity[merchant_codes].astype(np.int64)
+    df["odd_hour_score"] = odd_hour.astype(np.int64)
+    df["customer_concentration_score"] = concentrated[merchant_codes].astype(np.int64)
 
     df["rule_anomaly_score"] = (
         df["high_velocity_score"]
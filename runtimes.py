@@ -0,0 +1,245 @@
+"""
+ONNX and TFLite exports of the autoencoder, and their CPU runtimes.
+
+    python -m anomaly_detector.runtimes
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from anomaly_detector.numpy_engine import read_numpy_export
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The scaler and threshold always come from the NumPy export
+# (autoencoder.npz), which train.py writes next to these files
+RUNTIME_PATHS = {
+    "onnx": "autoencoder.onnx",
+    "tflite": "autoencoder.tflite",
+}
+
+ONNX_ACTIVATIONS = {
+    "linear": "Identity",
+    "relu": "Relu",
+    "sigmoid": "Sigmoid",
+    "tanh": "Tanh",
+}
+
+
+# ----------------------------
+# Runtimes
+# ----------------------------
+class OnnxAutoencoder:
+    """
+    onnxruntime session with the keras.Model.predict signature.
+
+    threads: intra-op threads (env ONNX_THREADS); 1 minimises single-row
+             latency, 0 lets onnxruntime use every core for large batches
+    """
+
+    def __init__(self, model_path, threads=None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = int(
+            os.environ.get("ONNX_THREADS", 1) if threads is None else threads
+        )
+        self.session = onnxruntime.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return self.session.run(None, {self.input_name: X})[0]
+
+
+class TFLiteAutoencoder:
+    """
+    TFLite interpreter with the keras.Model.predict signature. Uses the
+    standalone LiteRT interpreter when installed, so TensorFlow is not
+    imported; otherwise falls back to tf.lite.
+
+    An interpreter is not thread-safe, and the batcher and /predict/batch
+    threads share this one, so calls are serialised on a lock.
+    """
+
+    def __init__(self, model_path, threads=None):
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(
+            model_path=model_path,
+            num_threads=int(os.environ.get("TFLITE_THREADS", 1) if threads is None else threads)
+        )
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self._batch_size = None
+        self._lock = threading.Lock()
+
+    def predict(self, X, batch_size=None, verbose=0):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        with self._lock:
+            # Re-plan the tensors only when the batch shape changes
+            if len(X) != self._batch_size:
+                self.interpreter.resize_tensor_input(self.input_index, X.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = len(X)
+
+            self.interpreter.set_tensor(self.input_index, X)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
+
+
+RUNTIMES = {
+    "onnx": OnnxAutoencoder,
+    "tflite": TFLiteAutoencoder,
+}
+
+
+def load_runtime_artifacts(runtime, model_path=None, engine_path="autoencoder.npz"):
+    """
+    returns: (model, threshold, scaler) with the network served by
+             `runtime` ("onnx" or "tflite")
+    """
+    model_path = os.path.join(BASE_DIR, model_path or RUNTIME_PATHS[runtime])
+    _, threshold, scaler = read_numpy_export(engine_path)
+    return RUNTIMES[runtime](model_path), threshold, scaler
+
+
+# ----------------------------
+# Exporters
+# ----------------------------
+def export_onnx(layers, out_path="autoencoder.onnx", opset=17):
+    """
+    Write the Dense stack as an ONNX graph (MatMul + Add + activation per
+    layer). Built directly from the exported weights, so neither Keras nor
+    a converter package is needed.
+
+    layers: [(kernel, bias, activation name)] as from numpy_engine.dense_layers
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    nodes, initializers = [], []
+    current = "input"
+    for i, (kernel, bias, activation) in enumerate(layers):
+        initializers += [
+            numpy_helper.from_array(np.asarray(kernel, dtype=np.float32), f"kernel_{i}"),
+            numpy_helper.from_array(np.asarray(bias, dtype=np.float32), f"bias_{i}"),
+        ]
+        nodes += [
+            helper.make_node("MatMul", [current, f"kernel_{i}"], [f"matmul_{i}"]),
+            helper.make_node("Add", [f"matmul_{i}", f"bias_{i}"], [f"dense_{i}"]),
+            helper.make_node(ONNX_ACTIVATIONS[activation], [f"dense_{i}"], [f"activation_{i}"]),
+        ]
+        current = f"activation_{i}"
+    nodes[-1].output[0] = "reconstruction"
+
+    input_dim = layers[0][0].shape[0]
+    output_dim = layers[-1][0].shape[1]
+    graph = helper.make_graph(
+        nodes,
+        "autoencoder",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["batch", input_dim])],
+        [helper.make_tensor_value_info("reconstruction", TensorProto.FLOAT, ["batch", output_dim])],
+        initializers,
+    )
+    # Pin the IR version to the opset's (IR 8 for opset 17) rather than
+    # the onnx package's newest, which older onnxruntime builds reject
+    model = helper.make_model(
+        graph,
+        opset_imports=[helper.make_opsetid("", opset)],
+        ir_version=onnx.helper.find_min_ir_version_for([helper.make_opsetid("", opset)])
+    )
+    onnx.checker.check_model(model)
+    onnx.save(model, os.path.join(BASE_DIR, out_path))
+
+
+def export_tflite(keras_model, out_path="autoencoder.tflite"):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    with open(os.path.join(BASE_DIR, out_path), "wb") as f:
+        f.write(converter.convert())
+
+
+# ----------------------------
+# Latency comparison
+# ----------------------------
+def single_row_latency(model, scaler, X, calls=500):
+    """returns: median seconds per single-row scaler + forward pass"""
+    timings = []
+    for row in X[:calls]:
+        start = time.perf_counter()
+        scaled = scaler.transform(row.reshape(1, -1))
+        model.predict(scaled, batch_size=1, verbose=0)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def batch_throughput(model, scaler, X, rounds=5):
+    """returns: rows per second for one scaler + forward pass over X"""
+    scaled = scaler.transform(X)
+    model.predict(scaled, batch_size=len(X), verbose=0)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        model.predict(scaler.transform(X), batch_size=len(X), verbose=0)
+    return rounds * len(X) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    import joblib
+    from keras.models import load_model
+
+    from anomaly_detector.numpy_engine import load_numpy_artifacts, parity_check
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="autoencoder.keras")
+    parser.add_argument("--scaler", default="scaler.joblib")
+    parser.add_argument("--engine-path", default="autoencoder.npz")
+    parser.add_argument("--runtimes", nargs="+", choices=sorted(RUNTIMES), default=sorted(RUNTIMES))
+    parser.add_argument("--tolerance", type=float, default=1e-6)
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    keras_model = load_model(os.path.join(BASE_DIR, args.model))
+    keras_scaler = joblib.load(os.path.join(BASE_DIR, args.scaler))
+    layers, threshold, _ = read_numpy_export(args.engine_path)
+
+    for runtime in args.runtimes:
+        if runtime == "onnx":
+            export_onnx(layers, RUNTIME_PATHS["onnx"])
+        else:
+            export_tflite(keras_model, RUNTIME_PATHS["tflite"])
+
+    engines = {
+        "keras": (keras_model, threshold, keras_scaler),
+        "numpy": load_numpy_artifacts(args.engine_path),
+        **{runtime: load_runtime_artifacts(runtime, engine_path=args.engine_path)
+           for runtime in args.runtimes},
+    }
+
+    rng = np.random.default_rng(0)
+    low, high = keras_scaler.data_min_, keras_scaler.data_max_
+    X = rng.uniform(low, high, size=(args.rows, len(low)))
+
+    print(f"{'engine':<8} {'max |gap|':>10} {'single-row p50':>15} {'batch rows/s':>14}")
+    failed = []
+    for name, (model, _, scaler) in engines.items():
+        gap = 0.0 if name == "keras" else parity_check(engines["keras"], (model, threshold, scaler))
+        if gap > args.tolerance:
+            failed.append(name)
+        print(
+            f"{name:<8} {gap:>10.2e} "
+            f"{single_row_latency(model, scaler, X) * 1e6:>12.1f} us "
+            f"{batch_throughput(model, scaler, X):>14,.0f}"
+        )
+
+    if failed:
+        raise SystemExit(f"Parity check failed for {', '.join(failed)} (> {args.tolerance:.1e})")
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from anomaly_detector.metrics import Counter, Gauge
+
+CACHE_HITS_TOTAL = Counter("anomaly_score_cache_hits_total", "Rows served from the score cache")
+CACHE_MISSES_TOTAL = Counter("anomaly_score_cache_misses_total", "Rows scored after a score cache miss")
+CACHE_ENTRIES = Gauge("anomaly_score_cache_entries", "Scored vectors held in the score cache")
+
+
+# ----------------------------
+# Score cache
+# ----------------------------
+class ScoreCache:
+    """
+    Bounded LRU of per-feature squared reconstruction errors, keyed by
+    model version and the scaled feature vector.
+
+    Only the errors are cached (the score is their mean); thresholds are
+    applied per request, so a cached score serves every segment. With
+    `decimals` set, scaled vectors are rounded before keying (scaled
+    features live in [0, 1], so decimals=4 merges vectors closer than
+    1e-4 per feature) and a hit returns the errors of the first vector
+    seen in that cell. Entries expire after `ttl` seconds;
+    `invalidate(version)` drops a replaced model's entries.
+
+    max_entries=0 disables the cache.
+    """
+
+    def __init__(self, max_entries=10000, ttl=300.0, decimals=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.decimals = decimals
+
+        # (version, key) -> (expires at, per-feature errors), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def keys(self, scaled):
+        """returns: one hashable key per row of a scaled feature matrix"""
+        scaled = np.asarray(scaled, dtype=np.float64)
+        if self.decimals is not None:
+            # + 0.0 folds -0.0 into 0.0 so both round to the same key
+            scaled = np.round(scaled, self.decimals) + 0.0
+        return [row.tobytes() for row in np.ascontiguousarray(scaled)]
+
+    def lookup(self, version, keys, width):
+        """returns: (len(keys), width) cached per-feature errors, NaN rows for misses"""
+        errors = np.full((len(keys), width), np.nan)
+        now = time.monotonic()
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get((version, key))
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[(version, key)]
+                    self.expired += 1
+                    continue
+                self._entries.move_to_end((version, key))
+                errors[i] = entry[1]
+
+            hits = int(np.count_nonzero(~np.isnan(errors[:, 0])))
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        CACHE_HITS_TOTAL.inc(hits)
+        CACHE_MISSES_TOTAL.inc(len(keys) - hits)
+        return errors
+
+    def store(self, version, keys, errors):
+        """errors: (len(keys), n_features) squared errors"""
+        expires_at = time.monotonic() + self.ttl
+
+        with self._lock:
+            for key, row in zip(keys, np.array(errors, dtype=np.float64)):
+                self._entries[(version, key)] = (expires_at, row)
+                self._entries.move_to_end((version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            CACHE_ENTRIES.set(len(self._entries))
+
+    def invalidate(self, version=None):
+        """Drop the entries of `version`, or every entry."""
+        with self._lock:
+            if version is None:
+                self._entries.clear()
+            else:
+                for entry_key in [k for k in self._entries if k[0] == version]:
+                    del self._entries[entry_key]
+            CACHE_ENTRIES.set(len(self._entries))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "decimals": self.decimals,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
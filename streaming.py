@@ -0,0 +1,316 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detector.preprocess import (
+    HIGH_VALUE_THRESHOLD,
+    assemble_feature_dataframe,
+    transactions_to_df,
+)
+from anomaly_detector.txstore import ColumnarTransactionStore
+
+
+# ----------------------------
+# Chunk readers
+# ----------------------------
+def iter_transaction_chunks(transactions, chunksize=100_000):
+    """Chunk any iterable of transaction dicts into DataFrames."""
+    iterator = iter(transactions)
+    while True:
+        chunk = list(itertools.islice(iterator, chunksize))
+        if not chunk:
+            return
+        yield pd.DataFrame(chunk)
+
+
+def iter_csv_chunks(path, chunksize=1_000_000):
+    yield from pd.read_csv(path, chunksize=chunksize, parse_dates=["timestamp"])
+
+
+def iter_parquet_chunks(path, chunksize=1_000_000):
+    # pyarrow is only needed for Parquet input
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+        yield batch.to_pandas()
+
+
+# ----------------------------
+# HyperLogLog helpers
+# ----------------------------
+def _bit_length(values):
+    # Exact bit length of uint64 values, via two float-exact 32-bit halves
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+def _hll_index_and_rank(values, precision):
+    hashes = pd.util.hash_array(np.asarray(values, dtype=object))
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes << np.uint64(precision)
+    rank = np.where(rest == 0, 64 - precision + 1, 64 - _bit_length(rest) + 1)
+    return index, rank.astype(np.uint8)
+
+
+def _hll_estimate(registers):
+    m = registers.shape[1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)), axis=1)
+    zeros = np.sum(registers == 0, axis=1)
+
+    # Small-range correction (linear counting)
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    estimate = np.where((estimate <= 2.5 * m) & (zeros > 0), linear, estimate)
+    return np.rint(estimate).astype(np.int64)
+
+
+# ----------------------------
+# Streaming aggregator
+# ----------------------------
+class StreamingFeatureAggregator:
+    """
+    Per-merchant partial state for build_feature_dataframe, updated one
+    chunk at a time so memory is bounded by the number of merchants
+    rather than the number of transactions.
+
+    State per merchant: 24-bucket hour histogram (plus where each hour was
+    first seen, for peak-hour ties), high-value count, amount count/mean/M2
+    (merged with Chan's parallel variance formula), first/last timestamp
+    and distinct customers, either exact sets or HyperLogLog registers
+    (distinct_customers="hll", 2**hll_precision bytes per merchant).
+
+    Two aggregators over disjoint shards can be combined with merge();
+    the other aggregator's rows are treated as coming after this one's.
+    """
+
+    def __init__(
+        self,
+        distinct_customers="exact",
+        hll_precision=8,
+        high_value_threshold=HIGH_VALUE_THRESHOLD
+    ):
+        if distinct_customers not in ("exact", "hll"):
+            raise ValueError("distinct_customers must be 'exact' or 'hll'")
+
+        self.distinct_customers = distinct_customers
+        self.hll_precision = hll_precision
+        self.high_value_threshold = high_value_threshold
+
+        self.merchant_ids = []
+        self.merchant_index = {}
+        self.rows_seen = 0
+
+        self._allocate(0)
+
+    # ----------------------------
+    # State storage
+    # ----------------------------
+    def _allocate(self, capacity):
+        self.hour_counts = np.zeros((capacity, 24), dtype=np.int64)
+        self.hour_first_seen = np.full((capacity, 24), np.iinfo(np.int64).max)
+        self.high_value_count = np.zeros(capacity, dtype=np.int64)
+        self.amount_mean = np.zeros(capacity)
+        self.amount_m2 = np.zeros(capacity)
+        self.first_timestamp = np.full(capacity, np.iinfo(np.int64).max)
+        self.last_timestamp = np.full(capacity, np.iinfo(np.int64).min)
+        if self.distinct_customers == "exact":
+            self.customers = [set() for _ in range(capacity)]
+        else:
+            self.customers = np.zeros((capacity, 1 << self.hll_precision), dtype=np.uint8)
+
+    def _grow(self, needed):
+        capacity = len(self.high_value_count)
+        if needed <= capacity:
+            return
+
+        old = {
+            name: getattr(self, name)
+            for name in (
+                "hour_counts", "hour_first_seen", "high_value_count",
+                "amount_mean", "amount_m2", "first_timestamp",
+                "last_timestamp", "customers",
+            )
+        }
+        self._allocate(max(needed, 2 * capacity, 1024))
+        for name, values in old.items():
+            if name == "customers" and self.distinct_customers == "exact":
+                self.customers[:capacity] = values
+            else:
+                getattr(self, name)[:capacity] = values
+
+    def _rows_for(self, merchant_ids):
+        rows = np.empty(len(merchant_ids), dtype=np.int64)
+        for i, merchant_id in enumerate(merchant_ids):
+            row = self.merchant_index.get(merchant_id)
+            if row is None:
+                row = len(self.merchant_ids)
+                self.merchant_index[merchant_id] = row
+                self.merchant_ids.append(merchant_id)
+            rows[i] = row
+
+        self._grow(len(self.merchant_ids))
+        return rows
+
+    def _combine_amounts(self, rows, count, mean, m2):
+        # Chan et al. pairwise update of (count, mean, M2)
+        count_a = self.hour_counts[rows].sum(axis=1)
+        total = count_a + count
+        delta = mean - self.amount_mean[rows]
+
+        self.amount_mean[rows] += delta * count / total
+        self.amount_m2[rows] += m2 + delta * delta * count_a * count / total
+
+    # ----------------------------
+    # Updates
+    # ----------------------------
+    def update(self, chunk):
+        """Fold a chunk (DataFrame or list of transaction dicts) into the state."""
+        df = transactions_to_df(chunk)
+        if df.empty:
+            return self
+
+        codes, merchant_ids = pd.factorize(df["merchant_id"])
+        rows = self._rows_for(merchant_ids)
+        n_local = len(merchant_ids)
+
+        # Hour histogram and first-seen positions
+        key = codes * 24 + df["hour"].to_numpy()
+        local_counts = np.bincount(key, minlength=n_local * 24).reshape(n_local, 24)
+        pairs, first_index = np.unique(key, return_index=True)
+        local_first = np.full(n_local * 24, np.iinfo(np.int64).max)
+        local_first[pairs] = first_index + self.rows_seen
+
+        # Amount moments and timestamp range
+        timestamps = df["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        stats = pd.DataFrame({
+            "amount": df["amount"].to_numpy(dtype=np.float64),
+            "timestamp": timestamps,
+        }).groupby(codes, sort=True).agg(
+            count=("amount", "size"),
+            mean=("amount", "mean"),
+            var=("amount", "var"),
+            first=("timestamp", "min"),
+            last=("timestamp", "max"),
+        )
+        count = stats["count"].to_numpy()
+        m2 = np.nan_to_num(stats["var"].to_numpy()) * (count - 1)
+
+        self._combine_amounts(rows, count, stats["mean"].to_numpy(), m2)
+        self.hour_counts[rows] += local_counts
+        self.hour_first_seen[rows] = np.minimum(
+            self.hour_first_seen[rows], local_first.reshape(n_local, 24)
+        )
+        self.high_value_count[rows] += np.bincount(
+            codes,
+            weights=(df["amount"] > self.high_value_threshold).to_numpy(),
+            minlength=n_local
+        ).astype(np.int64)
+        self.first_timestamp[rows] = np.minimum(
+            self.first_timestamp[rows], stats["first"].to_numpy()
+        )
+        self.last_timestamp[rows] = np.maximum(
+            self.last_timestamp[rows], stats["last"].to_numpy()
+        )
+
+        # Distinct customers
+        if self.distinct_customers == "exact":
+            unique_customers = df.groupby(codes, sort=True)["customer_id"].unique()
+            for row, customers in zip(rows[unique_customers.index], unique_customers):
+                self.customers[row].update(customers)
+        else:
+            index, rank = _hll_index_and_rank(df["customer_id"], self.hll_precision)
+            np.maximum.at(self.customers, (rows[codes], index), rank)
+
+        self.rows_seen += len(df)
+        return self
+
+    def merge(self, other):
+        """Fold another aggregator's state into this one."""
+        if (other.distinct_customers, other.hll_precision) != (
+            self.distinct_customers, self.hll_precision
+        ):
+            raise ValueError("Cannot merge aggregators with different customer sketches")
+
+        n_other = len(other.merchant_ids)
+        if n_other == 0:
+            return self
+        rows = self._rows_for(other.merchant_ids)
+
+        self._combine_amounts(
+            rows,
+            other.hour_counts[:n_other].sum(axis=1),
+            other.amount_mean[:n_other],
+            other.amount_m2[:n_other],
+        )
+        self.hour_counts[rows] += other.hour_counts[:n_other]
+
+        shifted = other.hour_first_seen[:n_other].copy()
+        seen = shifted != np.iinfo(np.int64).max
+        shifted[seen] += self.rows_seen
+        self.hour_first_seen[rows] = np.minimum(self.hour_first_seen[rows], shifted)
+
+        self.high_value_count[rows] += other.high_value_count[:n_other]
+        self.first_timestamp[rows] = np.minimum(
+            self.first_timestamp[rows], other.first_timestamp[:n_other]
+        )
+        self.last_timestamp[rows] = np.maximum(
+            self.last_timestamp[rows], other.last_timestamp[:n_other]
+        )
+
+        if self.distinct_customers == "exact":
+            for row, customers in zip(rows, other.customers[:n_other]):
+                self.customers[row] |= customers
+        else:
+            self.customers[rows] = np.maximum(
+                self.customers[rows], other.customers[:n_other]
+            )
+
+        self.rows_seen += other.rows_seen
+        return self
+
+    # ----------------------------
+    # Output
+    # ----------------------------
+    def to_frame(self):
+        """Same columns and row order as build_feature_dataframe."""
+        n = len(self.merchant_ids)
+        hour_counts = self.hour_counts[:n]
+        count = hour_counts.sum(axis=1)
+
+        if self.distinct_customers == "exact":
+            unique_customers = np.array([len(c) for c in self.customers[:n]], dtype=np.int64)
+        else:
+            unique_customers = _hll_estimate(self.customers[:n])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = self.amount_m2[:n] / (count - 1)
+
+        return assemble_feature_dataframe(
+            merchant_ids=pd.Index(self.merchant_ids),
+            hour_counts=hour_counts,
+            hour_first_seen=self.hour_first_seen[:n],
+            high_value_count=self.high_value_count[:n],
+            average_transaction_amount=self.amount_mean[:n],
+            variance_transaction_amount=variance,
+            unique_customer_count=unique_customers,
+            span_minutes=(self.last_timestamp[:n] - self.first_timestamp[:n]) / 1e9 / 60,
+        )
+
+
+def stream_feature_dataframe(chunks, **kwargs):
+    """
+    build_feature_dataframe over an iterable of chunks (e.g. from
+    iter_csv_chunks / iter_parquet_chunks) or a ColumnarTransactionStore
+    with bounded memory.
+    """
+    if isinstance(chunks, ColumnarTransactionStore):
+        chunks = chunks.iter_chunks()
+
+    aggregator = StreamingFeatureAggregator(**kwargs)
+    for chunk in chunks:
+        aggregator.update(chunk)
+    return aggregator.to_frame()
@@ -0,0 +1,261 @@
+"""
+Train candidate autoencoder configurations in parallel and report the
+Pareto frontier of detection quality vs. inference latency vs. size.
+
+    python -m anomaly_detector.sweep --encoder 64 32 16,8 --bottleneck 4 8 32 \\
+        --batch-size 32 256 --patience 0 5 --output sweep.json
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from anomaly_detector.numpy_engine import NumpyAutoencoder, dense_layers
+from anomaly_detector.pipeline import StageCache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# ----------------------------
+# Data
+# ----------------------------
+def prepare_data(cache, num_merchants, seed, split_ratio, holdout_ratio):
+    """
+    Reuse the training pipeline's cached generate/features/scaler stages
+    and add labels from the generator's is_anomalous flags.
+
+    Normal training rows are split into a fit set and a holdout set; the
+    evaluation set is the holdout normals plus the test rows, so both
+    false positives and missed anomalies are measured. `merchant_eval`
+    names the merchant of each evaluation row.
+    """
+    import pandas as pd
+    from anomaly_detector.train import data_stages
+
+    generated, features, scaled = data_stages(cache, num_merchants, seed, None, split_ratio)
+
+    def build(out_dir, generate_dir, features_dir, scaler_dir):
+        transactions = pd.read_parquet(os.path.join(generate_dir, "transactions.parquet"))
+        features_df = pd.read_parquet(os.path.join(features_dir, "features.parquet"))
+        splits = np.load(os.path.join(scaler_dir, "splits.npz"))
+
+        merchant_ids = features_df["merchant_id"].to_numpy(dtype=str)
+        labels = (
+            transactions.groupby("merchant_id", observed=True)["is_anomalous"].max()
+            .reindex(merchant_ids)
+            .to_numpy(dtype=bool)
+        )
+        X_train, X_test = splits["X_train"], splits["X_test"]
+        train_rows = np.arange(len(X_train))
+
+        order = np.random.default_rng(seed).permutation(len(X_train))
+        n_holdout = int(len(X_train) * holdout_ratio)
+        holdout, fit = order[:n_holdout], order[n_holdout:]
+        # Rows of features_df in evaluation order
+        eval_rows = np.concatenate([train_rows[holdout], np.arange(len(X_train), len(labels))])
+
+        np.savez(
+            os.path.join(out_dir, "sweep.npz"),
+            X_fit=X_train[fit],
+            X_eval=np.vstack([X_train[holdout], X_test]),
+            y_eval=labels[eval_rows],
+            merchant_eval=merchant_ids[eval_rows],
+        )
+
+    return cache.run(
+        "sweep_data",
+        {"holdout_ratio": holdout_ratio, "seed": seed},
+        [generated, features, scaled],
+        build
+    ).file("sweep.npz")
+
+
+# ----------------------------
+# Worker
+# ----------------------------
+def _reconstruction_errors(engine, X):
+    return np.mean(np.square(X - engine.predict(X)), axis=1)
+
+
+def evaluate_config(config, data_path, percentile, seed, threads, validation_split=0.2):
+    """
+    Train one configuration the way train.train_stage does (tf.data input
+    pipeline, early stopping on the validation loss) and measure its cost
+    and detection quality.
+    """
+    from anomaly_detector.train import ResumableEarlyStopping, configure_threads, training_datasets
+
+    # Each worker gets its own slice of the CPU
+    configure_threads(threads)
+
+    import keras
+    from anomaly_detector.model import build_autoencoder, symmetric_units
+
+    data = np.load(data_path)
+    X_fit, X_eval, y_eval = data["X_fit"], data["X_eval"], data["y_eval"]
+
+    keras.utils.set_random_seed(seed)
+    hidden_units = symmetric_units(config["encoder_units"], config["bottleneck"])
+    autoencoder = build_autoencoder(X_fit.shape[1], hidden_units)
+
+    train, validation = training_datasets(X_fit, config["batch_size"], validation_split, seed)
+    callbacks = []
+    if config["patience"]:
+        callbacks.append(ResumableEarlyStopping(
+            monitor="val_loss" if validation is not None else "loss",
+            patience=config["patience"],
+            restore_best_weights=True
+        ))
+
+    start = time.perf_counter()
+    history = autoencoder.fit(
+        train,
+        epochs=config["epochs"],
+        validation_data=validation,
+        callbacks=callbacks,
+        verbose=0
+    )
+    train_seconds = time.perf_counter() - start
+
+    # Score with the NumPy engine, i.e. the serving path
+    engine = NumpyAutoencoder(dense_layers(autoencoder))
+    threshold = np.percentile(_reconstruction_errors(engine, X_fit), percentile)
+    predicted = _reconstruction_errors(engine, X_eval) > threshold
+
+    true_positives = np.sum(predicted & y_eval)
+    precision = true_positives / max(np.sum(predicted), 1)
+    recall = true_positives / max(np.sum(y_eval), 1)
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    row = X_eval[:1]
+    latencies = []
+    for _ in range(500):
+        start = time.perf_counter()
+        engine.predict(row)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        **config,
+        "hidden_units": list(hidden_units),
+        "parameters": int(autoencoder.count_params()),
+        "epochs_run": len(history.history["loss"]),
+        "train_seconds": train_seconds,
+        "latency_us": float(np.median(latencies) * 1e6),
+        "precision": float(precision),
+        "recall": float(recall),
+        "f1": float(f1),
+    }
+
+
+# ----------------------------
+# Sweep
+# ----------------------------
+def pareto_frontier(results):
+    """
+    Configurations not dominated on (f1 higher, latency_us lower,
+    parameters lower), best f1 first.
+    """
+    def dominates(a, b):
+        at_least = (
+            a["f1"] >= b["f1"]
+            and a["latency_us"] <= b["latency_us"]
+            and a["parameters"] <= b["parameters"]
+        )
+        strictly = (
+            a["f1"] > b["f1"]
+            or a["latency_us"] < b["latency_us"]
+            or a["parameters"] < b["parameters"]
+        )
+        return at_least and strictly
+
+    frontier = [r for r in results if not any(dominates(o, r) for o in results)]
+    return sorted(frontier, key=lambda r: (-r["f1"], r["latency_us"]))
+
+
+def run_sweep(configs, data_path, percentile=95, seed=0, jobs=None, validation_split=0.2):
+    jobs = jobs or os.cpu_count()
+    threads = max(1, os.cpu_count() // jobs)
+
+    # TensorFlow is not fork-safe; start clean interpreters
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+        futures = [
+            pool.submit(
+                evaluate_config, config, data_path, percentile, seed, threads, validation_split
+            )
+            for config in configs
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            print(
+                f"{str(result['hidden_units']):<24} batch={result['batch_size']:<5} "
+                f"patience={result['patience']:<3} f1={result['f1']:.3f} "
+                f"latency={result['latency_us']:.1f}us train={result['train_seconds']:.1f}s"
+            )
+            results.append(result)
+    return results
+
+
+def parse_units(text):
+    return tuple(int(units) for units in text.split(",") if units)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--encoder", type=parse_units, nargs="+", default=[(64,)],
+                        help="Encoder widths per candidate, comma-separated (e.g. 64 128,64)")
+    parser.add_argument("--bottleneck", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[32, 256])
+    parser.add_argument("--epochs", type=int, nargs="+", default=[50])
+    parser.add_argument("--patience", type=int, nargs="+", default=[0, 5],
+                        help="Early-stopping patience on val_loss; 0 disables it")
+    parser.add_argument("--percentile", type=float, default=95)
+    parser.add_argument("--merchants", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--split-ratio", type=float, default=0.8)
+    parser.add_argument("--holdout-ratio", type=float, default=0.2)
+    parser.add_argument("--validation-split", type=float, default=0.2)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count())
+    parser.add_argument("--cache-dir", default=os.path.join(BASE_DIR, ".cache", "pipeline"))
+    parser.add_argument("--output", help="Write all results and the frontier as JSON")
+    args = parser.parse_args()
+
+    data_path = prepare_data(
+        StageCache(args.cache_dir), args.merchants, args.seed,
+        args.split_ratio, args.holdout_ratio
+    )
+    configs = [
+        {
+            "encoder_units": list(encoder),
+            "bottleneck": bottleneck,
+            "batch_size": batch_size,
+            "epochs": epochs,
+            "patience": patience,
+        }
+        for encoder, bottleneck, batch_size, epochs, patience in itertools.product(
+            args.encoder, args.bottleneck, args.batch_size, args.epochs, args.patience
+        )
+    ]
+
+    results = run_sweep(
+        configs, data_path, args.percentile, args.seed, args.jobs, args.validation_split
+    )
+    frontier = pareto_frontier(results)
+
+    print("\nPareto frontier (f1 / latency / parameters):")
+    for r in frontier:
+        print(
+            f"  {str(r['hidden_units']):<24} batch={r['batch_size']:<5} patience={r['patience']:<3} "
+            f"f1={r['f1']:.3f} P={r['precision']:.3f} R={r['recall']:.3f} "
+            f"latency={r['latency_us']:.1f}us params={r['parameters']}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results, "frontier": frontier}, f, indent=2)
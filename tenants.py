@@ -0,0 +1,284 @@
+"""
+Per-segment autoencoders served side by side in one process.
+
+    python -m anomaly_detector.tenants add Retail --from retail/autoencoder.npz
+    python -m anomaly_detector.tenants list
+"""
+import argparse
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from anomaly_detector.infer import (
+    ArtifactRegistry,
+    as_feature_matrix,
+    predict_anomaly_batch,
+    rank_features,
+    registry,
+)
+from anomaly_detector.metrics import Counter, Gauge
+from anomaly_detector.numpy_engine import export_numpy_bundle
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SEGMENT_MODELS_LOADED = Gauge("anomaly_segment_models_loaded", "Per-segment model bundles held in memory")
+SEGMENT_MODEL_BYTES = Gauge("anomaly_segment_model_bytes", "Mapped size of the loaded per-segment bundles")
+SEGMENT_EVICTIONS_TOTAL = Counter("anomaly_segment_evictions_total", "Per-segment bundles evicted by the LRU")
+
+
+# ----------------------------
+# Segment registry
+# ----------------------------
+class SegmentRegistry:
+    """
+    Routes scoring to a per-segment model bundle, falling back to the
+    default registry for segments without one.
+
+    Each bundle is a directory `<root>/<segment>/` holding the NumPy
+    export as uncompressed .npy files (plus optional thresholds.json and
+    drift_reference.npz). Weights are memory-mapped, so uvicorn workers
+    serving the same bundle share its pages. Bundles are loaded on first
+    use, hot-reloaded like the default artifacts, and the least recently
+    used ones are dropped once the mapped size exceeds `memory_budget_mb`.
+
+    The set of installed bundles is rescanned every `check_interval`
+    seconds (or on `refresh()`), not on every lookup.
+    """
+
+    def __init__(self, root=None, memory_budget_mb=None, default=None, check_interval=5.0):
+        self.root = root or os.environ.get("SEGMENT_MODELS_DIR", os.path.join(BASE_DIR, "models"))
+        budget = memory_budget_mb if memory_budget_mb is not None else float(
+            os.environ.get("SEGMENT_MEMORY_BUDGET_MB", 256)
+        )
+        self.memory_budget = int(budget * 1024 * 1024)
+        self.default = default or registry
+        self.check_interval = check_interval
+
+        # Installed bundle segments and when `root` was last scanned
+        self._bundles = None
+        self._last_scan = 0.0
+
+        # segment -> (ArtifactRegistry, mapped bytes), least recently used first
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def bundle_dir(self, segment):
+        return os.path.join(self.root, segment)
+
+    def refresh(self):
+        """Rescan `root` for bundles now rather than at the next check."""
+        bundles = frozenset()
+        if os.path.isdir(self.root):
+            bundles = frozenset(
+                name for name in os.listdir(self.root)
+                if not name.startswith(".")
+                and os.path.isfile(os.path.join(self.root, name, "activations.npy"))
+            )
+        self._bundles, self._last_scan = bundles, time.monotonic()
+        return bundles
+
+    def _available(self):
+        bundles = self._bundles
+        if bundles is None or (
+            self.check_interval is not None
+            and time.monotonic() - self._last_scan >= self.check_interval
+        ):
+            bundles = self.refresh()
+        return bundles
+
+    def has_bundle(self, segment):
+        return segment is not None and segment in self._available()
+
+    def segments(self):
+        return sorted(self._available())
+
+    def get(self, segment=None):
+        """returns: the Artifacts serving `segment`"""
+        if not self.has_bundle(segment):
+            return self.default.get()
+
+        with self._lock:
+            entry = self._loaded.get(segment)
+            if entry is not None:
+                self._loaded.move_to_end(segment)
+                self.hits += 1
+            else:
+                self.misses += 1
+                entry = self._loaded[segment] = self._open(segment)
+                self._evict()
+
+        return entry[0].get()
+
+    def _open(self, segment):
+        path = self.bundle_dir(segment)
+        bundle_registry = ArtifactRegistry(
+            engine="numpy",
+            engine_path=path,
+            thresholds_path=os.path.join(path, "thresholds.json"),
+            reference_path=os.path.join(path, "drift_reference.npz"),
+            check_interval=self.check_interval,
+            record_metrics=False,
+        )
+        bundle_registry.load()
+        size = sum(os.path.getsize(p) for p in bundle_registry.paths)
+        return bundle_registry, size
+
+    def reload(self, segment):
+        """Pick up a changed bundle now rather than at its next check."""
+        with self._lock:
+            entry = self._loaded.get(segment)
+        if entry is not None:
+            entry[0].load()
+
+    def drift_reports(self):
+        """returns: {segment: DriftMonitor report} for the loaded bundles"""
+        with self._lock:
+            loaded = [(segment, reg) for segment, (reg, _) in self._loaded.items()]
+
+        reports = {}
+        for segment, bundle_registry in loaded:
+            artifacts = bundle_registry.get()
+            reports[segment] = {
+                "model_version": artifacts.version,
+                **bundle_registry.drift_monitor.report(artifacts.reference),
+            }
+        return reports
+
+    def reset_drift(self):
+        with self._lock:
+            for bundle_registry, _ in self._loaded.values():
+                bundle_registry.drift_monitor.reset()
+
+    def _evict(self):
+        # The most recently used bundle always stays, even over budget
+        while len(self._loaded) > 1 and self._mapped_bytes() > self.memory_budget:
+            self._loaded.popitem(last=False)
+            self.evictions += 1
+            SEGMENT_EVICTIONS_TOTAL.inc()
+
+        SEGMENT_MODELS_LOADED.set(len(self._loaded))
+        SEGMENT_MODEL_BYTES.set(self._mapped_bytes())
+
+    def _mapped_bytes(self):
+        return sum(size for _, size in self._loaded.values())
+
+    def stats(self):
+        with self._lock:
+            loaded = {
+                segment: {"model_version": reg.get().version, "bytes": size}
+                for segment, (reg, size) in self._loaded.items()
+            }
+            return {
+                "root": self.root,
+                "available": self.segments(),
+                "loaded": loaded,
+                "mapped_bytes": self._mapped_bytes(),
+                "memory_budget_bytes": self.memory_budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def predict_segmented(features, segments=None, segment_registry=None, explain=True):
+    """
+    Score rows with the model of their segment: one batched pass per
+    distinct bundle; rows without a bundle share the default model (and
+    its calibrated per-segment thresholds).
+
+    returns: like infer.predict_anomaly_batch, with "model_version" as a
+             per-row array and the default model's as "default_model_version";
+             "model_segment" holds each row's bundle segment (None for rows
+             scored by the default model)
+    """
+    segment_registry = segment_registry or segment_models
+    feature_matrix = as_feature_matrix(features)
+    n = len(feature_matrix)
+    if segments is None:
+        segments = [None] * n
+    elif len(segments) != n:
+        raise ValueError(f"got {len(segments)} segments for {n} rows")
+
+    default = segment_registry.default.get()
+    bundled = {s: segment_registry.has_bundle(s) for s in set(segments)}
+    routes = np.array([s if bundled[s] else "" for s in segments], dtype=object)
+
+    scores = np.empty(n)
+    thresholds = np.empty(n)
+    flags = np.zeros(n, dtype=bool)
+    versions = np.empty(n, dtype=object)
+    errors = np.empty(feature_matrix.shape)
+
+    for route in set(routes.tolist()):
+        rows = np.flatnonzero(routes == route)
+        artifacts = segment_registry.get(route) if route else default
+        result = predict_anomaly_batch(
+            feature_matrix[rows],
+            artifacts=artifacts,
+            segments=[segments[i] for i in rows],
+            explain=explain,
+        )
+        scores[rows] = result["anomaly_score"]
+        thresholds[rows] = result["thresholds"]
+        flags[rows] = result["is_anomalous"]
+        versions[rows] = result["model_version"]
+        if explain:
+            errors[rows] = result["feature_errors"]
+
+    result = {
+        "anomaly_score": scores,
+        "threshold": default.threshold,
+        "thresholds": thresholds,
+        "is_anomalous": flags,
+        "model_version": versions,
+        "default_model_version": default.version,
+        "model_segment": np.where(routes == "", None, routes),
+    }
+    if explain:
+        result["feature_errors"] = errors
+        result["feature_ranking"] = rank_features(errors)
+    return result
+
+
+segment_models = SegmentRegistry()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Install an autoencoder.npz export as a segment bundle")
+    add.add_argument("segment")
+    add.add_argument("--from", dest="source", required=True, help="NumPy export (.npz)")
+    add.add_argument("--reference", help="Optional drift_reference.npz for the segment")
+
+    remove = commands.add_parser("remove", help="Delete a segment bundle")
+    remove.add_argument("segment")
+
+    commands.add_parser("list", help="List installed segment bundles")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        target = segment_models.bundle_dir(args.segment)
+        # Build next to the target and swap in, so a serving process
+        # never maps a half-written bundle
+        staging = os.path.join(segment_models.root, f".{args.segment}.partial")
+        shutil.rmtree(staging, ignore_errors=True)
+        export_numpy_bundle(os.path.abspath(args.source), staging)
+        if args.reference:
+            shutil.copyfile(args.reference, os.path.join(staging, "drift_reference.npz"))
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+        print(f"Installed {args.segment} -> {target}")
+    elif args.command == "remove":
+        shutil.rmtree(segment_models.bundle_dir(args.segment))
+    else:
+        for segment in segment_models.segments():
+            print(segment)
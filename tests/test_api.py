@@ -0,0 +1,32 @@
+def transaction(merchant_id, timestamp, customer_id="c1", amount=25.0):
+    return {
+        "merchant_id": merchant_id,
+        "customer_id": customer_id,
+        "timestamp": timestamp,
+        "amount": amount,
+    }
+
+
+def test_single_transaction_features_are_json_safe(client):
+    assert client.post("/transactions", json=[transaction("api-single", "2024-01-01T10:00:00")]).status_code == 200
+
+    response = client.get("/merchants/api-single/features")
+    assert response.status_code == 200
+    assert response.json()["features"]["time_diff_minutes"] is None
+
+
+def test_mixed_timezone_ingest_keeps_stores_in_step(client):
+    response = client.post("/transactions", json=[
+        transaction("api-tz", "2024-01-01T10:00:00"),
+        transaction("api-tz", "2024-01-01T12:30:00+02:00"),
+    ])
+    assert response.status_code == 200
+
+    features = client.get("/merchants/api-tz/features").json()
+    assert features["transaction_count"] == 2
+    assert features["features"]["time_diff_minutes"] == 30.0
+    assert client.get("/merchants/api-tz/windows").json()["windows"]["txns_24h"] == 2
+
+
+def test_unknown_merchant_is_404(client):
+    assert client.get("/merchants/nobody/features").status_code == 404
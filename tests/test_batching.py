@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+import pytest
+
+from anomaly_detector.batching import MicroBatcher
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_requests_share_batches_and_keep_order():
+    batches = []
+
+    def score_batch(rows):
+        batches.append(list(rows))
+        return [row * 10 for row in rows]
+
+    async def scenario():
+        batcher = MicroBatcher(score_batch, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(20))), batcher.stats()
+        finally:
+            await batcher.stop()
+
+    results, stats = run(scenario())
+    assert results == [i * 10 for i in range(20)]
+    assert max(len(batch) for batch in batches) == 8
+    assert stats["requests_total"] == 20 and stats["batches_total"] == len(batches) < 20
+
+
+def test_scoring_errors_reach_every_caller_in_the_batch():
+    def score_batch(rows):
+        raise ValueError("bad batch")
+
+    async def scenario():
+        batcher = MicroBatcher(score_batch, max_wait_ms=20)
+        await batcher.start()
+        try:
+            return await asyncio.gather(
+                *(batcher.submit(i) for i in range(3)), return_exceptions=True
+            )
+        finally:
+            await batcher.stop()
+
+    assert all(isinstance(r, ValueError) for r in run(scenario()))
+
+
+def test_stop_fails_the_batch_being_scored():
+    scoring, release = threading.Event(), threading.Event()
+
+    def score_batch(rows):
+        scoring.set()
+        release.wait(5)
+        return rows
+
+    async def scenario():
+        batcher = MicroBatcher(score_batch, max_wait_ms=1)
+        await batcher.start()
+        request = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.get_running_loop().run_in_executor(None, scoring.wait, 5)
+
+        queued = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        await batcher.stop()
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(request, queued, return_exceptions=True), timeout=1
+            )
+        finally:
+            release.set()
+
+    results = run(scenario())
+    assert all(isinstance(r, RuntimeError) and str(r) == "Batcher stopped" for r in results)
+
+
+def test_submit_requires_a_running_batcher():
+    with pytest.raises(RuntimeError):
+        run(MicroBatcher(lambda rows: rows).submit(1))
+
+
+def test_predict_endpoint_scores_through_the_batcher(client, feature_frame):
+    row = feature_frame.dropna().iloc[0]
+    before = client.get("/stats/batching").json()["requests_total"]
+
+    response = client.post("/predict", json=row.to_dict())
+    assert response.status_code == 200
+    assert {"anomaly_score", "threshold", "is_anomalous", "model_version"} <= set(response.json())
+    assert client.get("/stats/batching").json()["requests_total"] == before + 1
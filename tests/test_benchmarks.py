@@ -0,0 +1,80 @@
+import argparse
+import copy
+
+import pytest
+
+from anomaly_detector.benchmarks.features import legacy_build_feature_dataframe
+from anomaly_detector.benchmarks.harness import time_call
+from anomaly_detector.benchmarks.rules import legacy_apply_rule_based_scoring
+from anomaly_detector.benchmarks.run import compare, run
+from anomaly_detector.data_generator import generate_dataset, generate_dataset_columnar
+from anomaly_detector.infer import FEATURE_COLUMNS, predict_anomaly, predict_anomaly_batch
+from anomaly_detector.preprocess import build_feature_dataframe
+from anomaly_detector.rules import apply_rule_based_scoring
+
+# Small enough for the default test run; benchmarks/run.py covers real sizes
+NUM_MERCHANTS = 100
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    return generate_dataset_columnar(NUM_MERCHANTS, seed=0)
+
+
+@pytest.fixture(scope="module")
+def features(transactions):
+    return build_feature_dataframe(transactions)[FEATURE_COLUMNS].to_numpy(dtype=float)
+
+
+def test_generation(benchmark, transactions):
+    generated = benchmark(generate_dataset_columnar, NUM_MERCHANTS, seed=0)
+    assert len(generated) == len(transactions)
+
+
+def test_features(benchmark, transactions):
+    frame = benchmark(build_feature_dataframe, transactions)
+    assert set(FEATURE_COLUMNS) <= set(frame.columns)
+
+
+def test_rules(benchmark, transactions):
+    scored = benchmark(apply_rule_based_scoring, transactions)
+    assert len(scored) == len(transactions)
+
+
+def test_single_row_inference(benchmark, features):
+    result = benchmark(predict_anomaly, features[0], use_cache=False)
+    assert result["anomaly_score"] >= 0
+
+
+def test_batch_inference(benchmark, features):
+    result = benchmark(predict_anomaly_batch, features, use_cache=False)
+    assert len(result["anomaly_score"]) == len(features)
+
+
+def test_vectorized_features_outpace_the_reference():
+    # The legacy reference takes transaction dicts
+    transactions = generate_dataset(NUM_MERCHANTS)
+    _, fast = time_call(build_feature_dataframe, transactions, rounds=5)
+    _, slow = time_call(legacy_build_feature_dataframe, transactions, rounds=5, warmup=0)
+    assert fast["median"] < slow["median"]
+
+
+def test_vectorized_rules_outpace_the_reference(transactions):
+    _, fast = time_call(apply_rule_based_scoring, transactions, rounds=5)
+    _, slow = time_call(legacy_apply_rule_based_scoring, transactions, rounds=5, warmup=0)
+    assert fast["median"] < slow["median"]
+
+
+def test_runner_flags_regressions(capsys):
+    args = argparse.Namespace(
+        merchants=[50], stages=["features", "rules", "inference"], rounds=1, seed=0,
+        engine="numpy", epochs=1, batch_size=32, single_calls=5,
+    )
+    baseline = run(args)
+    assert set(baseline["sizes"][0]["stages"]) == {"features", "rules", "inference"}
+    assert not compare(baseline, baseline, tolerance=0.1)
+
+    slower = copy.deepcopy(baseline)
+    slower["sizes"][0]["stages"]["rules"]["apply_rule_based_scoring"]["median"] *= 2
+    assert compare(baseline, slower, tolerance=0.1)
+    assert "REGRESSION" in capsys.readouterr().out
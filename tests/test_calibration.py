@@ -0,0 +1,70 @@
+import json
+import math
+import os
+
+import pytest
+
+from anomaly_detector import app as app_module
+from anomaly_detector.calibration import write_threshold_table
+from anomaly_detector.data_generator import generate_dataset
+from anomaly_detector.infer import FEATURE_COLUMNS
+from anomaly_detector.preprocess import build_feature_dataframe
+from anomaly_detector.tenants import segment_models
+
+
+@pytest.fixture
+def calibrators(monkeypatch):
+    monkeypatch.setattr(app_module, "calibrator", app_module.new_calibrator())
+    monkeypatch.setattr(app_module, "segment_calibrators", {})
+
+
+def features(n):
+    frame = build_feature_dataframe(generate_dataset(200))
+    return frame[FEATURE_COLUMNS].to_numpy(dtype=float)[:n]
+
+
+def test_bundle_scores_get_their_own_sketch(segment_bundle, calibrators):
+    app_module.score_and_calibrate(features(60), [segment_bundle] * 30 + [None] * 30)
+
+    assert app_module.calibrator.overall.n == 30
+    assert app_module.segment_calibrators[segment_bundle].overall.n == 30
+
+
+def test_publish_writes_each_bundle_threshold_table(client, segment_bundle, calibrators):
+    app_module.score_and_calibrate(features(50), [segment_bundle] * 50)
+    before = segment_models.get(segment_bundle).version
+
+    response = client.post("/calibration/publish", json={"min_scored": 50})
+    assert response.status_code == 200
+    body = response.json()
+
+    assert body["skipped"] == {"default": 0}
+    published = body["segment_models"][segment_bundle]
+    assert published["model_version"] != before
+    with open(os.path.join(segment_models.bundle_dir(segment_bundle), "thresholds.json")) as f:
+        assert json.load(f)["default"] == pytest.approx(published["default"])
+    assert segment_models.get(segment_bundle).threshold == pytest.approx(published["default"])
+
+
+def test_publish_without_enough_scores_is_409(client, calibrators):
+    assert client.post("/calibration/publish", json={"min_scored": 1}).status_code == 409
+
+
+@pytest.mark.parametrize("min_scored", [0, -1])
+def test_publish_with_no_scores_fails(client, calibrators, min_scored):
+    # A KLL sketch with no scores has a NaN quantile, which would never flag anything
+    response = client.post("/calibration/publish", json={"min_scored": min_scored})
+    assert response.status_code == 422
+    assert app_module.registry.get().threshold > 0
+
+
+def test_threshold_table_drops_non_finite_thresholds(tmp_path):
+    table = {"quantile": 0.95, "default": 0.1, "segments": {"a": 0.2, "b": math.nan}, "counts": {}}
+    written = write_threshold_table(table, str(tmp_path / "thresholds.json"))
+
+    assert written["segments"] == {"a": 0.2}
+    with open(tmp_path / "thresholds.json") as f:
+        assert json.load(f)["segments"] == {"a": 0.2}
+
+    with pytest.raises(ValueError):
+        write_threshold_table({**table, "default": math.nan}, str(tmp_path / "thresholds.json"))
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+import pandas as pd
+
+from anomaly_detector.data_generator import generate_dataset_columnar, write_dataset_parquet
+
+NOW = datetime(2024, 1, 31, 12, 0)
+
+
+def test_output_for_a_seed_does_not_depend_on_workers():
+    serial = generate_dataset_columnar(120, seed=7, n_jobs=1, shard_size=50, now=NOW)
+    parallel = generate_dataset_columnar(120, seed=7, n_jobs=2, shard_size=50, now=NOW)
+
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert serial["merchant_id"].nunique() == 120
+    assert not serial["is_anomalous"].groupby(serial["merchant_id"], observed=True).first().iloc[:96].any()
+
+
+def test_parquet_shards_hold_the_same_rows(tmp_path):
+    paths = write_dataset_parquet(tmp_path, 120, seed=7, n_jobs=2, shard_size=50, now=NOW)
+    written = pd.concat([pd.read_parquet(path) for path in sorted(paths)], ignore_index=True)
+    expected = generate_dataset_columnar(120, seed=7, shard_size=50, now=NOW)
+
+    assert len(paths) == 3
+    pd.testing.assert_frame_equal(
+        written.astype({"merchant_id": str}), expected.astype({"merchant_id": str}),
+        check_categorical=False, check_dtype=False
+    )
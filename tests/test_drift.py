@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+
+from anomaly_detector import app as app_module
+from anomaly_detector.data_generator import generate_dataset
+from anomaly_detector.drift import DriftMonitor, ReferenceProfile
+from anomaly_detector.infer import FEATURE_COLUMNS, registry
+from anomaly_detector.preprocess import build_feature_dataframe
+from anomaly_detector.tenants import segment_models
+
+
+def test_non_finite_rows_stay_out_of_the_window():
+    rng = np.random.default_rng(0)
+    samples = rng.normal(size=(500, len(FEATURE_COLUMNS) + 1))
+    reference = ReferenceProfile.from_samples(samples, FEATURE_COLUMNS + ["anomaly_score"])
+
+    monitor = DriftMonitor(FEATURE_COLUMNS, window=1000, min_samples=100)
+    monitor.observe(samples[:200, :-1], samples[:200, -1])
+    bad = samples[:3, :-1].copy()
+    bad[0, -1] = np.nan
+    bad[1, 0] = np.inf
+    monitor.observe(bad, [0.1, 0.2, np.nan])
+
+    report = monitor.report(reference)
+    assert report["window_size"] == 200
+    assert report["non_finite_total"] == 3
+    json.dumps(report, allow_nan=False)
+
+
+def test_drift_survives_single_transaction_merchant(client):
+    client.post("/drift/reset")
+    features = build_feature_dataframe(generate_dataset(200))[FEATURE_COLUMNS]
+    response = client.post("/predict/batch", json={"columns": features.to_dict("list")})
+    assert response.status_code == 200
+
+    response = client.post("/score", json={"transactions": [{
+        "transaction_id": "t1",
+        "merchant_id": "drift-single",
+        "customer_id": "c1",
+        "timestamp": "2024-01-01T10:00:00",
+        "amount": 25.0,
+    }]})
+    assert response.status_code == 200
+
+    response = client.get("/drift")
+    assert response.status_code == 200
+    assert response.json()["window_size"] >= 100
+
+
+def test_bundle_scores_are_monitored_against_their_own_reference(segment_bundle):
+    features = build_feature_dataframe(generate_dataset(200))[FEATURE_COLUMNS].to_numpy(dtype=float)
+    before = registry.drift_monitor.report(None)["observed_total"]
+
+    app_module.score_and_calibrate(features[:40], [segment_bundle] * 40)
+
+    assert registry.drift_monitor.report(None)["observed_total"] == before
+    assert segment_models.drift_reports()[segment_bundle]["observed_total"] >= 40
@@ -0,0 +1,60 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from anomaly_detector.infer import BASE_DIR, FEATURE_COLUMNS
+from anomaly_detector.numpy_engine import load_numpy_artifacts, parity_check
+from anomaly_detector.runtimes import load_runtime_artifacts
+
+# Per-row reconstruction error gap to the Keras model
+TOLERANCE = 1e-7
+
+ENGINE_MODULES = {
+    "numpy": None,
+    "onnx": "onnxruntime",
+    "tflite": "tensorflow",
+}
+
+
+def load_engine(engine):
+    if ENGINE_MODULES[engine] is not None:
+        pytest.importorskip(ENGINE_MODULES[engine])
+    if engine == "numpy":
+        return load_numpy_artifacts("autoencoder.npz")
+    return load_runtime_artifacts(engine)
+
+
+@pytest.fixture(scope="module")
+def keras_artifacts():
+    pytest.importorskip("keras")
+    import joblib
+    from keras.models import load_model
+
+    _, threshold, _ = load_numpy_artifacts("autoencoder.npz")
+    return (
+        load_model(os.path.join(BASE_DIR, "autoencoder.keras")),
+        threshold,
+        joblib.load(os.path.join(BASE_DIR, "scaler.joblib")),
+    )
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+@pytest.mark.parametrize("engine", sorted(ENGINE_MODULES))
+def test_engine_matches_keras(keras_artifacts, engine):
+    assert parity_check(keras_artifacts, load_engine(engine)) <= TOLERANCE
+
+
+@pytest.mark.parametrize("engine", ["onnx", "tflite"])
+def test_runtime_is_safe_to_share_across_threads(engine):
+    model, _, _ = load_engine(engine)
+    rng = np.random.default_rng(0)
+    batches = [rng.uniform(size=(1 + i % 5, len(FEATURE_COLUMNS))).astype(np.float32) for i in range(400)]
+    expected = [model.predict(batch) for batch in batches]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(model.predict, batches))
+
+    for result, reference in zip(results, expected):
+        np.testing.assert_array_equal(result, reference)
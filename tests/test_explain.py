@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from anomaly_detector.infer import FEATURE_COLUMNS, predict_anomaly, predict_anomaly_batch
+
+
+@pytest.fixture(scope="module")
+def features(feature_frame):
+    return feature_frame[FEATURE_COLUMNS].dropna()
+
+
+def test_feature_errors_average_to_the_score(features):
+    result = predict_anomaly(features.to_numpy(dtype=float)[0], use_cache=False)
+
+    errors = result["feature_errors"]
+    assert list(errors) == FEATURE_COLUMNS
+    assert np.mean(list(errors.values())) == pytest.approx(result["anomaly_score"])
+    assert sorted(result["top_features"]) == sorted(FEATURE_COLUMNS)
+    ranked = [errors[name] for name in result["top_features"]]
+    assert ranked == sorted(ranked, reverse=True)
+
+
+def test_batch_ranking_orders_feature_errors(features):
+    result = predict_anomaly_batch(features.to_numpy(dtype=float), use_cache=False)
+
+    np.testing.assert_allclose(result["feature_errors"].mean(axis=1), result["anomaly_score"])
+    ranked = np.take_along_axis(result["feature_errors"], result["feature_ranking"], axis=1)
+    assert np.all(np.diff(ranked, axis=1) <= 0)
+
+
+def test_explain_false_omits_feature_errors(features):
+    row = features.to_numpy(dtype=float)[0]
+    assert "feature_errors" not in predict_anomaly(row, explain=False)
+    assert "feature_ranking" not in predict_anomaly_batch([row], explain=False)
+
+
+def test_predict_endpoint_explain_flag(client, features):
+    body = features.iloc[0].to_dict()
+
+    explained = client.post("/predict", json=body).json()
+    assert set(explained["feature_errors"]) == set(FEATURE_COLUMNS)
+
+    plain = client.post("/predict", params={"explain": "false"}, json=body).json()
+    assert "feature_errors" not in plain and "top_features" not in plain
+    assert plain["anomaly_score"] == pytest.approx(explained["anomaly_score"])
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from anomaly_detector.data_generator import generate_dataset
+from anomaly_detector.feature_store import MerchantFeatureStore
+from anomaly_detector.infer import FEATURE_COLUMNS
+from anomaly_detector.preprocess import build_feature_dataframe
+
+
+def test_store_matches_batch_features():
+    transactions = generate_dataset(100)
+    store = MerchantFeatureStore()
+    store.ingest_many(transactions)
+
+    expected = build_feature_dataframe(transactions).set_index("merchant_id")
+    for merchant_id, row in expected.iterrows():
+        features = store.features(merchant_id)
+        np.testing.assert_allclose(
+            [features[c] for c in FEATURE_COLUMNS], row[FEATURE_COLUMNS].to_numpy(float), rtol=1e-9
+        )
+
+
+def test_mixed_timezones_are_compared_in_utc():
+    store = MerchantFeatureStore()
+    naive = datetime(2024, 1, 1, 12, 0)
+    store.ingest({"merchant_id": "m", "customer_id": "c", "timestamp": naive, "amount": 1.0})
+    store.ingest({
+        "merchant_id": "m",
+        "customer_id": "c",
+        "timestamp": datetime(2024, 1, 1, 14, 0, tzinfo=timezone(timedelta(hours=1))),
+        "amount": 1.0,
+    })
+
+    assert store.transaction_count("m") == 2
+    assert store.features("m")["time_diff_minutes"] == pytest.approx(60.0)
+
+
+def test_invalid_transaction_leaves_state_untouched():
+    store = MerchantFeatureStore()
+    store.ingest({"merchant_id": "m", "customer_id": "c", "timestamp": "2024-01-01T12:00:00", "amount": 1.0})
+    before = store.features("m")
+
+    with pytest.raises((TypeError, ValueError)):
+        store.ingest({"merchant_id": "m", "customer_id": "c", "timestamp": 12345, "amount": 1.0})
+
+    assert store.transaction_count("m") == 1
+    assert store.features("m") == pytest.approx(before, nan_ok=True)
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from anomaly_detector.benchmarks.features import (
+    legacy_avg_time_between_transactions,
+    legacy_build_feature_dataframe,
+    legacy_late_night_frequency,
+    legacy_peak_transaction_hour,
+)
+from anomaly_detector.data_generator import generate_dataset
+from anomaly_detector.preprocess import (
+    avg_time_between_transactions,
+    build_feature_dataframe,
+    late_night_frequency,
+    peak_transaction_hour,
+    transactions_to_df,
+)
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    return generate_dataset(200)
+
+
+def test_vectorized_features_match_reference(transactions):
+    pd.testing.assert_frame_equal(
+        build_feature_dataframe(transactions),
+        legacy_build_feature_dataframe(transactions),
+        check_exact=False,
+        rtol=1e-9,
+    )
+
+
+def test_feature_helpers_accept_raw_transactions(transactions):
+    pd.testing.assert_frame_equal(
+        peak_transaction_hour(transactions).sort_values("merchant_id", ignore_index=True),
+        legacy_peak_transaction_hour(transactions).sort_values("merchant_id", ignore_index=True),
+        check_dtype=False,
+    )
+    pd.testing.assert_frame_equal(
+        late_night_frequency(transactions).sort_values("merchant_id", ignore_index=True),
+        legacy_late_night_frequency(transactions).sort_values("merchant_id", ignore_index=True),
+    )
+
+
+def test_average_gap_matches_mean_of_gaps(transactions):
+    df = transactions_to_df(transactions)
+    pd.testing.assert_frame_equal(
+        avg_time_between_transactions(df),
+        legacy_avg_time_between_transactions(df),
+        check_exact=False,
+        rtol=1e-9,
+    )
@@ -0,0 +1,49 @@
+import pytest
+
+from anomaly_detector.data_generator import generate_dataset
+from anomaly_detector.hybrid import DEFAULT_FUSION, score_transactions
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    return generate_dataset(50)
+
+
+def test_rules_first_skips_the_model_for_conclusive_merchants(transactions):
+    results = score_transactions(transactions, config={"order": "rules_first"})
+
+    assert len(results) == len({t["merchant_id"] for t in transactions})
+    for result in results:
+        rules, model = result["components"]["rules"], result["components"]["model"]
+        assert rules is not None
+        if rules["score"] >= DEFAULT_FUSION["rules_flag_at"]:
+            assert model is None and result["decided_by"] == "rules" and result["is_anomalous"]
+        else:
+            assert model is not None and result["decided_by"] == "fused"
+
+
+def test_model_first_skips_the_rules_for_conclusive_merchants(transactions):
+    for result in score_transactions(transactions, config={"order": "model_first"}):
+        rules, model = result["components"]["rules"], result["components"]["model"]
+        assert model is not None
+        conclusive = not (
+            DEFAULT_FUSION["model_clear_ratio"] < model["threshold_ratio"] < DEFAULT_FUSION["model_flag_ratio"]
+        )
+        assert (rules is None) == conclusive
+
+
+def test_score_endpoint(client):
+    transaction = {
+        "transaction_id": "t1",
+        "merchant_id": "hybrid-single",
+        "customer_id": "c1",
+        "timestamp": "2024-01-01T03:00:00",
+        "amount": 25.0,
+    }
+    response = client.post("/score", json={"transactions": [transaction]})
+    assert response.status_code == 200
+    # One transaction has no time gap, so only the rules can score it
+    assert response.json()["results"][0]["decided_by"] == "rules"
+
+    assert client.post("/score", json={"transactions": []}).status_code == 422
+    assert client.post("/score", json={"transactions": [transaction], "order": "x"}).status_code == 422
@@ -0,0 +1,121 @@
+import io
+import json
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from anomaly_detector.app import jobs
+from anomaly_detector.data_generator import generate_dataset
+from anomaly_detector.infer import FEATURE_COLUMNS
+from anomaly_detector.jobs import read_status, run_job
+from anomaly_detector.preprocess import build_feature_dataframe
+
+
+@pytest.fixture(scope="module")
+def features_csv():
+    features = build_feature_dataframe(generate_dataset(50))
+    return features[["merchant_id", *FEATURE_COLUMNS]].to_csv(index=False).encode()
+
+
+def wait_for(client, job_id, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["state"] in ("succeeded", "failed"):
+            return status
+        time.sleep(0.2)
+    raise AssertionError(f"job {job_id} still {status['state']}")
+
+
+def job_ids():
+    return set(os.listdir(jobs.jobs_dir)) if os.path.isdir(jobs.jobs_dir) else set()
+
+
+def test_upload_job_runs_to_completion(client, features_csv):
+    response = client.post("/jobs/upload?kind=features&format=csv", content=features_csv)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    status = wait_for(client, job_id)
+    assert status["state"] == "succeeded", status["error"]
+    assert status["rows_scored"] == status["rows_total"] > 0
+    assert any(job["id"] == job_id for job in client.get("/jobs").json()["jobs"])
+
+    page = client.get(f"/jobs/{job_id}/results?offset=0&limit=10").json()
+    assert len(page["results"]) == 10
+    assert {"row", "merchant_id", "anomaly_score", "top_feature"} <= set(page["results"][0])
+
+
+def test_server_side_job_reads_input_dir(client, features_csv):
+    os.makedirs(jobs.input_dir, exist_ok=True)
+    with open(os.path.join(jobs.input_dir, "features.csv"), "wb") as f:
+        f.write(features_csv)
+
+    response = client.post("/jobs", json={"kind": "features", "path": "features.csv"})
+    assert response.status_code == 202
+    assert wait_for(client, response.json()["id"])["state"] == "succeeded"
+
+
+@pytest.mark.parametrize("path", ["/etc/hostname", "../jobs", "/no/such/file.csv", "missing.csv"])
+def test_paths_outside_input_dir_are_indistinguishable(client, path):
+    before = job_ids()
+    response = client.post("/jobs", json={"kind": "features", "path": path, "format": "csv"})
+
+    assert response.status_code == 422
+    assert response.json()["detail"] == f"no input file {path!r} in the jobs input directory"
+    assert job_ids() == before
+
+
+def test_invalid_kind_leaves_no_job_behind(client, features_csv):
+    before = job_ids()
+    response = client.post("/jobs/upload?kind=bogus&format=csv", content=features_csv)
+
+    assert response.status_code == 422
+    assert job_ids() == before
+
+
+def run_in_process(tmp_path, path, file_format, chunksize):
+    job_dir = tmp_path / "job"
+    job_dir.mkdir()
+    (job_dir / "status.json").write_text(json.dumps({"rows_scored": 0, "rows_total": None}))
+    run_job(str(job_dir), "features", str(path), file_format, chunksize)
+    return read_status(str(job_dir))
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet"])
+def test_feature_rows_are_scored_chunk_by_chunk(tmp_path, monkeypatch, features_csv, file_format):
+    features = pd.read_csv(io.BytesIO(features_csv))
+    path = tmp_path / f"features.{file_format}"
+    if file_format == "csv":
+        path.write_bytes(features_csv)
+    else:
+        features.to_parquet(path)
+    n_rows = len(features)
+
+    read_csv = pd.read_csv
+
+    def chunked_read_csv(*args, **kwargs):
+        assert kwargs.get("chunksize"), "feature file read whole"
+        return read_csv(*args, **kwargs)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(pd, "read_csv", chunked_read_csv)
+        patch.setattr(pd, "read_parquet", None)
+        status = run_in_process(tmp_path, path, file_format, chunksize=16)
+
+    assert status["state"] == "succeeded", status["error"]
+    assert status["rows_scored"] == status["rows_total"] == n_rows
+    assert [count for _, count in status["parts"]][:-1] == [16] * (len(status["parts"]) - 1)
+    rows = pd.concat(pd.read_parquet(tmp_path / "job" / "results" / name) for name, _ in status["parts"])
+    assert rows["row"].tolist() == list(range(n_rows))
+
+
+def test_feature_job_without_feature_columns_fails(tmp_path):
+    path = tmp_path / "features.csv"
+    path.write_text("merchant_id,peak_hour\nm1,3\n")
+
+    with pytest.raises(ValueError, match="missing feature columns"):
+        run_in_process(tmp_path, path, "csv", chunksize=16)
+    assert read_status(str(tmp_path / "job"))["state"] == "failed"
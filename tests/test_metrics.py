@@ -0,0 +1,38 @@
+import pytest
+
+from anomaly_detector.infer import FEATURE_COLUMNS
+from anomaly_detector.metrics import Counter, Histogram, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = Histogram("test_seconds", "Test latency", ["stage"], buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage="scaling")
+
+    lines = registry.render().splitlines()
+    assert 'test_seconds_bucket{stage="scaling",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="scaling",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{stage="scaling",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{stage="scaling"} 3' in lines
+
+
+def test_labels_are_checked_and_names_unique():
+    registry = MetricsRegistry()
+    counter = Counter("test_total", "Test counter", ["status"], registry=registry)
+    with pytest.raises(ValueError):
+        counter.inc()
+    with pytest.raises(ValueError):
+        Counter("test_total", "Duplicate", registry=registry)
+
+
+def test_metrics_endpoint_exposes_inference_stages(client, feature_frame):
+    features = feature_frame[FEATURE_COLUMNS].dropna().iloc[0].to_dict()
+    assert client.post("/predict", json=features).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'anomaly_inference_stage_seconds_count{stage="scaling"}' in response.text
+    assert "anomaly_scored_total" in response.text
+    assert 'anomaly_http_requests_total{endpoint="/predict",method="POST",status="200"}' in response.text
@@ -0,0 +1,73 @@
+import pytest
+
+from anomaly_detector.pipeline import StageCache
+
+
+def make_stage_builder(calls):
+    def build(name, content):
+        def write(output_dir, *input_dirs):
+            calls.append(name)
+            inputs = [open(f"{d}/out.txt").read() for d in input_dirs]
+            with open(f"{output_dir}/out.txt", "w") as f:
+                f.write("+".join([*inputs, content]))
+        return write
+    return build
+
+
+def run_pipeline(cache, build, data_param, model_param):
+    data = cache.run("data", {"n": data_param}, [], build("data", str(data_param)))
+    model = cache.run("model", {"units": model_param}, [data], build("model", str(model_param)))
+    return data, model
+
+
+def test_unchanged_stages_are_reused(tmp_path):
+    calls = []
+    build = make_stage_builder(calls)
+    cache = StageCache(str(tmp_path), log=lambda message: None)
+
+    first = run_pipeline(cache, build, 10, 4)
+    second = run_pipeline(cache, build, 10, 4)
+    assert calls == ["data", "model"]
+    assert [stage.cached for stage in first] == [False, False]
+    assert [stage.cached for stage in second] == [True, True]
+    assert open(second[1].file("out.txt")).read() == "10+4"
+
+
+def test_changed_parameter_reruns_downstream_only(tmp_path):
+    calls = []
+    build = make_stage_builder(calls)
+    cache = StageCache(str(tmp_path), log=lambda message: None)
+
+    run_pipeline(cache, build, 10, 4)
+    calls.clear()
+    data, model = run_pipeline(cache, build, 10, 8)
+    assert calls == ["model"] and data.cached and not model.cached
+
+    calls.clear()
+    run_pipeline(cache, build, 20, 8)
+    assert calls == ["data", "model"]
+
+
+def test_forced_stage_is_rebuilt(tmp_path):
+    calls = []
+    build = make_stage_builder(calls)
+    run_pipeline(StageCache(str(tmp_path), log=lambda message: None), build, 10, 4)
+
+    calls.clear()
+    forced = StageCache(str(tmp_path), force=["data"], log=lambda message: None)
+    data, model = run_pipeline(forced, build, 10, 4)
+    # Same outputs, so the model stage's key (and cache entry) is unchanged
+    assert calls == ["data"] and not data.cached and model.cached
+
+
+def test_interrupted_stage_is_not_cached(tmp_path):
+    cache = StageCache(str(tmp_path), log=lambda message: None)
+
+    def fail(output_dir):
+        raise RuntimeError("interrupted")
+
+    with pytest.raises(RuntimeError):
+        cache.run("data", {}, [], fail)
+    calls = []
+    stage = cache.run("data", {}, [], lambda output_dir: calls.append(output_dir))
+    assert calls and not stage.cached
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from anomaly_detector.infer import FEATURE_COLUMNS, predict_anomaly, predict_anomaly_batch
+
+
+@pytest.fixture(scope="module")
+def features(feature_frame):
+    return feature_frame[FEATURE_COLUMNS].dropna()
+
+
+def test_batch_matches_single_row_scoring(features):
+    rows = features.to_numpy(dtype=float)[:20]
+    batch = predict_anomaly_batch(rows, use_cache=False)
+
+    for i, row in enumerate(rows):
+        single = predict_anomaly(row, use_cache=False)
+        assert batch["anomaly_score"][i] == pytest.approx(single["anomaly_score"], rel=1e-7)
+        assert bool(batch["is_anomalous"][i]) == single["is_anomalous"]
+
+
+def test_columnar_input_matches_row_input(features):
+    rows = predict_anomaly_batch(features.to_numpy(dtype=float), use_cache=False)
+    columns = predict_anomaly_batch(features.to_dict("list"), use_cache=False)
+    np.testing.assert_allclose(columns["anomaly_score"], rows["anomaly_score"], rtol=1e-12)
+
+
+def test_batch_endpoint_accepts_rows_and_columns(client, features):
+    merchants = features.head(5).to_dict("records")
+    by_rows = client.post("/predict/batch", json={"merchants": merchants})
+    by_columns = client.post("/predict/batch", json={"columns": features.head(5).to_dict("list")})
+    assert by_rows.status_code == by_columns.status_code == 200
+
+    scores = [r["anomaly_score"] for r in by_rows.json()["results"]]
+    assert scores == pytest.approx([r["anomaly_score"] for r in by_columns.json()["results"]])
+    assert len(scores) == 5
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"merchants": [], "columns": {c: [] for c in FEATURE_COLUMNS}},
+    {"columns": {c: [1.0] * (2 if c == "peak_hour" else 1) for c in FEATURE_COLUMNS}},
+    {"columns": {c: [1.0] for c in FEATURE_COLUMNS}, "segments": ["a", "b"]},
+])
+def test_batch_endpoint_rejects_malformed_requests(client, body):
+    assert client.post("/predict/batch", json=body).status_code == 422
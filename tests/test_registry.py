@@ -0,0 +1,61 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from anomaly_detector.infer import BASE_DIR, ArtifactRegistry, Artifacts
+
+
+@pytest.fixture
+def artifact_dir(tmp_path):
+    shutil.copyfile(os.path.join(BASE_DIR, "autoencoder.npz"), tmp_path / "autoencoder.npz")
+    return tmp_path
+
+
+def make_registry(artifact_dir):
+    return ArtifactRegistry(
+        engine="numpy",
+        engine_path=str(artifact_dir / "autoencoder.npz"),
+        thresholds_path=str(artifact_dir / "thresholds.json"),
+        reference_path=str(artifact_dir / "drift_reference.npz"),
+        check_interval=0,
+        record_metrics=False,
+    )
+
+
+def test_reload_swaps_in_changed_artifacts(artifact_dir):
+    registry = make_registry(artifact_dir)
+    before = registry.load()
+
+    with np.load(artifact_dir / "autoencoder.npz") as data:
+        arrays = dict(data)
+    arrays["threshold"] = np.array(before.threshold * 2)
+    np.savez(artifact_dir / "autoencoder.npz", **arrays)
+
+    after = registry.get()
+    assert after.version != before.version
+    assert after.threshold == pytest.approx(before.threshold * 2)
+
+
+@pytest.mark.parametrize("content", ["truncated", "garbage"])
+def test_reload_keeps_serving_on_unreadable_artifacts(artifact_dir, content):
+    registry = make_registry(artifact_dir)
+    before = registry.load()
+
+    path = artifact_dir / "autoencoder.npz"
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2] if content == "truncated" else b"\x80\x04not an npz")
+
+    assert registry.reload_if_changed() is False
+    assert registry.get() is before
+
+
+def test_artifacts_without_a_threshold_table_share_no_state():
+    first = Artifacts(model=None, threshold=0.5, scaler=None, version="a")
+    second = Artifacts(model=None, threshold=0.7, scaler=None, version="b")
+
+    # No mutable default for one instance to edit under the others
+    assert first.segment_thresholds is None and second.segment_thresholds is None
+    assert first.threshold_for("retail") == 0.5
+    assert second.thresholds_for(["retail", None]).tolist() == [0.7, 0.7]
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from anomaly_detector.benchmarks.rules import legacy_apply_rule_based_scoring
+from anomaly_detector.data_generator import generate_dataset, generate_dataset_columnar
+from anomaly_detector.rules import apply_rule_based_scoring
+
+
+@pytest.mark.parametrize("transactions", [
+    generate_dataset(100),
+    generate_dataset_columnar(100, seed=0),
+], ids=["dicts", "columnar"])
+def test_vectorized_rules_match_reference(transactions):
+    pd.testing.assert_frame_equal(
+        apply_rule_based_scoring(transactions),
+        legacy_apply_rule_based_scoring(transactions),
+        check_dtype=False,
+    )
+
+
+def test_trailing_velocity_window_counts_within_the_window():
+    transactions = [
+        {"transaction_id": f"t{i}", "merchant_id": "m", "customer_id": f"c{i}",
+         "timestamp": f"2024-01-0{1 + i // 4} 10:0{i % 4}:00", "amount": 10.0}
+        for i in range(8)
+    ]
+    # Eight in the 10:00 hour-of-day bucket over two days, at most four in
+    # any trailing hour
+    hourly = apply_rule_based_scoring(transactions)
+    windowed = apply_rule_based_scoring(
+        transactions, rules={"velocity_window": "1h", "high_velocity_threshold": 4}
+    )
+
+    assert hourly["high_velocity_score"].eq(1).all()
+    assert windowed["high_velocity_score"].eq(0).all()
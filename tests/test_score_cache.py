@@ -0,0 +1,77 @@
+import os
+import shutil
+
+import numpy as np
+
+from anomaly_detector import infer
+from anomaly_detector.data_generator import generate_dataset
+from anomaly_detector.infer import BASE_DIR, FEATURE_COLUMNS, ArtifactRegistry, predict_anomaly_batch
+from anomaly_detector.preprocess import build_feature_dataframe
+from anomaly_detector.score_cache import ScoreCache
+
+
+def errors(n, width=6):
+    return np.arange(n * width, dtype=np.float64).reshape(n, width)
+
+
+def test_hit_miss_and_lru_eviction():
+    cache = ScoreCache(max_entries=2)
+    keys = cache.keys(np.eye(3))
+    cache.store("v1", keys, errors(3))
+
+    found = cache.lookup("v1", keys, 6)
+    assert np.isnan(found[0]).all()
+    np.testing.assert_array_equal(found[1:], errors(3)[1:])
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 1, 1)
+    assert np.isnan(cache.lookup("v2", keys[1:], 6)).all()
+
+
+def test_quantized_keys_merge_nearby_vectors():
+    cache = ScoreCache(decimals=4)
+    assert cache.keys([[0.12341, -0.0]]) == cache.keys([[0.12344, 0.0]])
+    assert ScoreCache().keys([[0.12341]]) != ScoreCache().keys([[0.12344]])
+
+
+def test_entries_expire_after_ttl():
+    cache = ScoreCache(ttl=0.0)
+    keys = cache.keys(np.eye(2))
+    cache.store("v1", keys, errors(2))
+
+    assert np.isnan(cache.lookup("v1", keys, 6)).all()
+    assert cache.expired == 2 and len(cache) == 0
+
+
+def test_invalidate_drops_one_version():
+    cache = ScoreCache()
+    keys = cache.keys(np.eye(2))
+    cache.store("v1", keys, errors(2))
+    cache.store("v2", keys, errors(2))
+
+    cache.invalidate("v1")
+    assert np.isnan(cache.lookup("v1", keys, 6)).all()
+    assert not np.isnan(cache.lookup("v2", keys, 6)).any()
+
+
+def test_reload_invalidates_previous_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(infer, "score_cache", ScoreCache())
+    shutil.copyfile(os.path.join(BASE_DIR, "autoencoder.npz"), tmp_path / "autoencoder.npz")
+    registry = ArtifactRegistry(
+        engine="numpy",
+        engine_path=str(tmp_path / "autoencoder.npz"),
+        thresholds_path=str(tmp_path / "thresholds.json"),
+        reference_path=str(tmp_path / "drift_reference.npz"),
+        check_interval=None,
+        record_metrics=False,
+    )
+    artifacts = registry.load()
+
+    X = build_feature_dataframe(generate_dataset(20))[FEATURE_COLUMNS].to_numpy(dtype=float)[:5]
+    first = predict_anomaly_batch(X, artifacts=artifacts, explain=False)
+    again = predict_anomaly_batch(X, artifacts=artifacts, explain=False)
+    np.testing.assert_allclose(first["anomaly_score"], again["anomaly_score"], rtol=1e-7)
+    assert infer.score_cache.hits == 5 and len(infer.score_cache) > 0
+
+    with open(tmp_path / "thresholds.json", "w") as f:
+        f.write('{"default": 1.0, "segments": {}}')
+    assert registry.load().version != artifacts.version
+    assert len(infer.score_cache) == 0
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from anomaly_detector.infer import FEATURE_COLUMNS, predict_anomaly_batch
+from anomaly_detector.tenants import SegmentRegistry, predict_segmented, segment_models
+
+
+@pytest.fixture(scope="module")
+def features(feature_frame):
+    return feature_frame[FEATURE_COLUMNS].dropna().to_numpy(dtype=float)[:20]
+
+
+def test_rows_are_routed_to_their_bundle(segment_bundle, features):
+    segments = [segment_bundle, None] * 10
+    result = predict_segmented(features, segments)
+
+    assert result["model_segment"].tolist() == segments
+    bundle_version = segment_models.get(segment_bundle).version
+    assert set(result["model_version"][0::2]) == {bundle_version}
+    assert set(result["model_version"][1::2]) == {result["default_model_version"]}
+
+    # The bundle is an export of the default model, so the scores agree
+    np.testing.assert_allclose(
+        result["anomaly_score"],
+        predict_anomaly_batch(features, use_cache=False)["anomaly_score"],
+        rtol=1e-7,
+    )
+
+
+def test_segments_endpoint_lists_loaded_bundles(client, segment_bundle, features):
+    rows = [dict(zip(FEATURE_COLUMNS, row), segment=segment_bundle) for row in features[:3]]
+    assert client.post("/predict/batch", json={"merchants": rows}).status_code == 200
+
+    stats = client.get("/segments").json()
+    assert segment_bundle in stats["available"]
+    assert segment_bundle in stats["loaded"]
+    assert stats["loaded"][segment_bundle]["bytes"] > 0
+
+
+def test_bundle_discovery_is_cached_between_checks(tmp_path, monkeypatch):
+    registry = SegmentRegistry(root=str(tmp_path), check_interval=60)
+    assert not registry.has_bundle("late")
+
+    (tmp_path / "late").mkdir()
+    (tmp_path / "late" / "activations.npy").touch()
+    assert not registry.has_bundle("late")
+    assert registry.refresh() == {"late"}
+
+    def no_scan(path):
+        raise AssertionError("bundle directory scanned on lookup")
+
+    monkeypatch.setattr("anomaly_detector.tenants.os.listdir", no_scan)
+    assert all(registry.has_bundle("late") for _ in range(100))
+    assert registry.segments() == ["late"]
+
+
+def test_bundle_discovery_rescans_after_the_check_interval(tmp_path):
+    registry = SegmentRegistry(root=str(tmp_path), check_interval=0)
+    assert registry.segments() == []
+
+    (tmp_path / "new").mkdir()
+    (tmp_path / "new" / "activations.npy").touch()
+    (tmp_path / ".new.partial").mkdir()
+    assert registry.segments() == ["new"]
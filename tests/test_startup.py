@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+
+def test_ready_after_startup(client):
+    response = client.get("/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ready"] is True
+    assert body["engine"] == "numpy"
+    assert body["model_version"]
+
+
+def test_numpy_engine_does_not_import_tensorflow():
+    script = (
+        "import sys\n"
+        "from anomaly_detector.app import registry\n"
+        "registry.load()\n"
+        "assert registry.resolved_engine() == 'numpy'\n"
+        "assert 'tensorflow' not in sys.modules, 'tensorflow was imported'\n"
+    )
+    env = {**os.environ, "ANOMALY_ENGINE": "numpy", "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from anomaly_detector.data_generator import generate_dataset
+from anomaly_detector.preprocess import build_feature_dataframe
+from anomaly_detector.streaming import (
+    StreamingFeatureAggregator,
+    iter_csv_chunks,
+    iter_transaction_chunks,
+    stream_feature_dataframe,
+)
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    return generate_dataset(200)
+
+
+@pytest.fixture(scope="module")
+def expected(transactions):
+    return build_feature_dataframe(transactions)
+
+
+def assert_features_equal(actual, expected):
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("chunksize", [97, 100_000])
+def test_chunked_features_match_batch(transactions, expected, chunksize):
+    assert_features_equal(
+        stream_feature_dataframe(iter_transaction_chunks(transactions, chunksize)), expected
+    )
+
+
+def test_merged_shards_match_batch(transactions, expected):
+    middle = len(transactions) // 2
+    left = StreamingFeatureAggregator().update(transactions[:middle])
+    right = StreamingFeatureAggregator().update(transactions[middle:])
+
+    assert_features_equal(left.merge(right).to_frame(), expected)
+
+
+def test_csv_chunks_match_batch(transactions, expected, tmp_path):
+    path = tmp_path / "transactions.csv"
+    pd.DataFrame(transactions).to_csv(path, index=False)
+
+    assert_features_equal(stream_feature_dataframe(iter_csv_chunks(path, chunksize=500)), expected)
+
+
+def test_hll_customer_counts_are_close(transactions, expected):
+    approximate = stream_feature_dataframe(
+        iter_transaction_chunks(transactions, 500), distinct_customers="hll", hll_precision=10
+    )
+    exact = expected["unique_customer_count"]
+    error = (approximate["unique_customer_count"] - exact).abs() / exact
+    assert error.max() < 0.2 and error.mean() < 0.05
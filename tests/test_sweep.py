@@ -0,0 +1,73 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("keras")
+
+from anomaly_detector.infer import FEATURE_COLUMNS
+from anomaly_detector.pipeline import StageCache
+from anomaly_detector.sweep import evaluate_config, pareto_frontier, prepare_data
+from anomaly_detector.train import data_stages
+
+
+def result(name, f1, latency_us, parameters):
+    return {"name": name, "f1": f1, "latency_us": latency_us, "parameters": parameters}
+
+
+def test_pareto_frontier_drops_dominated_configs_and_keeps_ties():
+    results = [
+        result("small", 0.6, 10.0, 100),
+        result("accurate", 0.9, 30.0, 1000),
+        # Worse than "small" on f1 and latency, equal on size
+        result("dominated", 0.5, 20.0, 100),
+        # Equal to "accurate" on f1 and latency, larger
+        result("bloated", 0.9, 30.0, 2000),
+        # Identical results dominate neither each other nor are dominated
+        result("twin-a", 0.7, 15.0, 500),
+        result("twin-b", 0.7, 15.0, 500),
+    ]
+
+    frontier = [r["name"] for r in pareto_frontier(results)]
+    assert frontier == ["accurate", "twin-a", "twin-b", "small"]
+
+
+def test_prepare_data_keeps_labels_aligned_with_rows(tmp_path):
+    cache = StageCache(str(tmp_path), log=lambda message: None)
+    data = np.load(prepare_data(cache, 60, seed=0, split_ratio=0.8, holdout_ratio=0.25))
+
+    # Same cache entries as the training pipeline
+    generated, features, scaled = data_stages(cache, 60, 0, None, 0.8)
+    assert generated.cached and features.cached and scaled.cached
+
+    splits = np.load(scaled.file("splits.npz"))
+    frame = pd.read_parquet(features.file("features.parquet")).set_index("merchant_id")
+    scaler = joblib.load(scaled.file("scaler.joblib"))
+    anomalous = pd.read_parquet(generated.file("transactions.parquet")).groupby(
+        "merchant_id", observed=True
+    )["is_anomalous"].max()
+
+    # Fit and holdout rows partition the training rows
+    n_holdout = len(data["X_eval"]) - len(splits["X_test"])
+    assert len(data["X_fit"]) + n_holdout == len(splits["X_train"])
+    np.testing.assert_array_equal(data["X_eval"][n_holdout:], splits["X_test"])
+
+    # Every evaluation row holds its merchant's features and flag
+    merchants = data["merchant_eval"]
+    assert len(set(merchants)) == len(merchants) == len(data["y_eval"])
+    np.testing.assert_allclose(
+        data["X_eval"], scaler.transform(frame.loc[merchants, FEATURE_COLUMNS])
+    )
+    np.testing.assert_array_equal(data["y_eval"], anomalous[merchants].to_numpy(dtype=bool))
+
+
+def test_evaluate_config_trains_like_the_pipeline(tmp_path):
+    cache = StageCache(str(tmp_path), log=lambda message: None)
+    data_path = prepare_data(cache, 60, seed=0, split_ratio=0.8, holdout_ratio=0.25)
+    config = {"encoder_units": [8], "bottleneck": 4, "batch_size": 16, "epochs": 3, "patience": 1}
+
+    # threads=0 leaves the already-initialised TensorFlow runtime alone
+    result = evaluate_config(config, data_path, percentile=95, seed=0, threads=0)
+    assert 1 <= result["epochs_run"] <= 3
+    assert result["hidden_units"] == [8, 4, 8]
+    assert 0.0 <= result["f1"] <= 1.0
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+keras = pytest.importorskip("keras")
+
+from anomaly_detector.train import ConvergenceTimer, EpochCheckpoint, ResumableEarlyStopping
+
+LOSSES = [1.0, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
+
+
+def make_callbacks(checkpoint_dir, model):
+    checkpoint_dir.mkdir(exist_ok=True)
+    tracked = {
+        "timer": ConvergenceTimer("loss"),
+        "early_stopping": ResumableEarlyStopping(
+            monitor="loss", patience=3, restore_best_weights=True
+        ),
+    }
+    checkpoint = EpochCheckpoint(str(checkpoint_dir), tracked)
+    restored, initial_epoch = checkpoint.restore()
+    model = restored or model
+    callbacks = [*tracked.values(), checkpoint]
+    for callback in callbacks:
+        callback.set_model(model)
+    return model, callbacks, initial_epoch
+
+
+def run_epochs(model, callbacks, epochs):
+    """Drive the callbacks like fit(), with weights that change every epoch"""
+    for callback in callbacks:
+        callback.on_train_begin()
+    for epoch in epochs:
+        model.set_weights([np.full_like(w, epoch) for w in model.get_weights()])
+        for callback in callbacks:
+            callback.on_epoch_end(epoch, {"loss": LOSSES[epoch]})
+        if model.stop_training:
+            break
+    for callback in callbacks:
+        callback.on_train_end()
+    return epoch
+
+
+def new_model():
+    model = keras.Sequential([keras.Input(shape=(2,)), keras.layers.Dense(2)])
+    model.stop_training = False
+    return model
+
+
+def test_resumed_run_stops_like_an_uninterrupted_one(tmp_path):
+    model, callbacks, _ = make_callbacks(tmp_path / "straight", new_model())
+    stopped = run_epochs(model, callbacks, range(len(LOSSES)))
+    expected_report = callbacks[0].report()
+
+    model, callbacks, _ = make_callbacks(tmp_path / "resumed", new_model())
+    run_epochs(model, callbacks, range(3))
+
+    model, callbacks, initial_epoch = make_callbacks(tmp_path / "resumed", new_model())
+    model.stop_training = False
+    assert initial_epoch == 3
+    assert run_epochs(model, callbacks, range(initial_epoch, len(LOSSES))) == stopped
+
+    report = callbacks[0].report()
+    assert [e["epoch"] for e in report["history"]] == [e["epoch"] for e in expected_report["history"]]
+    assert report["best_epoch"] == expected_report["best_epoch"] == 2
+    # Best weights (epoch index 1) survive the restart
+    assert all(np.all(w == 1) for w in model.get_weights())
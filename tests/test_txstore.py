@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from anomaly_detector.data_generator import generate_dataset
+from anomaly_detector.preprocess import build_feature_dataframe
+from anomaly_detector.rules import apply_rule_based_scoring, iter_rule_scores
+from anomaly_detector.txstore import ColumnarTransactionStore
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    return generate_dataset(200)
+
+
+@pytest.fixture(scope="module")
+def store(transactions, tmp_path_factory):
+    return ColumnarTransactionStore.write(
+        str(tmp_path_factory.mktemp("store")), transactions, chunksize=997
+    )
+
+
+def test_store_round_trips_transactions(transactions, store):
+    frame = store.to_frame()
+    expected = pd.DataFrame(transactions)
+
+    assert len(store) == len(transactions)
+    assert frame["merchant_id"].astype(str).tolist() == expected["merchant_id"].tolist()
+    assert frame["amount"].tolist() == pytest.approx(expected["amount"].tolist())
+
+
+def test_store_features_match_list_input(transactions, store):
+    pd.testing.assert_frame_equal(
+        build_feature_dataframe(store).astype({"merchant_id": str}),
+        build_feature_dataframe(transactions),
+        check_exact=False,
+        rtol=1e-9,
+    )
+
+
+@pytest.mark.parametrize("rules", [None, {"velocity_window": "1h"}])
+def test_store_rule_scores_match_list_input(transactions, store, rules):
+    expected = apply_rule_based_scoring(transactions, rules)
+    scored = apply_rule_based_scoring(store, rules)
+    chunked = pd.concat(list(iter_rule_scores(store, rules, chunksize=500)), ignore_index=True)
+
+    for result in (scored, chunked):
+        pd.testing.assert_frame_equal(
+            result.astype({"merchant_id": str, "transaction_id": str}),
+            expected.astype({"merchant_id": str, "transaction_id": str}),
+        )
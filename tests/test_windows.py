@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_detector.data_generator import generate_dataset
+from anomaly_detector.windows import (
+    WINDOWS,
+    WindowedFeatureStore,
+    merchant_window_features,
+    transaction_window_features,
+)
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    # The live store matches the batch windows for in-order arrivals
+    frame = pd.DataFrame(generate_dataset(100))
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"])
+    return frame.sort_values("timestamp", kind="stable").to_dict("records")
+
+
+def test_streaming_windows_match_batch_per_transaction(transactions):
+    store = WindowedFeatureStore()
+    streamed = pd.DataFrame([store.ingest(t) for t in transactions])
+    batch = transaction_window_features(transactions)
+
+    for name in WINDOWS:
+        np.testing.assert_array_equal(streamed[f"txns_{name}"], batch[f"txns_{name}"])
+        np.testing.assert_allclose(streamed[f"amount_{name}"], batch[f"amount_{name}"], rtol=1e-9)
+
+
+def test_streaming_peaks_match_batch_per_merchant(transactions):
+    store = WindowedFeatureStore()
+    store.ingest_many(transactions)
+    batch = merchant_window_features(transactions).set_index("merchant_id")
+
+    streamed = pd.DataFrame.from_dict(
+        {merchant_id: store.features(merchant_id) for merchant_id in batch.index},
+        orient="index",
+    )
+    for column in batch.columns:
+        np.testing.assert_allclose(streamed[column], batch[column], rtol=1e-9, err_msg=column)
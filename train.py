@@ -1,70 +1,476 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import joblib
+import keras
 import numpy as np
+import pandas as pd
+import tensorflow as tf
+from keras.models import load_model
 from sklearn.preprocessing import MinMaxScaler
-import joblib
-from data_generator import generate_dataset
-from preprocess import build_feature_dataframe
-from model import build_autoencoder
-import os
+
+from anomaly_detector.data_generator import generate_dataset_columnar
+from anomaly_detector.drift import ReferenceProfile
+from anomaly_detector.infer import FEATURE_COLUMNS
+from anomaly_detector.model import build_autoencoder
+from anomaly_detector.numpy_engine import NumpyAutoencoder, dense_layers, export_numpy_artifacts
+from anomaly_detector.pipeline import StageCache
+from anomaly_detector.preprocess import build_feature_dataframe
+from anomaly_detector.runtimes import export_onnx, export_tflite
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# 1. Generate data
-transactions = generate_dataset()
 
-# 2. Build per-merchant features
-features_df = build_feature_dataframe(transactions)
+# ----------------------------
+# Checkpointing
+# ----------------------------
+class EpochCheckpoint(keras.callbacks.Callback):
+    """
+    Save the full model (weights + optimizer state) after every epoch,
+    together with the state of the `tracked` callbacks ({name: callback}
+    with get_checkpoint_state / set_checkpoint_state), so a resumed run
+    stops and reports exactly like an uninterrupted one. List it after
+    the tracked callbacks so it saves their state for the same epoch.
+
+    Files are written under a temporary or per-epoch name and committed
+    by renaming checkpoint.json into place, so a run killed mid-save
+    always leaves the previous complete checkpoint.
+    """
+
+    def __init__(self, checkpoint_dir, tracked=None):
+        super().__init__()
+        self.checkpoint_dir = checkpoint_dir
+        self.model_path = os.path.join(checkpoint_dir, "checkpoint.keras")
+        self.state_path = os.path.join(checkpoint_dir, "checkpoint.json")
+        self.tracked = dict(tracked or {})
+
+    def restore(self):
+        """returns: (model, completed epochs) or (None, 0) with no checkpoint"""
+        if not os.path.exists(self.state_path):
+            return None, 0
+        with open(self.state_path) as f:
+            state = json.load(f)
+
+        for name, callback_state in state.get("callbacks", {}).items():
+            if name not in self.tracked:
+                continue
+            arrays = None
+            if "arrays" in callback_state:
+                with np.load(os.path.join(self.checkpoint_dir, callback_state["arrays"])) as data:
+                    arrays = [data[f"arr_{i}"] for i in range(len(data.files))]
+            self.tracked[name].set_checkpoint_state(callback_state, arrays)
+        return load_model(self.model_path), state["epoch"]
+
+    def on_epoch_end(self, epoch, logs=None):
+        tmp_model = self.model_path.replace(".keras", ".tmp.keras")
+        self.model.save(tmp_model)
+        os.replace(tmp_model, self.model_path)
+
+        state = {"epoch": epoch + 1, "callbacks": {}}
+        for name, callback in self.tracked.items():
+            callback_state, arrays = callback.get_checkpoint_state()
+            if arrays is not None:
+                # Named per epoch: the previous checkpoint keeps its own file
+                callback_state["arrays"] = f"{name}-{epoch + 1}.npz"
+                np.savez(os.path.join(self.checkpoint_dir, callback_state["arrays"]), *arrays)
+            state["callbacks"][name] = callback_state
+
+        tmp_state = self.state_path + ".tmp"
+        with open(tmp_state, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_state, self.state_path)
+
+        current = {s["arrays"] for s in state["callbacks"].values() if "arrays" in s}
+        for name in os.listdir(self.checkpoint_dir):
+            if name.endswith(".npz") and name not in current:
+                os.remove(os.path.join(self.checkpoint_dir, name))
+
+
+class ResumableEarlyStopping(keras.callbacks.EarlyStopping):
+    """
+    EarlyStopping whose wait count, best loss and best weights are saved
+    by EpochCheckpoint and restored when training resumes.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._restored = None
+
+    def get_checkpoint_state(self):
+        state = {
+            "wait": self.wait,
+            "best": None if self.best is None else float(self.best),
+            "best_epoch": self.best_epoch,
+        }
+        return state, self.best_weights
+
+    def set_checkpoint_state(self, state, arrays):
+        self._restored = state, arrays
+
+    def on_train_begin(self, logs=None):
+        super().on_train_begin(logs)
+        if self._restored is not None:
+            state, self.best_weights = self._restored
+            self.wait = state["wait"]
+            self.best = state["best"]
+            self.best_epoch = state["best_epoch"]
+
+
+class ConvergenceTimer(keras.callbacks.Callback):
+    """
+    Record wall time and losses per epoch, so a run reports when the
+    monitored loss stopped improving, not just when training ended.
+    """
+
+    def __init__(self, monitor="val_loss"):
+        super().__init__()
+        self.monitor = monitor
+        self.epochs = []
+
+    def get_checkpoint_state(self):
+        return {"epochs": self.epochs}, None
+
+    def set_checkpoint_state(self, state, arrays):
+        self.epochs = state["epochs"]
+
+    def on_train_begin(self, logs=None):
+        # A resumed run continues the clock where the checkpoint left it
+        elapsed = self.epochs[-1]["seconds"] if self.epochs else 0.0
+        self._start = time.perf_counter() - elapsed
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs or {}
+        self.epochs.append({
+            "epoch": epoch + 1,
+            "seconds": time.perf_counter() - self._start,
+            "loss": float(logs.get("loss", np.nan)),
+            self.monitor: float(logs.get(self.monitor, np.nan)),
+        })
+
+    def report(self):
+        if not self.epochs:
+            return {"epochs_run": 0}
+        best = min(self.epochs, key=lambda e: e[self.monitor])
+        return {
+            "monitor": self.monitor,
+            "epochs_run": len(self.epochs),
+            "last_epoch": self.epochs[-1]["epoch"],
+            "best_epoch": best["epoch"],
+            "best_loss": best[self.monitor],
+            "seconds_to_best": best["seconds"],
+            "train_seconds": self.epochs[-1]["seconds"],
+            "history": self.epochs,
+        }
+
+
+# ----------------------------
+# Input pipeline
+# ----------------------------
+def configure_threads(threads):
+    """
+    threads: intra-op threads for TensorFlow's CPU kernels (0 keeps the
+             default of one per core). The dense layers have no parallel
+             branches, so inter-op parallelism is pinned to one pool.
+    """
+    if threads:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def training_datasets(X, batch_size, validation_split, seed):
+    """
+    returns: (train, validation or None) tf.data pipelines of (x, x)
+             batches, prefetched so batching overlaps the train step
+
+    Like Keras' validation_split, the last rows are held out before
+    shuffling.
+    """
+    n_val = int(len(X) * validation_split)
+    X = X.astype(np.float32)
+    X_fit, X_val = X[:len(X) - n_val], X[len(X) - n_val:]
+
+    train = (
+        tf.data.Dataset.from_tensor_slices((X_fit, X_fit))
+        .cache()
+        .shuffle(len(X_fit), seed=seed, reshuffle_each_iteration=True)
+        .batch(batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    if not n_val:
+        return train, None
+
+    validation = (
+        tf.data.Dataset.from_tensor_slices((X_val, X_val))
+        .batch(batch_size)
+        .cache()
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    return train, validation
+
+
+# ----------------------------
+# Stages
+# ----------------------------
+# Each stage writes its outputs into the directory it is given and reads
+# upstream outputs from the directories of the stages it depends on.
+
+def generate_stage(out_dir, num_merchants, seed, now):
+    transactions = generate_dataset_columnar(
+        num_merchants,
+        seed=seed,
+        now=datetime.fromisoformat(now) if now else None
+    )
+    transactions.to_parquet(os.path.join(out_dir, "transactions.parquet"), index=False)
+
+
+def features_stage(out_dir, generate_dir):
+    transactions = pd.read_parquet(os.path.join(generate_dir, "transactions.parquet"))
+    features_df = build_feature_dataframe(transactions)
+    features_df.to_parquet(os.path.join(out_dir, "features.parquet"), index=False)
+
+
+def scaler_stage(out_dir, features_dir, split_ratio):
+    features_df = pd.read_parquet(os.path.join(features_dir, "features.parquet"))
+    X = features_df[FEATURE_COLUMNS]
+
+    # Split normal vs test (as per your logic)
+    split_idx = int(len(X) * split_ratio)
+    normal_X = X.iloc[:split_idx]
+    test_X = X.iloc[split_idx:]
+
+    scaler = MinMaxScaler()
+    X_train = scaler.fit_transform(normal_X)
+    X_test = scaler.transform(test_X)
+
+    joblib.dump(scaler, os.path.join(out_dir, "scaler.joblib"))
+    np.savez(os.path.join(out_dir, "splits.npz"), X_train=X_train, X_test=X_test)
+
+
+def train_stage(out_dir, scaler_dir, epochs, batch_size, seed, patience=0, min_delta=0.0,
+                validation_split=0.2):
+    X_train = np.load(os.path.join(scaler_dir, "splits.npz"))["X_train"]
+
+    keras.utils.set_random_seed(seed)
+    train, validation = training_datasets(X_train, batch_size, validation_split, seed)
+    monitor = "val_loss" if validation is not None else "loss"
+
+    tracked = {"timer": ConvergenceTimer(monitor)}
+    if patience:
+        # Stops once `monitor` has not improved by min_delta for `patience`
+        # epochs and keeps the best epoch's weights
+        tracked["early_stopping"] = ResumableEarlyStopping(
+            monitor=monitor, patience=patience, min_delta=min_delta, restore_best_weights=True
+        )
+    timer = tracked["timer"]
+
+    # Checkpoints live in the partial stage directory; an interrupted run
+    # resumes from the last completed epoch
+    checkpoint_dir = os.path.join(out_dir, "checkpoint")
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    checkpoint = EpochCheckpoint(checkpoint_dir, tracked)
+
+    autoencoder, initial_epoch = checkpoint.restore()
+    if autoencoder is None:
+        autoencoder = build_autoencoder(input_dim=X_train.shape[1])
+    else:
+        print(f"Resuming training after epoch {initial_epoch}")
+    callbacks = [*tracked.values(), checkpoint]
+
+    autoencoder.fit(
+        train,
+        epochs=epochs,
+        initial_epoch=initial_epoch,
+        validation_data=validation,
+        callbacks=callbacks
+    )
+    autoencoder.save(os.path.join(out_dir, "autoencoder.keras"))
+    shutil.rmtree(checkpoint_dir)
+
+    # Per-row errors of the final weights, computed once with the serving
+    # engine and shared by the threshold and reference stages
+    engine = NumpyAutoencoder(dense_layers(autoencoder))
+    np.save(
+        os.path.join(out_dir, "train_errors.npy"),
+        np.mean(np.square(X_train - engine.predict(X_train)), axis=1)
+    )
+
+    with open(os.path.join(out_dir, "training_report.json"), "w") as f:
+        json.dump({**timer.report(), "max_epochs": epochs, "batch_size": batch_size}, f, indent=2)
+
+
+def print_training_report(path):
+    with open(path) as f:
+        report = json.load(f)
+    if not report["epochs_run"]:
+        return
+    print(
+        f"[train] best {report['monitor']} {report['best_loss']:.3e} at epoch "
+        f"{report['best_epoch']} after {report['seconds_to_best']:.1f}s; "
+        f"ran {report['epochs_run']} of {report['max_epochs']} epochs in {report['train_seconds']:.1f}s"
+    )
+
+
+def threshold_stage(out_dir, train_dir, percentile):
+    train_errors = np.load(os.path.join(train_dir, "train_errors.npy"))
+    threshold = np.percentile(train_errors, percentile)
+
+    np.save(os.path.join(out_dir, "threshold.npy"), threshold)
+
+
+def reference_stage(out_dir, scaler_dir, train_dir, bins):
+    # Training distribution of the raw features and reconstruction errors,
+    # the baseline for drift monitoring at serving time
+    X_train = np.load(os.path.join(scaler_dir, "splits.npz"))["X_train"]
+    scaler = joblib.load(os.path.join(scaler_dir, "scaler.joblib"))
+    train_errors = np.load(os.path.join(train_dir, "train_errors.npy"))
+
+    ReferenceProfile.from_samples(
+        np.column_stack([scaler.inverse_transform(X_train), train_errors]),
+        FEATURE_COLUMNS + ["anomaly_score"],
+        bins=bins
+    ).save(os.path.join(out_dir, "drift_reference.npz"))
+
+
+def export_stage(output_dir, scaler_stage_result, train_stage_result, threshold_stage_result,
+                 reference_stage_result, runtimes=()):
+    # Save artifacts (IMPORTANT)
+    shutil.copyfile(train_stage_result.file("autoencoder.keras"), os.path.join(output_dir, "autoencoder.keras"))
+    shutil.copyfile(threshold_stage_result.file("threshold.npy"), os.path.join(output_dir, "threshold.npy"))
+    shutil.copyfile(scaler_stage_result.file("scaler.joblib"), os.path.join(output_dir, "scaler.joblib"))
+    shutil.copyfile(reference_stage_result.file("drift_reference.npz"), os.path.join(output_dir, "drift_reference.npz"))
+
+    # NumPy-only copy of the same artifacts for TensorFlow-free serving
+    autoencoder = load_model(train_stage_result.file("autoencoder.keras"))
+    export_numpy_artifacts(
+        autoencoder,
+        float(np.load(threshold_stage_result.file("threshold.npy"))),
+        joblib.load(scaler_stage_result.file("scaler.joblib")),
+        os.path.join(output_dir, "autoencoder.npz")
+    )
 
-# 3. Select features
-feature_cols = [
-    'peak_hour',
-    'average_transactions_per_hour',
-    'high_value_transaction_ratio',
-    'late_night_frequency',
-    'unique_customer_count',
-    'time_diff_minutes'
-]
+    # Network-only exports for the lighter CPU runtimes (see runtimes.py)
+    if "onnx" in runtimes:
+        export_onnx(dense_layers(autoencoder), os.path.join(output_dir, "autoencoder.onnx"))
+    if "tflite" in runtimes:
+        export_tflite(autoencoder, os.path.join(output_dir, "autoencoder.tflite"))
 
-X = features_df[feature_cols]
 
-# 4. Split normal vs test (as per your logic)
-split_ratio = 0.8
-split_idx = int(len(X) * split_ratio)
+# ----------------------------
+# Pipeline
+# ----------------------------
+def data_stages(cache, num_merchants, seed, now, split_ratio):
+    """
+    Run the generate -> features -> scaler stages. sweep.py builds its
+    data through here too, so both reuse the same cache entries.
+    returns: (generated, features, scaled) stage results
+    """
+    generated = cache.run(
+        "generate",
+        {"num_merchants": num_merchants, "seed": seed, "now": now},
+        [],
+        lambda out: generate_stage(out, num_merchants, seed, now)
+    )
+    features = cache.run("features", {}, [generated], features_stage)
+    scaled = cache.run(
+        "scaler",
+        {"split_ratio": split_ratio, "feature_columns": FEATURE_COLUMNS},
+        [features],
+        lambda out, features_dir: scaler_stage(out, features_dir, split_ratio)
+    )
+    return generated, features, scaled
 
-normal_X = X.iloc[:split_idx]
-test_X   = X.iloc[split_idx:]
 
-# 5. Normalize
-scaler = MinMaxScaler()
-X_train = scaler.fit_transform(normal_X)
-X_test = scaler.transform(test_X)
+def run_pipeline(args):
+    configure_threads(args.threads)
+    cache = StageCache(args.cache_dir, force=args.force)
 
-# 6. Train model
-autoencoder = build_autoencoder(input_dim=X_train.shape[1])
-autoencoder.fit(
-    X_train, X_train,
-    epochs=50,
-    batch_size=32,
-    shuffle=True,
-    validation_split=0.2
-)
+    generated, features, scaled = data_stages(
+        cache, args.merchants, args.seed, args.now, args.split_ratio
+    )
+    trained = cache.run(
+        "train",
+        {
+            "epochs": args.epochs,
+            "batch_size": args.batch_size,
+            "seed": args.seed,
+            "patience": args.patience,
+            "min_delta": args.min_delta,
+            "validation_split": args.validation_split,
+        },
+        [scaled],
+        lambda out, scaler_dir: train_stage(
+            out, scaler_dir, args.epochs, args.batch_size, args.seed,
+            patience=args.patience, min_delta=args.min_delta, validation_split=args.validation_split
+        )
+    )
+    print_training_report(trained.file("training_report.json"))
+    thresholded = cache.run(
+        "threshold",
+        {"percentile": args.percentile},
+        [trained],
+        lambda out, train_dir: threshold_stage(out, train_dir, args.percentile)
+    )
+    reference = cache.run(
+        "reference",
+        {"bins": args.drift_bins},
+        [scaled, trained],
+        lambda out, scaler_dir, train_dir: reference_stage(out, scaler_dir, train_dir, args.drift_bins)
+    )
 
-# 7. Threshold
-train_recon = autoencoder.predict(X_train)
-train_errors = np.mean((X_train - train_recon) ** 2, axis=1)
-threshold = np.percentile(train_errors, 95)
+    print(f"[export] writing artifacts to {args.output_dir}")
+    export_stage(args.output_dir, scaled, trained, thresholded, reference, args.runtimes)
 
-# 8. Save artifacts (IMPORTANT)
-autoencoder.save(os.path.join(BASE_DIR, "autoencoder.keras"))
-np.save(os.path.join(BASE_DIR, "threshold.npy"), threshold)
-joblib.dump(scaler, os.path.join(BASE_DIR, "scaler.joblib"))
+    if args.debug_features:
+        pd.read_parquet(features.file("features.parquet")).to_csv(args.debug_features, index=False)
 
+    if args.rules:
+        from anomaly_detector.rules import apply_rule_based_scoring
 
+        rule_scores = apply_rule_based_scoring(
+            pd.read_parquet(generated.file("transactions.parquet"))
+        )
+        print(rule_scores.head())
 
-from rules import apply_rule_based_scoring
 
-rule_scores = apply_rule_based_scoring(transactions)
-print(rule_scores.head())
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Train the autoencoder: generate -> features -> scaler -> train -> threshold -> reference -> export"
+    )
+    parser.add_argument("--merchants", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--now", help="ISO timestamp used as 'now' by the data generator")
+    parser.add_argument("--split-ratio", type=float, default=0.8)
+    parser.add_argument("--epochs", type=int, default=50,
+                        help="Maximum epochs; with --patience, early stopping may end training sooner")
+    parser.add_argument("--batch-size", type=int, default=32,
+                        help="Raise for large merchant sets; the input pipeline prefetches batches")
+    parser.add_argument("--patience", type=int, default=0,
+                        help="Stop after this many epochs without validation loss improvement "
+                             "(default 0: early stopping off)")
+    parser.add_argument("--min-delta", type=float, default=0.0,
+                        help="Smallest validation loss decrease that counts as an improvement")
+    parser.add_argument("--validation-split", type=float, default=0.2)
+    parser.add_argument("--threads", type=int, default=0,
+                        help="TensorFlow intra-op CPU threads (0 = one per core)")
+    parser.add_argument("--percentile", type=float, default=95)
+    parser.add_argument("--runtimes", nargs="*", choices=["onnx", "tflite"], default=["onnx", "tflite"],
+                        help="Extra runtime formats to export next to the Keras / NumPy artifacts")
+    parser.add_argument("--drift-bins", type=int, default=10,
+                        help="PSI bins in the drift reference profile")
+    parser.add_argument("--cache-dir", default=os.path.join(BASE_DIR, ".cache", "pipeline"))
+    parser.add_argument("--output-dir", default=BASE_DIR)
+    parser.add_argument("--force", nargs="*", default=[],
+                        help="Stage names to re-run even if cached")
+    parser.add_argument("--debug-features", metavar="CSV",
+                        help="Also write the feature frame to this CSV")
+    parser.add_argument("--rules", action="store_true",
+                        help="Print rule-based scores for the generated transactions")
+    return parser.parse_args(argv)
 
-# print(features_df.columns.tolist())
-features_df.to_csv("features_debug.csv", index=False)
 
+if __name__ == "__main__":
+    run_pipeline(parse_args())
@@ -0,0 +1,173 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Column name -> (on-disk dtype, encoding)
+COLUMNS = {
+    "transaction_id": ("<i4", "dictionary"),
+    "merchant_id": ("<i4", "dictionary"),
+    "customer_id": ("<i4", "dictionary"),
+    "timestamp": ("<i8", "ns"),
+    "amount": ("<i8", "cents"),
+    "is_anomalous": ("|b1", "bool"),
+}
+
+
+class _Dictionary:
+    """Incremental value -> int code mapping shared across chunks."""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, column):
+        local_codes, uniques = pd.factorize(column)
+        if (local_codes < 0).any():
+            raise ValueError("Id columns must not contain missing values")
+
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, value in enumerate(uniques):
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            mapping[i] = code
+        return mapping[local_codes]
+
+
+# ----------------------------
+# Columnar transaction store
+# ----------------------------
+class ColumnarTransactionStore:
+    """
+    Transactions persisted as flat binary columns in a directory:
+    ids dictionary-encoded to int32 codes, timestamps as int64
+    nanoseconds, amounts as int64 cents.
+
+    Columns are opened with np.memmap, so a multi-GB history is scanned
+    without loading it into RAM or building a Python object per row.
+    Every transaction consumer in the package accepts a store wherever it
+    accepts a list of transaction dicts.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+
+        self.columns = {
+            name: np.memmap(
+                os.path.join(path, f"{name}.bin"),
+                dtype=COLUMNS[name][0],
+                mode="r",
+                shape=(self.meta["rows"],)
+            ) if self.meta["rows"] else np.empty(0, dtype=COLUMNS[name][0])
+            for name in self.meta["columns"]
+        }
+        self.dictionaries = {
+            name: pd.Index(np.load(os.path.join(path, f"{name}.dict.npy")))
+            for name in self.meta["columns"]
+            if COLUMNS[name][1] == "dictionary"
+        }
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    # ----------------------------
+    # Writing
+    # ----------------------------
+    @classmethod
+    def write(cls, path, source, chunksize=1_000_000):
+        """
+        source: list of transaction dicts, a DataFrame, another store, or
+                an iterable of DataFrame chunks (e.g. streaming.iter_csv_chunks)
+        returns: the store opened read-only
+        """
+        if isinstance(source, (list, pd.DataFrame, ColumnarTransactionStore)):
+            if isinstance(source, ColumnarTransactionStore):
+                chunks = source.iter_chunks(chunksize)
+            else:
+                frame = pd.DataFrame(source)
+                chunks = (frame.iloc[i:i + chunksize] for i in range(0, len(frame), chunksize))
+        else:
+            chunks = source
+
+        os.makedirs(path, exist_ok=True)
+        dictionaries = {
+            name: _Dictionary() for name, (_, encoding) in COLUMNS.items()
+            if encoding == "dictionary"
+        }
+        files = {}
+        rows = 0
+
+        try:
+            for chunk in chunks:
+                if not files:
+                    present = [name for name in COLUMNS if name in chunk.columns]
+                    files = {
+                        name: open(os.path.join(path, f"{name}.bin"), "wb")
+                        for name in present
+                    }
+
+                for name, f in files.items():
+                    dtype, encoding = COLUMNS[name]
+                    column = chunk[name]
+                    if encoding == "dictionary":
+                        values = dictionaries[name].encode(column)
+                    elif encoding == "ns":
+                        values = (
+                            pd.to_datetime(column).to_numpy(dtype="datetime64[ns]")
+                            .view(np.int64)
+                        )
+                    elif encoding == "cents":
+                        values = np.rint(column.to_numpy(dtype=np.float64) * 100)
+                    else:
+                        values = column.to_numpy(dtype=bool)
+                    f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+                rows += len(chunk)
+        finally:
+            for f in files.values():
+                f.close()
+
+        present = list(files) or [n for n in COLUMNS if COLUMNS[n][1] != "bool"]
+        for name in present:
+            if COLUMNS[name][1] == "dictionary":
+                np.save(
+                    os.path.join(path, f"{name}.dict.npy"),
+                    np.array(dictionaries[name].values, dtype=str)
+                )
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"rows": rows, "columns": present}, f)
+
+        return cls(path)
+
+    # ----------------------------
+    # Reading
+    # ----------------------------
+    def to_frame(self, start=0, stop=None):
+        """
+        Rows [start, stop) as a DataFrame in the transaction-dict schema.
+        Ids come back as Categoricals over the stored codes.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        data = {}
+        for name, values in self.columns.items():
+            values = values[start:stop]
+            encoding = COLUMNS[name][1]
+            if encoding == "dictionary":
+                data[name] = pd.Categorical.from_codes(values, self.dictionaries[name])
+            elif encoding == "ns":
+                data[name] = values.view("datetime64[ns]")
+            elif encoding == "cents":
+                data[name] = values / 100
+            else:
+                data[name] = np.asarray(values)
+        return pd.DataFrame(data)
+
+    def iter_chunks(self, chunksize=1_000_000):
+        """Chunks for streaming.StreamingFeatureAggregator and friends."""
+        for start in range(0, len(self), chunksize):
+            yield self.to_frame(start, start + chunksize)
@@ -0,0 +1,243 @@
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from anomaly_detector.preprocess import transactions_to_df
+
+# Trailing windows, in seconds
+WINDOWS = {
+    "1m": 60,
+    "1h": 3600,
+    "24h": 86400,
+}
+
+# A burst starts when this many transactions fall inside BURST_WINDOW
+BURST_WINDOW = "1m"
+BURST_SIZE = 5
+
+_NS = 1_000_000_000
+
+
+# ----------------------------
+# Batch: sorted arrays
+# ----------------------------
+def _window_bounds(codes, ts, windows):
+    """
+    codes, ts: merchant codes and int64 ns timestamps, sorted by (code, ts)
+    returns: {window name: index of the first row inside the window}
+
+    Rows are keyed by merchant code * stride + timestamp rank, so one
+    searchsorted over the whole array finds every row's window start
+    without leaving its merchant (no overflow, unlike code * max_ns).
+    """
+    unique_ts, ts_rank = np.unique(ts, return_inverse=True)
+    stride = len(unique_ts) + 1
+    keys = codes.astype(np.int64) * stride + ts_rank
+
+    bounds = {}
+    for name, seconds in windows.items():
+        # Window is (t - w, t]: first timestamp strictly after t - w
+        lo_rank = np.searchsorted(unique_ts, ts - seconds * _NS, side="right")
+        bounds[name] = np.searchsorted(keys, codes.astype(np.int64) * stride + lo_rank, side="left")
+    return bounds
+
+
+def _sorted_window_frame(transactions, windows):
+    df = transactions_to_df(transactions)
+    codes, merchant_ids = pd.factorize(df["merchant_id"])
+    ts = df["timestamp"].to_numpy("datetime64[ns]").view(np.int64)
+    amounts = df["amount"].to_numpy(dtype=np.float64)
+
+    # Stable: ties keep arrival order, matching the streaming store
+    order = np.lexsort((ts, codes))
+    codes, ts, amounts = codes[order], ts[order], amounts[order]
+
+    positions = np.arange(len(order))
+    cumulative = np.concatenate([[0.0], np.cumsum(amounts)])
+
+    columns = {}
+    for name, lo in _window_bounds(codes, ts, windows).items():
+        columns[f"txns_{name}"] = positions - lo + 1
+        columns[f"amount_{name}"] = cumulative[positions + 1] - cumulative[lo]
+
+    return df, order, codes, merchant_ids, columns
+
+
+def peak_window_counts(merchant_codes, timestamps_ns, seconds, n_merchants):
+    """
+    returns: per merchant code, the most transactions inside any trailing
+             window of `seconds`
+    """
+    order = np.lexsort((timestamps_ns, merchant_codes))
+    codes, ts = merchant_codes[order], timestamps_ns[order]
+    counts = np.arange(len(order)) - _window_bounds(codes, ts, {"w": seconds})["w"] + 1
+
+    peaks = np.zeros(n_merchants, dtype=np.int64)
+    np.maximum.at(peaks, codes, counts)
+    return peaks
+
+
+def transaction_window_features(transactions, windows=WINDOWS):
+    """
+    Trailing-window counts and amount sums as of each transaction,
+    including the transaction itself.
+
+    returns: DataFrame aligned with the input rows: merchant_id,
+             transaction_id, timestamp, txns_<w>, amount_<w> per window
+    """
+    df, order, _, _, columns = _sorted_window_frame(transactions, windows)
+
+    out = df[[c for c in ("merchant_id", "transaction_id", "timestamp") if c in df]].copy()
+    for column, sorted_values in columns.items():
+        values = np.empty_like(sorted_values)
+        values[order] = sorted_values
+        out[column] = values
+    return out
+
+
+def merchant_window_features(transactions, windows=WINDOWS, burst_window=BURST_WINDOW,
+                             burst_size=BURST_SIZE):
+    """
+    Per-merchant peaks of the sliding windows.
+
+    returns: DataFrame with merchant_id, max_txns_<w>, max_amount_<w> per
+             window and burst_count (times the burst window reached
+             `burst_size` transactions, counting each run once)
+    """
+    df, _, codes, merchant_ids, columns = _sorted_window_frame(transactions, windows)
+    if not len(codes):
+        return pd.DataFrame(columns=["merchant_id", "burst_count"])
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    out = pd.DataFrame({"merchant_id": merchant_ids[codes[starts]]})
+    for name in windows:
+        out[f"max_txns_{name}"] = np.maximum.reduceat(columns[f"txns_{name}"], starts)
+        out[f"max_amount_{name}"] = np.maximum.reduceat(columns[f"amount_{name}"], starts)
+
+    in_burst = columns[f"txns_{burst_window}"] >= burst_size
+    previous = np.r_[False, in_burst[:-1]]
+    previous[starts] = False
+    out["burst_count"] = np.add.reduceat((in_burst & ~previous).astype(np.int64), starts)
+    return out
+
+
+# ----------------------------
+# Streaming: per-merchant deques
+# ----------------------------
+class SlidingWindow:
+    """Events of the last `seconds`, with a running count and amount sum."""
+
+    __slots__ = ("span", "events", "amount", "max_count", "max_amount")
+
+    def __init__(self, seconds):
+        self.span = seconds * _NS
+        self.events = deque()
+        self.amount = 0.0
+        self.max_count = 0
+        self.max_amount = 0.0
+
+    def add(self, ts, amount):
+        events = self.events
+        events.append((ts, amount))
+        self.amount += amount
+        while events[0][0] <= ts - self.span:
+            self.amount -= events.popleft()[1]
+
+        self.max_count = max(self.max_count, len(events))
+        self.max_amount = max(self.max_amount, self.amount)
+
+
+class WindowedMerchantState:
+    __slots__ = ("windows", "last_ts", "in_burst", "burst_count")
+
+    def __init__(self, windows):
+        self.windows = {name: SlidingWindow(seconds) for name, seconds in windows.items()}
+        self.last_ts = None
+        self.in_burst = False
+        self.burst_count = 0
+
+    def add(self, ts, amount, burst_window, burst_size):
+        # Windows slide on arrival order; a late event counts as of the
+        # latest timestamp seen for the merchant
+        if self.last_ts is not None and ts < self.last_ts:
+            ts = self.last_ts
+        self.last_ts = ts
+
+        for window in self.windows.values():
+            window.add(ts, amount)
+
+        in_burst = len(self.windows[burst_window].events) >= burst_size
+        if in_burst and not self.in_burst:
+            self.burst_count += 1
+        self.in_burst = in_burst
+
+    def features(self):
+        # Current windows end at the merchant's latest transaction
+        features = {}
+        for name, window in self.windows.items():
+            features[f"txns_{name}"] = len(window.events)
+            features[f"amount_{name}"] = window.amount
+        for name, window in self.windows.items():
+            features[f"max_txns_{name}"] = window.max_count
+            features[f"max_amount_{name}"] = window.max_amount
+        features["burst_count"] = self.burst_count
+        return features
+
+
+class WindowedFeatureStore:
+    """
+    Live sliding-window features per merchant. Each ingest is amortised
+    O(1) per window; memory is bounded by the events inside the largest
+    window. Matches `transaction_window_features` /
+    `merchant_window_features` when events arrive in timestamp order.
+    """
+
+    def __init__(self, windows=WINDOWS, burst_window=BURST_WINDOW, burst_size=BURST_SIZE):
+        self.windows = dict(windows)
+        self.burst_window = burst_window
+        self.burst_size = burst_size
+        self._merchants = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._merchants)
+
+    def ingest(self, transaction):
+        """
+        transaction: dict with merchant_id, timestamp and amount
+        returns: the merchant's window features including this transaction
+        """
+        ts = _timestamp_ns(transaction["timestamp"])
+
+        with self._lock:
+            state = self._merchants.get(transaction["merchant_id"])
+            if state is None:
+                state = self._merchants[transaction["merchant_id"]] = WindowedMerchantState(self.windows)
+
+            state.add(ts, float(transaction["amount"]), self.burst_window, self.burst_size)
+            return state.features()
+
+    def ingest_many(self, transactions):
+        count = 0
+        for transaction in transactions:
+            self.ingest(transaction)
+            count += 1
+        return count
+
+    def features(self, merchant_id):
+        """
+        returns: current and peak window features, or None for an unknown merchant
+        """
+        with self._lock:
+            state = self._merchants.get(merchant_id)
+            return state.features() if state is not None else None
+
+
+def _timestamp_ns(timestamp):
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    # Naive datetimes are taken as-is (same wall clock as pandas uses)
+    return pd.Timestamp(timestamp).value